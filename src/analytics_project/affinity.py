@@ -0,0 +1,206 @@
+"""Product co-purchase ("customers who bought X also bought Y") affinities.
+
+A dense customers x products pivot does not fit in memory at our scale, so
+this module works on the sparse customer-product incidence matrix A (one
+entry per distinct customer/product pair, read straight from the fact
+table). The co-occurrence matrix C = A^T A is accumulated block by block
+over customer id ranges. Each block expands its customers' product pairs,
+sums duplicates, and merges the sorted result into a sorted sparse
+(pair code -> count) accumulator in one linear pass, so memory is bounded
+by the block size and the number of distinct pairs, not by
+customers x products.
+
+From C and the per-product customer counts we get support, confidence and
+lift, and the top-K partners per product are written to the
+``product_affinity`` table.
+
+Usage (from project root):
+    python -m src.analytics_project.affinity [top_k]
+"""
+
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.dim_cache import DimensionIndex
+from src.analytics_project.etl_to_dw import DB_PATH
+
+# Customers per block when expanding product pairs
+CUSTOMER_BLOCK_SIZE = 50_000
+
+
+def _block_pairs(customers: np.ndarray, products: np.ndarray) -> np.ndarray:
+    """Return the a<b product-code pairs bought by the same customer, packed as a<<32 | b.
+
+    ``customers`` must be sorted and (customer, product) pairs distinct.
+    Every row is paired with each later row of the same customer without a
+    Python loop.
+    """
+    n = len(customers)
+    if n < 2:
+        return np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, customers[1:] != customers[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    group_end = np.repeat(starts + sizes, sizes)
+    after = group_end - np.arange(n) - 1  # later rows of the same customer
+    left = np.repeat(np.arange(n), after)
+    offset_start = np.repeat(np.cumsum(after) - after, after)
+    right = left + 1 + (np.arange(len(left)) - offset_start)
+    a, b = products[left], products[right]
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    return lo * np.int64(1 << 32) + hi
+
+
+def _reduce(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted distinct pair codes and how often each occurs (the 'sum duplicates' step)."""
+    codes = np.sort(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else codes
+    return codes[starts], np.diff(np.r_[starts, len(codes)]).astype(np.int64)
+
+
+def _merge(
+    codes: np.ndarray, counts: np.ndarray, new_codes: np.ndarray, new_counts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Add sorted distinct ``new_codes`` into the sorted accumulator in linear time.
+
+    Codes already present get their counts added; the rest are inserted in order.
+    """
+    pos = np.searchsorted(codes, new_codes)
+    found = pos < len(codes)
+    found[found] = codes[pos[found]] == new_codes[found]
+    counts = counts.copy()
+    counts[pos[found]] += new_counts[found]
+    missing = ~found
+    return (
+        np.insert(codes, pos[missing], new_codes[missing]),
+        np.insert(counts, pos[missing], new_counts[missing]),
+    )
+
+
+def co_occurrence(
+    conn: sqlite3.Connection, block_size: int = CUSTOMER_BLOCK_SIZE
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray, int]:
+    """Build the sparse product co-occurrence counts from the sales fact.
+
+    Returns:
+        tuple: (pairs DataFrame with product codes a, b and co_count,
+        product ids by code, customers per product code, number of customers).
+    """
+    product_ids = pd.read_sql_query(
+        "SELECT DISTINCT product_id FROM sales_base WHERE product_id IS NOT NULL ORDER BY 1", conn
+    )["product_id"].to_numpy(np.int64)
+    index = DimensionIndex(product_ids)
+    low, high = conn.execute(
+        "SELECT MIN(customer_id), MAX(customer_id) FROM sales_base;"
+    ).fetchone()
+
+    codes = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    product_customers = np.zeros(len(product_ids), dtype=np.int64)
+    n_customers = 0
+    for start in range(int(low or 0), int(high or -1) + 1, block_size):
+        block = pd.read_sql_query(
+            "SELECT DISTINCT customer_id, product_id FROM sales_base "
+            "WHERE customer_id >= ? AND customer_id < ? AND product_id IS NOT NULL "
+            "ORDER BY customer_id",
+            conn,
+            params=[start, start + block_size],
+        )
+        if block.empty:
+            continue
+        customers = block["customer_id"].to_numpy(np.int64)
+        products = index.positions(block["product_id"].to_numpy(np.int64))
+        n_customers += len(np.unique(customers))
+        product_customers += np.bincount(products, minlength=len(product_ids))
+
+        codes, counts = _merge(codes, counts, *_reduce(_block_pairs(customers, products)))
+
+    pairs = pd.DataFrame({"a": codes >> 32, "b": codes & 0xFFFFFFFF, "co_count": counts})
+    return pairs, product_ids, product_customers, n_customers
+
+
+def affinity_scores(
+    pairs: pd.DataFrame,
+    product_ids: np.ndarray,
+    product_customers: np.ndarray,
+    n_customers: int,
+    top_k: int = 10,
+    min_co_count: int = 2,
+) -> pd.DataFrame:
+    """Return the top-K partners per product by lift (ties by confidence).
+
+    For X -> Y: support = co / N, confidence = co / count(X),
+    lift = co * N / (count(X) * count(Y)).
+    """
+    pairs = pairs[pairs["co_count"] >= min_co_count]
+    # Both directions: X -> Y and Y -> X
+    x = np.concatenate([pairs["a"].to_numpy(), pairs["b"].to_numpy()])
+    y = np.concatenate([pairs["b"].to_numpy(), pairs["a"].to_numpy()])
+    co = np.concatenate([pairs["co_count"].to_numpy(), pairs["co_count"].to_numpy()])
+    count_x = product_customers[x]
+    count_y = product_customers[y]
+
+    scores = pd.DataFrame(
+        {
+            "product_id": product_ids[x],
+            "other_product_id": product_ids[y],
+            "co_count": co,
+            "support": co / max(n_customers, 1),
+            "confidence": co / count_x,
+            "lift": co * n_customers / (count_x * count_y),
+        }
+    )
+    scores = scores.sort_values(
+        ["product_id", "lift", "confidence"], ascending=[True, False, False]
+    )
+    scores["rank"] = scores.groupby("product_id").cumcount() + 1
+    return scores[scores["rank"] <= top_k].reset_index(drop=True)
+
+
+def build_product_affinity(conn: sqlite3.Connection, top_k: int = 10, min_co_count: int = 2) -> int:
+    """Recompute ``product_affinity`` from the sales fact; return rows written."""
+    pairs, product_ids, product_customers, n_customers = co_occurrence(conn)
+    scores = affinity_scores(
+        pairs, product_ids, product_customers, n_customers, top_k, min_co_count
+    )
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS product_affinity (
+        product_id INTEGER,
+        other_product_id INTEGER,
+        co_count INTEGER,
+        support REAL,
+        confidence REAL,
+        lift REAL,
+        rank INTEGER,
+        PRIMARY KEY (product_id, rank)
+    );
+    """)
+    cursor.execute("DELETE FROM product_affinity;")
+    scores.to_sql("product_affinity", conn, if_exists="append", index=False)
+    conn.commit()
+    return len(scores)
+
+
+def also_bought(conn: sqlite3.Connection, product_id: int, k: int = 5) -> pd.DataFrame:
+    """Return the stored top-``k`` partners of a product."""
+    return pd.read_sql_query(
+        "SELECT other_product_id, co_count, confidence, lift FROM product_affinity "
+        "WHERE product_id = ? ORDER BY rank LIMIT ?",
+        conn,
+        params=[product_id, k],
+    )
+
+
+def main(top_k: int = 10) -> None:
+    """Rebuild the product affinity table in the DW."""
+    conn = sqlite3.connect(DB_PATH)
+    written = build_product_affinity(conn, top_k)
+    print(f"product_affinity rows written: {written}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,323 @@
+"""Streaming anomaly detection on daily store sales.
+
+Each store is compared with its own history on three daily metrics:
+
+- ``sales``: total sale_amount,
+- ``discount_rate``: mean discount_percent of the day's sales,
+- ``payment_mix_shift``: how far the day's payment-type shares moved from
+  the store's usual mix (total variation distance to an EWMA of past mixes,
+  0 = same mix, 1 = disjoint).
+
+Per store and metric the detector keeps running statistics that are
+updated incrementally, day by day, from the sales batches the ETL loads:
+
+- an EWMA mean and variance (decay EWMA_ALPHA), and
+- a ring buffer of the last MAD_WINDOW daily values, the sketch from which
+  the robust median and MAD are taken.
+
+All stores with sales on a day are scored in one vectorized pass, against
+the statistics from before that day. A value is an anomaly when, after
+MIN_HISTORY days of history, both its robust z-score
+(``(x - median) / (1.4826 * MAD)``) and its EWMA z-score pass their
+thresholds. ``payment_mix_shift`` only alerts upwards. Alerts are written to
+the ``store_anomaly_alert`` table.
+
+Days at or before a store's last processed day are skipped, so feeding the
+same history again (e.g. a full reload) does not count it twice. The state
+is saved as one .npz next to the DW.
+
+Usage (from project root):
+    python -m src.analytics_project.anomaly          # score new days in the DW
+    python -m src.analytics_project.anomaly --full   # forget the state and rescan
+"""
+
+import argparse
+from datetime import datetime
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.etl_to_dw import DB_PATH, DW_DIR
+
+STATE_PATH = DW_DIR / "anomaly_state.npz"
+
+METRICS = ("sales", "discount_rate", "payment_mix_shift")
+
+# Metrics that only alert when they go up
+ONE_SIDED = {"payment_mix_shift"}
+
+# EWMA decay per day (about a 2-week memory)
+EWMA_ALPHA = 0.1
+
+# Daily values kept per store and metric for the median/MAD
+MAD_WINDOW = 28
+
+# Days of history a store needs before it is scored (a shorter ring gives a
+# noisy MAD)
+MIN_HISTORY = 14
+
+# Both scores must reach their threshold to raise an alert. Set above the
+# textbook 3.5 because the MAD of a few weeks of days is itself noisy.
+ROBUST_Z = 5.0
+EWMA_Z = 4.0
+
+# MAD floor as a share of the median, so a flat history doesn't flag tiny changes
+MAD_FLOOR = 0.01
+
+
+def create_alert_table(cursor: sqlite3.Cursor) -> None:
+    """Create the alert table if needed."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS store_anomaly_alert (
+        sale_date TEXT,
+        store_id INTEGER,
+        metric TEXT,
+        value REAL,
+        expected REAL,
+        robust_z REAL,
+        ewma_z REAL,
+        detected_at TEXT,
+        PRIMARY KEY (sale_date, store_id, metric)
+    );
+    """)
+
+
+def daily_store_metrics(
+    sales: pd.DataFrame, payment_types: list[str]
+) -> tuple[pd.DataFrame, np.ndarray, list[str]]:
+    """Aggregate sales rows to one row per (store, day).
+
+    Returns:
+        tuple: a frame with store_id, day, sales and discount_rate; the
+        (rows, types) payment-type shares; and the payment types, extended
+        with any new ones (existing types keep their position).
+    """
+    days = pd.to_datetime(sales["sale_date"], errors="coerce", format="mixed")
+    stores = pd.to_numeric(sales["store_id"], errors="coerce")
+    valid = (days.notna() & stores.notna()).to_numpy()
+    days = days.to_numpy("datetime64[ns]")[valid].astype("datetime64[D]")
+    stores = stores.to_numpy(float)[valid].astype(np.int64)
+    amount = np.nan_to_num(pd.to_numeric(sales["sale_amount"], errors="coerce").to_numpy(float))
+    discount = np.nan_to_num(
+        pd.to_numeric(sales["discount_percent"], errors="coerce").to_numpy(float)
+    )
+    payment = sales["sale_payment_type"].astype(object).where(sales["sale_payment_type"].notna())
+    payment = payment.fillna("unknown").astype(str).to_numpy()[valid]
+    new_types = sorted(set(payment) - set(payment_types))
+    payment_types = payment_types + new_types
+
+    # One cell per (store, day), packed as store << 32 | days since the first day
+    day_numbers = days.astype(np.int64)
+    base = day_numbers.min(initial=0)
+    cells, inverse = np.unique((stores << 32) | (day_numbers - base), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(cells))
+    type_codes = pd.Index(payment_types).get_indexer(payment)
+    mix = np.bincount(
+        inverse * len(payment_types) + type_codes, minlength=len(cells) * len(payment_types)
+    ).reshape(len(cells), len(payment_types))
+    daily = pd.DataFrame(
+        {
+            "store_id": cells >> 32,
+            "day": ((cells & 0xFFFFFFFF) + base).astype("datetime64[D]"),
+            "sales": np.bincount(inverse, weights=amount[valid], minlength=len(cells)),
+            "discount_rate": np.bincount(inverse, weights=discount[valid], minlength=len(cells))
+            / counts,
+        }
+    )
+    return daily, mix / counts[:, None], payment_types
+
+
+class StoreAnomalyDetector:
+    """Per-store running statistics and alerts, fed sales batches like a TopNEngine."""
+
+    def __init__(self, alpha: float = EWMA_ALPHA, window: int = MAD_WINDOW):
+        """Start with no stores seen (EWMA weight ``alpha``, MAD over ``window`` days)."""
+        self.alpha = alpha
+        self.window = window
+        self.stores = np.empty(0, dtype=np.int64)
+        self.payment_types: list[str] = []
+        metrics = len(METRICS)
+        self.mean = np.zeros((0, metrics))
+        self.var = np.zeros((0, metrics))
+        self.count = np.zeros(0, dtype=np.int64)
+        self.ring = np.full((0, metrics, window), np.nan)
+        self.last_day = np.empty(0, dtype="datetime64[D]")
+        self.mix = np.zeros((0, 0))
+        self.alerts: list[pd.DataFrame] = []
+
+    def _grow(self, stores: np.ndarray) -> None:
+        """Add state rows for unseen stores and columns for new payment types."""
+        types = len(self.payment_types)
+        if self.mix.shape[1] < types:
+            self.mix = np.pad(self.mix, ((0, 0), (0, types - self.mix.shape[1])))
+        new = np.setdiff1d(stores, self.stores)
+        if not len(new):
+            return
+        all_stores = np.union1d(self.stores, new)
+        old = np.searchsorted(all_stores, self.stores)
+
+        def grown(array: np.ndarray, fill) -> np.ndarray:
+            out = np.full((len(all_stores), *array.shape[1:]), fill, dtype=array.dtype)
+            out[old] = array
+            return out
+
+        self.mean = grown(self.mean, 0.0)
+        self.var = grown(self.var, 0.0)
+        self.count = grown(self.count, 0)
+        self.ring = grown(self.ring, np.nan)
+        self.last_day = grown(self.last_day, np.datetime64("NaT", "D"))
+        self.mix = grown(self.mix, 0.0)
+        self.stores = all_stores
+
+    def update(self, sales: pd.DataFrame) -> None:
+        """Score and then learn every new (store, day) in a batch, in day order."""
+        daily, mix, self.payment_types = daily_store_metrics(sales, self.payment_types)
+        if daily.empty:
+            return
+        self._grow(daily["store_id"].to_numpy())
+        positions = np.searchsorted(self.stores, daily["store_id"].to_numpy())
+        days = daily["day"].to_numpy().astype("datetime64[D]")
+        last = self.last_day[positions]
+        new = np.isnat(last) | (days > last)
+        daily, mix, positions, days = daily[new], mix[new], positions[new], days[new]
+        for day in np.unique(days):
+            rows = days == day
+            self._process_day(day, positions[rows], daily[rows], mix[rows])
+
+    def _process_day(
+        self, day: np.datetime64, pos: np.ndarray, daily: pd.DataFrame, mix: np.ndarray
+    ) -> None:
+        """Score the stores at ``pos`` on one day, then fold the day into their state."""
+        types = mix.shape[1]
+        usual = self.mix[pos, :types]
+        shift = np.where(self.count[pos] > 0, 0.5 * np.abs(mix - usual).sum(axis=1), 0.0)
+        values = np.column_stack([daily["sales"], daily["discount_rate"], shift])
+
+        scored = self.count[pos] >= MIN_HISTORY
+        if scored.any():
+            self._score(day, pos[scored], values[scored])
+
+        # EWMA mean/variance (incremental form), ring buffer and usual payment mix
+        first = (self.count[pos] == 0)[:, None]
+        delta = values - self.mean[pos]
+        self.mean[pos] = np.where(first, values, self.mean[pos] + self.alpha * delta)
+        self.var[pos] = np.where(
+            first, 0.0, (1 - self.alpha) * (self.var[pos] + self.alpha * delta**2)
+        )
+        self.ring[pos, :, self.count[pos] % self.window] = values
+        self.mix[pos, :types] = np.where(first, mix, usual + self.alpha * (mix - usual))
+        self.count[pos] += 1
+        self.last_day[pos] = day
+
+    def _score(self, day: np.datetime64, pos: np.ndarray, values: np.ndarray) -> None:
+        """Compare ``values`` (stores x METRICS) with the stored statistics; keep alerts."""
+        median = np.nanmedian(self.ring[pos], axis=2)
+        mad = np.nanmedian(np.abs(self.ring[pos] - median[:, :, None]), axis=2)
+        scale = np.maximum(1.4826 * mad, np.maximum(MAD_FLOOR * np.abs(median), 1e-9))
+        robust_z = (values - median) / scale
+        # The EWMA variance starts at 0, so correct its startup bias
+        var = self.var[pos] / (1 - (1 - self.alpha) ** (self.count[pos] - 1))[:, None]
+        ewma_sd = np.maximum(np.sqrt(var), np.maximum(MAD_FLOOR * np.abs(median), 1e-9))
+        ewma_z = (values - self.mean[pos]) / ewma_sd
+
+        one_sided = np.array([m in ONE_SIDED for m in METRICS])
+        robust = np.where(one_sided, robust_z, np.abs(robust_z))
+        ewma = np.where(one_sided, ewma_z, np.abs(ewma_z))
+        hits = (robust >= ROBUST_Z) & (ewma >= EWMA_Z)
+        rows, cols = np.nonzero(hits)
+        if not len(rows):
+            return
+        self.alerts.append(
+            pd.DataFrame(
+                {
+                    "sale_date": str(day),
+                    "store_id": self.stores[pos[rows]],
+                    "metric": np.array(METRICS)[cols],
+                    "value": values[rows, cols],
+                    "expected": median[rows, cols],
+                    "robust_z": robust_z[rows, cols].round(3),
+                    "ewma_z": ewma_z[rows, cols].round(3),
+                }
+            )
+        )
+
+    def pending_alerts(self) -> pd.DataFrame:
+        """Alerts raised since the last write_alerts()."""
+        if not self.alerts:
+            columns = ["sale_date", "store_id", "metric", "value", "expected", "robust_z"]
+            return pd.DataFrame(columns=[*columns, "ewma_z"])
+        return pd.concat(self.alerts, ignore_index=True)
+
+    def write_alerts(self, conn: sqlite3.Connection) -> int:
+        """Store pending alerts in store_anomaly_alert and return how many were written."""
+        cursor = conn.cursor()
+        create_alert_table(cursor)
+        alerts = self.pending_alerts()
+        alerts["detected_at"] = datetime.now().isoformat(timespec="seconds")
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO store_anomaly_alert ({', '.join(alerts.columns)}) "  # noqa: S608
+            f"VALUES ({', '.join('?' * len(alerts.columns))});",
+            alerts.astype(object).itertuples(index=False),
+        )
+        conn.commit()
+        self.alerts = []
+        return len(alerts)
+
+    def save(self, path: pathlib.Path = STATE_PATH) -> None:
+        """Store the running statistics in one .npz file."""
+        np.savez_compressed(
+            path,
+            alpha=self.alpha,
+            stores=self.stores,
+            payment_types=np.array(self.payment_types, dtype=str),
+            mean=self.mean,
+            var=self.var,
+            count=self.count,
+            ring=self.ring,
+            last_day=self.last_day,
+            mix=self.mix,
+        )
+
+    @classmethod
+    def load(cls, path: pathlib.Path = STATE_PATH) -> "StoreAnomalyDetector":
+        """Restore a detector written by save()."""
+        with np.load(path) as data:
+            detector = cls(float(data["alpha"]), data["ring"].shape[2])
+            detector.stores = data["stores"]
+            detector.payment_types = data["payment_types"].tolist()
+            detector.mean = data["mean"]
+            detector.var = data["var"]
+            detector.count = data["count"]
+            detector.ring = data["ring"]
+            detector.last_day = data["last_day"]
+            detector.mix = data["mix"]
+        return detector
+
+
+def main() -> None:
+    """Scan new sales in the DW and write alerts for unusual store days."""
+    parser = argparse.ArgumentParser(description="Flag unusual daily store sales in the DW.")
+    parser.add_argument("--full", action="store_true", help="Forget the state and rescan.")
+    args = parser.parse_args()
+
+    use_state = STATE_PATH.exists() and not args.full
+    detector = StoreAnomalyDetector.load() if use_state else StoreAnomalyDetector()
+    conn = sqlite3.connect(DB_PATH)
+    sales = pd.read_sql_query(
+        "SELECT sale_date, store_id, sale_amount, discount_percent, sale_payment_type FROM sales",
+        conn,
+    )
+    detector.update(sales)
+    alerts = detector.pending_alerts()
+    written = detector.write_alerts(conn)
+    conn.close()
+    detector.save()
+    print(f"Scored {len(detector.stores)} stores; {written} alerts written.")
+    if written:
+        print(alerts.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Approximate SUM / AVG / COUNT over sales with confidence intervals.
+
+The ETL keeps a stratified sample of the sales fact (``sales_sample``, one
+stratum per store x month, see etl_to_dw.refresh_sales_sample). Queries here
+aggregate the sample per stratum in SQLite, scale each stratum up by its
+population / sample size, and attach a normal-approximation confidence
+interval from the stratified variance estimator. AVG is estimated as the
+ratio SUM / COUNT with a linearized variance.
+
+If ``max_rel_error`` is given and any answer's interval half-width exceeds
+that share of the estimate, the query is rerun exactly on ``sales_base``.
+
+Filters and groupings use the ``sales_base`` column names (e.g. store_id,
+sale_date, sale_payment_type_key), since the sample is a copy of those rows.
+
+Usage:
+    approximate(conn, "sum", "net_revenue", where="sale_date >= ?", params=["2025-05-01"])
+    approximate(conn, "avg", "sale_amount", group_by="store_id", max_rel_error=0.05)
+"""
+
+import sqlite3
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+AGGREGATES = ("sum", "avg", "count")
+
+
+def _has_sample(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('sales_sample', 'sales_strata');"
+    ).fetchone()
+    return row[0] == 2
+
+
+def exact(
+    conn: sqlite3.Connection,
+    agg: str,
+    measure: str | None = None,
+    where: str | None = None,
+    params: list | tuple = (),
+    group_by: str | None = None,
+) -> pd.DataFrame:
+    """Evaluate the aggregate exactly on ``sales_base``."""
+    expr = f"{agg.upper()}({measure or '*'})"
+    select = f"{group_by}, " if group_by else ""
+    sql = f"SELECT {select}{expr} AS estimate FROM sales_base"  # noqa: S608
+    if where:
+        sql += f" WHERE {where}"
+    if group_by:
+        sql += f" GROUP BY {group_by} ORDER BY {group_by}"
+    df = pd.read_sql_query(sql, conn, params=list(params))
+    df["ci_low"] = df["ci_high"] = df["estimate"]
+    df["rel_error"] = 0.0
+    df["exact"] = True
+    return df
+
+
+def _stratum_sums(
+    conn: sqlite3.Connection,
+    agg: str,
+    measure: str | None,
+    where: str | None,
+    params: list | tuple,
+    group_by: str | None,
+) -> pd.DataFrame:
+    """Per (group, stratum) sums of y, y^2 and matching rows, with stratum sizes."""
+    if measure is None:
+        y, hit = "1.0", "1"
+    else:
+        y, hit = f"COALESCE({measure}, 0.0)", f"({measure} IS NOT NULL)"
+    group = f"{group_by} AS grp" if group_by else "0 AS grp"
+    sql = f"""
+        SELECT {group}, stratum,
+               SUM({y}) AS sy, SUM({y} * {y}) AS syy, SUM({hit}) AS c
+        FROM sales_sample
+        {f"WHERE {where}" if where else ""}
+        GROUP BY grp, stratum
+    """  # noqa: S608
+    sums = pd.read_sql_query(sql, conn, params=list(params))
+    strata = pd.read_sql_query("SELECT stratum, population, sample_size FROM sales_strata", conn)
+    return sums.merge(strata, on="stratum", how="left")
+
+
+def _stratified_total(df: pd.DataFrame, s: pd.Series, ss: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Return per-group (estimate, variance) of a total from per-stratum sums.
+
+    ``s`` and ``ss`` are the sample sums of the variable and of its square
+    (rows outside the filter count as zeros).
+    """
+    pop = df["population"].to_numpy(float)
+    n = df["sample_size"].to_numpy(float)
+    s, ss = s.to_numpy(float), ss.to_numpy(float)
+    s2 = np.where(n > 1, (ss - s * s / n) / np.maximum(n - 1, 1), 0.0)
+    parts = pd.DataFrame(
+        {
+            "grp": df["grp"].to_numpy(),
+            "est": pop / n * s,
+            "var": pop * pop * (1 - n / pop) * np.maximum(s2, 0.0) / n,
+        }
+    )
+    totals = parts.groupby("grp", dropna=False)[["est", "var"]].sum()
+    return totals["est"], totals["var"]
+
+
+def approximate(
+    conn: sqlite3.Connection,
+    agg: str,
+    measure: str | None = None,
+    where: str | None = None,
+    params: list | tuple = (),
+    group_by: str | None = None,
+    max_rel_error: float | None = None,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """Estimate SUM/AVG/COUNT(measure) over sales from the stratified sample.
+
+    Args:
+        conn: DW connection.
+        agg: "sum", "avg" or "count".
+        measure: Numeric sales_base column (may be None for COUNT(*)).
+        where: Optional SQL predicate over sales_base columns.
+        params: Parameters for ``where``.
+        group_by: Optional sales_base column to group by.
+        max_rel_error: Largest acceptable CI half-width / |estimate|; if any
+            group exceeds it, or has a zero estimate, the query is evaluated
+            exactly instead.
+        confidence: Confidence level of the intervals.
+
+    Returns:
+        pd.DataFrame: [group_by,] estimate, ci_low, ci_high, rel_error, exact.
+    """
+    agg = agg.lower()
+    if agg not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{agg}'. Choose from {AGGREGATES}.")
+    if agg != "count" and measure is None:
+        raise ValueError(f"{agg.upper()} needs a measure column.")
+    if not _has_sample(conn):
+        return exact(conn, agg, measure, where, params, group_by)
+
+    df = _stratum_sums(conn, agg, measure, where, params, group_by)
+    if df.empty:
+        return exact(conn, agg, measure, where, params, group_by)
+
+    if agg == "sum":
+        est, var = _stratified_total(df, df["sy"], df["syy"])
+    elif agg == "count":
+        est, var = _stratified_total(df, df["c"], df["c"])
+    else:
+        total, _ = _stratified_total(df, df["sy"], df["syy"])
+        count, _ = _stratified_total(df, df["c"], df["c"])
+        ratio = total / count.replace(0, np.nan)
+        # Linearized ratio variance: residuals z = hit * (y - R) per stratum
+        r = df["grp"].map(ratio).fillna(0.0)
+        sz = df["sy"] - r * df["c"]
+        szz = df["syy"] - 2 * r * df["sy"] + r * r * df["c"]
+        _, zvar = _stratified_total(df, sz, szz)
+        est, var = ratio, zvar / (count * count).replace(0, np.nan)
+
+    half = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(var)
+    result = pd.DataFrame(
+        {
+            "estimate": est,
+            "ci_low": est - half,
+            "ci_high": est + half,
+            "rel_error": half / est.abs().replace(0, np.nan),
+            "exact": False,
+        }
+    )
+    # A zero estimate has no relative error (NaN): the sample can't vouch for it
+    if max_rel_error is not None and not (result["rel_error"] <= max_rel_error).all():
+        return exact(conn, agg, measure, where, params, group_by)
+
+    if group_by:
+        return result.rename_axis(group_by).reset_index()
+    return result.reset_index(drop=True)
@@ -0,0 +1,87 @@
+"""Benchmark DataScrubber text cleaning: Python-object strings vs Arrow strings.
+
+Replicates the raw customers and sales files ``scale`` times and runs
+data_prep.clean_frame() on them twice:
+
+- object: text columns as Python objects (the scrubber's .str loop path)
+- arrow: text columns as Arrow-backed strings (Arrow compute kernels)
+
+and reports, per table and mode, the best-of-``repeat`` cleaning time, the
+peak RSS growth while cleaning and the in-memory size of the cleaned text.
+
+Usage (from project root):
+    python -m src.analytics_project.benchmark_arrow_strings [scale]
+"""
+
+import gc
+import sys
+import time
+
+import pandas as pd
+
+from src.analytics_project import data_prep
+from src.analytics_project.data_scrubber import is_text_column
+from src.analytics_project.memory import STAGE_REPORT, track_stage
+from src.analytics_project.quality_log import QUALITY_LOG
+
+TABLES = ("customers", "sales")
+
+
+def load_raw(table: str, scale: int) -> pd.DataFrame:
+    """Read one raw table and repeat its rows ``scale`` times.
+
+    A numeric ``Copy`` column keeps the copies from being dropped as duplicates.
+    """
+    raw = pd.read_csv(data_prep.RAW_DATA_DIR / data_prep.TABLE_FILES[table][0])
+    return pd.concat([raw.assign(Copy=i) for i in range(scale)], ignore_index=True)
+
+
+def as_object_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Return ``df`` with every text column stored as Python objects."""
+    text = [c for c in df.columns if is_text_column(df[c])]
+    return df.astype(dict.fromkeys(text, object))
+
+
+def text_mb(df: pd.DataFrame) -> float:
+    """Deep memory of the text columns in MB."""
+    text = [c for c in df.columns if is_text_column(df[c])]
+    return df[text].memory_usage(deep=True, index=False).sum() / 1e6
+
+
+def run(raw: pd.DataFrame, table: str, arrow_strings: bool, repeat: int = 3) -> dict:
+    """Clean ``raw`` ``repeat`` times; return best seconds, RSS growth and text size."""
+    best = float("inf")
+    rss_growth = 0.0
+    for _ in range(repeat):
+        gc.collect()
+        with track_stage(f"{table}_{'arrow' if arrow_strings else 'object'}"):
+            start = time.perf_counter()
+            cleaned = data_prep.clean_frame(raw, table, arrow_strings)
+            best = min(best, time.perf_counter() - start)
+        QUALITY_LOG.take()  # discard the benchmark's data-quality events
+        stage = STAGE_REPORT[-1]
+        if stage["peak_rss_mb"] is not None:
+            rss_growth = max(rss_growth, stage["peak_rss_mb"] - stage["start_rss_mb"])
+    return {"seconds": best, "rss_mb": rss_growth, "text_mb": text_mb(cleaned)}
+
+
+def main(scale: int = 200) -> None:
+    """Benchmark object vs Arrow string cleaning on ``scale`` copies of the raw tables."""
+    for table in TABLES:
+        raw = load_raw(table, scale)
+        print(f"{table}: {len(raw):,} rows")
+        results = {
+            "object": run(as_object_text(raw), table, arrow_strings=False),
+            "arrow": run(raw, table, arrow_strings=True),
+        }
+        for mode, r in results.items():
+            print(
+                f"  {mode:>6}: {r['seconds'] * 1000:8.1f} ms, "
+                f"peak RSS +{r['rss_mb']:6.1f} MB, cleaned text {r['text_mb']:6.1f} MB"
+            )
+        speedup = results["object"]["seconds"] / results["arrow"]["seconds"]
+        print(f"  arrow speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,116 @@
+"""Benchmark the DW with plain TEXT columns vs dictionary-encoded columns.
+
+Builds two temporary SQLite databases from the cleaned tables in data/clean/,
+with the sales rows replicated ``scale`` times:
+
+- encoded: the current schema (integer keys + lookup tables + views)
+- plain: the same rows copied into plain tables with repeated TEXT values
+
+and reports file size and GROUP BY timings for both.
+
+Usage (from project root):
+    python -m src.analytics_project.benchmark_dw_encoding [scale]
+"""
+
+from pathlib import Path
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from src.analytics_project import etl_to_dw
+from src.analytics_project.columnar_io import read_table
+
+QUERIES = {
+    "payment type (plain)": (
+        "plain",
+        "SELECT sale_payment_type, COUNT(*), SUM(sale_amount) FROM sales GROUP BY 1",
+    ),
+    "payment type (encoded view)": (
+        "encoded",
+        "SELECT sale_payment_type, COUNT(*), SUM(sale_amount) FROM sales GROUP BY 1",
+    ),
+    "payment type (encoded keys)": (
+        "encoded",
+        "SELECT sale_payment_type_key, COUNT(*), SUM(sale_amount) FROM sales_base GROUP BY 1",
+    ),
+    "customer region (plain)": (
+        "plain",
+        (
+            "SELECT c.region, SUM(s.sale_amount) FROM sales s "
+            "JOIN customer c ON c.customer_id = s.customer_id GROUP BY 1"
+        ),
+    ),
+    "customer region (encoded keys)": (
+        "encoded",
+        (
+            "SELECT c.region_key, SUM(s.sale_amount) FROM sales_base s "
+            "JOIN customer_base c ON c.customer_id = s.customer_id GROUP BY 1"
+        ),
+    ),
+}
+
+
+def build_encoded(path: Path, scale: int) -> None:
+    """Load the cleaned tables (sales replicated ``scale`` times) with the ETL."""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    etl_to_dw.create_schema(cursor)
+    etl_to_dw.insert_customers(read_table(etl_to_dw.CUSTOMERS_CLEAN), cursor)
+    etl_to_dw.insert_products(read_table(etl_to_dw.PRODUCTS_CLEAN), cursor)
+    sales = read_table(etl_to_dw.SALES_CLEAN)
+    sales["TransactionID"] = pd.to_numeric(sales["TransactionID"], errors="coerce")
+    sales = sales.dropna(subset=["TransactionID"]).drop_duplicates(subset=["TransactionID"])
+    step = int(sales["TransactionID"].max()) + 1
+    copies = []
+    for i in range(scale):
+        copy = sales.copy()
+        copy["TransactionID"] = copy["TransactionID"] + i * step
+        copies.append(copy)
+    etl_to_dw.insert_sales(pd.concat(copies, ignore_index=True), cursor)
+    conn.commit()
+    conn.execute("VACUUM;")
+    conn.close()
+
+
+def build_plain(encoded_path: Path, path: Path) -> None:
+    """Copy the decoded views of the encoded DB into plain TEXT tables."""
+    conn = sqlite3.connect(path)
+    conn.execute("ATTACH DATABASE ? AS src;", (str(encoded_path),))
+    for name in ("customer", "product", "sales"):
+        conn.execute(f"CREATE TABLE {name} AS SELECT * FROM src.{name};")  # noqa: S608
+    conn.commit()
+    conn.execute("DETACH DATABASE src;")
+    conn.execute("VACUUM;")
+    conn.close()
+
+
+def time_query(path: Path, sql: str, repeat: int = 5) -> float:
+    """Return the best-of-``repeat`` wall time in milliseconds."""
+    conn = sqlite3.connect(path)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    conn.close()
+    return best * 1000
+
+
+def main(scale: int = 50) -> None:
+    """Compare query times of plain and dictionary-encoded DW copies."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"encoded": Path(tmp) / "encoded.db", "plain": Path(tmp) / "plain.db"}
+        build_encoded(paths["encoded"], scale)
+        build_plain(paths["encoded"], paths["plain"])
+
+        for label, path in paths.items():
+            print(f"{label:>8} DB size: {path.stat().st_size / 1024:,.0f} KiB")
+        for label, (db, sql) in QUERIES.items():
+            print(f"{label:<32} {time_query(paths[db], sql):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,130 @@
+"""Benchmark DataScrubber string transforms: every row vs distinct values only.
+
+Repeats columns of the raw customers and sales files ``scale`` times and
+applies two transforms (lower/trim, and a canonical-value mapping of
+payment-type spellings) three ways:
+
+- per-row: the transform runs over every row (the old scrubber path),
+- unique: unique_value_transform() transforms the distinct values once and
+  rebuilds the column from codes ('category' output when low-cardinality),
+- scrubber: what DataScrubber now does (transform_text_column(): unique
+  values, or per-row when a sample says the column is near-unique);
+
+for both Python-object and Arrow-backed strings. Columns range from a few
+distinct values (Region, SalePaymentType) to almost one per row
+(TransactionID), so the overhead of factorizing shows up too.
+
+Usage (from project root):
+    python -m src.analytics_project.benchmark_unique_transforms [scale]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+from src.analytics_project import data_prep
+from src.analytics_project.data_scrubber import (
+    arrow_string_dtype,
+    arrow_string_transform,
+    is_arrow_string,
+    transform_text_column,
+    unique_value_transform,
+)
+from src.analytics_project.validation import VALID_PAYMENT_TYPES
+
+# Table -> columns benchmarked
+COLUMNS: dict[str, list[str]] = {
+    "customers": ["Region", "CustomerStatus", "Name"],
+    "sales": ["SalePaymentType", "SaleDate", "TransactionID"],
+}
+
+
+def load_column(table: str, column: str, scale: int) -> pd.Series:
+    """Read one raw column repeated ``scale`` times.
+
+    The copy number is appended to every other copy's values so
+    high-cardinality columns stay high-cardinality.
+    """
+    raw = pd.read_csv(data_prep.RAW_DATA_DIR / data_prep.TABLE_FILES[table][0])[column]
+    unique_ids = raw.nunique() > len(raw) // 2
+    copies = [raw.astype(str) + (f"-{i}" if unique_ids else "") for i in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+# Spelling key (lowercase letters only) -> payment type, for the canonical transform
+CANONICAL_PAYMENT_TYPES: dict[str, str] = {
+    "".join(filter(str.isalpha, t.lower())): t for t in VALID_PAYMENT_TYPES
+}
+
+
+def lower_trim(values: pd.Series) -> pd.Series:
+    """Lowercase and trim (Arrow kernels for Arrow-backed strings)."""
+    if is_arrow_string(values):
+        return arrow_string_transform(values, "utf8_lower", "utf8_trim_whitespace")
+    return values.astype(str).str.lower().str.strip()
+
+
+def canonical(values: pd.Series) -> pd.Series:
+    """Payment-type style canonical mapping (regex key + dictionary lookup)."""
+    key = values.astype(str).str.lower().str.replace(r"[^a-z]", "", regex=True)
+    return key.map(CANONICAL_PAYMENT_TYPES).fillna(values).astype(object)
+
+
+TRANSFORMS = {"lower/trim": lower_trim, "canonical": canonical}
+
+
+def per_row(series: pd.Series, transform) -> pd.Series:
+    """Transform every non-missing row (the previous scrubber path)."""
+    if is_arrow_string(series):
+        return transform(series)
+    result = series.copy()
+    mask = series.notnull()
+    result.loc[mask] = transform(series[mask])
+    return result
+
+
+def unique(series: pd.Series, transform) -> pd.Series:
+    """Transform each distinct value once and map the results back."""
+    return unique_value_transform(series, transform, categorical=None)
+
+
+def scrubber(series: pd.Series, transform) -> pd.Series:
+    """Transform through the DataScrubber helper (picks the path itself)."""
+    return transform_text_column(series, transform)
+
+
+def best_seconds(func, series: pd.Series, transform, repeat: int = 3) -> float:
+    """Return the fastest of ``repeat`` runs of ``func(series, transform)``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(series, transform)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(scale: int = 200) -> None:
+    """Time every transform path on ``scale`` copies of each text column."""
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            values = load_column(table, column, scale)
+            print(f"{table}.{column}: {len(values):,} rows, {values.nunique():,} distinct")
+            for mode, dtype in (("object", object), ("arrow", arrow_string_dtype())):
+                series = values.astype(dtype)
+                for name, transform in TRANSFORMS.items():
+                    rows = best_seconds(per_row, series, transform)
+                    uniq = best_seconds(unique, series, transform)
+                    scrub = best_seconds(scrubber, series, transform)
+                    out = scrubber(series, transform)
+                    before = per_row(series, transform).memory_usage(deep=True) / 1e6
+                    print(
+                        f"  {mode:>6} {name:>10}: per-row {rows * 1000:7.1f} ms, "
+                        f"unique {uniq * 1000:7.1f} ms, scrubber {scrub * 1000:7.1f} ms "
+                        f"({rows / scrub:4.1f}x); {out.dtype} "
+                        f"{out.memory_usage(deep=True) / 1e6:5.1f} MB (per-row {before:5.1f} MB)"
+                    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,308 @@
+"""Monthly cohort retention and revenue matrices over the DW.
+
+Customers are grouped into cohorts by join month. For every sale the cohort
+month and the months since joining are turned into integer month indexes
+(``year * 12 + month - 1``), so a sale's matrix cell is one packed integer
+and the matrices are built with ``np.unique``/``np.bincount`` instead of a
+pandas pivot. The sales fact is read in CHUNK_ROWS chunks (keyset-paginated
+on transaction_id), so memory is bounded by a chunk plus the distinct
+customer-months of the refresh.
+
+Tables written:
+
+- ``cohort_retention``: one row per (cohort_month, months_since_join) with
+  active customers, revenue, cohort size and retention rate,
+- ``cohort_activity``: the distinct (customer_id, activity_month) pairs
+  already counted, so an incremental refresh counts each customer once per
+  month,
+- ``cohort_state``: the highest transaction_id processed.
+
+Incremental refresh (the default once the tables exist) only reads sales
+above the stored transaction_id, e.g. a newly loaded month, and adds them to
+the stored matrices. Use ``full=True`` after a reload that rewrote older
+sales or changed join dates.
+
+Usage (from project root):
+    python -m src.analytics_project.cohort          # incremental (full on first run)
+    python -m src.analytics_project.cohort --full
+"""
+
+import argparse
+from datetime import datetime
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.dim_cache import DimensionIndex
+from src.analytics_project.etl_to_dw import DB_PATH
+
+# Sales rows read per chunk
+CHUNK_ROWS = 200_000
+
+# Sales columns read by scan_sales()
+SALES_COLUMNS = ("transaction_id", "customer_id", "sale_date", "net_revenue")
+
+# Packing strides: cell = cohort * AGE_STRIDE + age, key = customer * MONTH_STRIDE + month
+AGE_STRIDE = 1 << 12
+MONTH_STRIDE = 1 << 16
+
+
+def create_cohort_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the retention, activity and state tables if needed."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cohort_retention (
+        cohort_month TEXT,
+        months_since_join INTEGER,
+        active_customers INTEGER,
+        revenue REAL,
+        cohort_size INTEGER,
+        retention_rate REAL,
+        PRIMARY KEY (cohort_month, months_since_join)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cohort_activity (
+        customer_id INTEGER,
+        activity_month INTEGER,
+        PRIMARY KEY (activity_month, customer_id)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cohort_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_transaction_id INTEGER,
+        refreshed_at TEXT
+    );
+    """)
+
+
+def month_index(dates: pd.Series) -> np.ndarray:
+    """Return year * 12 + month - 1 per date string (-1 if unparseable)."""
+    parsed = pd.to_datetime(dates, errors="coerce", format="mixed")
+    index = (parsed.dt.year * 12 + parsed.dt.month - 1).to_numpy(float)
+    return np.nan_to_num(index, nan=-1).astype(np.int64)
+
+
+def month_label(index: np.ndarray) -> np.ndarray:
+    """Format month indexes as 'YYYY-MM'."""
+    index = np.asarray(index, dtype=np.int64)
+    return np.array([f"{i // 12:04d}-{i % 12 + 1:02d}" for i in index], dtype=object)
+
+
+def load_cohorts(conn: sqlite3.Connection) -> tuple[DimensionIndex, np.ndarray]:
+    """Return an index over customer_id and each customer's cohort month index."""
+    customers = pd.read_sql_query("SELECT customer_id, join_date FROM customer_base", conn)
+    index = DimensionIndex(customers["customer_id"].to_numpy(np.int64))
+    return index, month_index(customers["join_date"])
+
+
+def iter_sales_chunks(
+    conn: sqlite3.Connection,
+    after_id: int | None,
+    chunk_rows: int = CHUNK_ROWS,
+    columns: tuple[str, ...] = SALES_COLUMNS,
+):
+    """Yield sales chunks with transaction_id > ``after_id``, in id order.
+
+    ``columns`` are read from sales_base and must include transaction_id.
+    """
+    last = after_id if after_id is not None else -(1 << 62)
+    while True:
+        chunk = pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM sales_base "  # noqa: S608
+            "WHERE transaction_id > ? ORDER BY transaction_id LIMIT ?",
+            conn,
+            params=[last, chunk_rows],
+        )
+        if chunk.empty:
+            return
+        last = int(chunk["transaction_id"].iloc[-1])
+        yield chunk
+
+
+def _accumulate(codes: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sum ``weights`` per distinct code."""
+    unique, inverse = np.unique(codes, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights)
+
+
+def scan_sales(
+    conn: sqlite3.Connection,
+    index: DimensionIndex,
+    cohorts: np.ndarray,
+    after_id: int | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> dict:
+    """Accumulate revenue cells and distinct customer-months over new sales.
+
+    Returns:
+        dict: cells / revenue (packed cohort-age codes and sums), keys (sorted
+        distinct customer_id * MONTH_STRIDE + month), rows, skipped (sales
+        with an unknown customer, an unparseable date or a date before the
+        join month) and last_transaction_id.
+    """
+    cells = np.empty(0, dtype=np.int64)
+    revenue = np.empty(0)
+    keys = np.empty(0, dtype=np.int64)
+    rows = skipped = 0
+    last_id = after_id
+    for chunk in iter_sales_chunks(conn, after_id, chunk_rows):
+        rows += len(chunk)
+        last_id = int(chunk["transaction_id"].iloc[-1])
+        customer_ids = chunk["customer_id"].fillna(-1).to_numpy(np.int64)
+        positions = index.positions(customer_ids)
+        sale_month = month_index(chunk["sale_date"])
+        cohort = np.where(positions >= 0, cohorts[np.maximum(positions, 0)], -1)
+        age = sale_month - cohort
+        valid = (positions >= 0) & (cohort >= 0) & (sale_month >= 0) & (age >= 0)
+        skipped += int((~valid).sum())
+
+        chunk_cells = cohort[valid] * AGE_STRIDE + age[valid]
+        amounts = np.nan_to_num(chunk["net_revenue"].to_numpy(float)[valid])
+        cells, revenue = _accumulate(
+            np.concatenate([cells, chunk_cells]), np.concatenate([revenue, amounts])
+        )
+        keys = np.union1d(keys, customer_ids[valid] * MONTH_STRIDE + sale_month[valid])
+    return {
+        "cells": cells,
+        "revenue": revenue,
+        "keys": keys,
+        "rows": rows,
+        "skipped": skipped,
+        "last_transaction_id": last_id,
+    }
+
+
+def _new_activity(conn: sqlite3.Connection, keys: np.ndarray) -> np.ndarray:
+    """Return the keys not yet in cohort_activity (only their months are read)."""
+    months = np.unique(keys % MONTH_STRIDE)
+    seen = []
+    for month in months.tolist():
+        ids = pd.read_sql_query(
+            "SELECT customer_id FROM cohort_activity WHERE activity_month = ?",
+            conn,
+            params=[month],
+        )["customer_id"].to_numpy(np.int64)
+        seen.append(ids * MONTH_STRIDE + month)
+    return np.setdiff1d(keys, np.concatenate(seen)) if seen else keys
+
+
+def refresh_cohorts(
+    conn: sqlite3.Connection, full: bool = False, chunk_rows: int = CHUNK_ROWS
+) -> dict:
+    """Refresh the cohort tables and return the refresh stats.
+
+    Args:
+        conn: DW connection.
+        full: Rebuild from every sale instead of only sales above the stored
+            transaction_id.
+        chunk_rows: Sales rows per chunk.
+    """
+    cursor = conn.cursor()
+    create_cohort_tables(cursor)
+    state = cursor.execute("SELECT last_transaction_id FROM cohort_state WHERE id = 1;").fetchone()
+    incremental = not full and state is not None
+    if not incremental:
+        cursor.execute("DELETE FROM cohort_retention;")
+        cursor.execute("DELETE FROM cohort_activity;")
+
+    index, cohorts = load_cohorts(conn)
+    scan = scan_sales(conn, index, cohorts, state[0] if incremental else None, chunk_rows)
+
+    # Distinct customers: only customer-months not counted by earlier refreshes
+    new_keys = _new_activity(conn, scan["keys"]) if incremental else scan["keys"]
+    customer_ids, months = new_keys // MONTH_STRIDE, new_keys % MONTH_STRIDE
+    cursor.executemany(
+        "INSERT INTO cohort_activity (customer_id, activity_month) VALUES (?, ?);",
+        zip(customer_ids.tolist(), months.tolist(), strict=True),
+    )
+    key_cohorts = cohorts[index.positions(customer_ids)]
+    active_cells, active = _accumulate(
+        key_cohorts * AGE_STRIDE + (months - key_cohorts), np.ones(len(new_keys))
+    )
+
+    # Merge the new counts and revenue into the stored matrix (cohorts x ages is small)
+    added = pd.concat(
+        [
+            pd.DataFrame({"cell": active_cells, "active_customers": active, "revenue": 0.0}),
+            pd.DataFrame(
+                {"cell": scan["cells"], "active_customers": 0.0, "revenue": scan["revenue"]}
+            ),
+        ]
+    )
+    stored = pd.read_sql_query(
+        "SELECT cohort_month, months_since_join, active_customers, revenue FROM cohort_retention",
+        conn,
+    )
+    stored_month = month_index(stored["cohort_month"] + "-01")
+    stored["cell"] = stored_month * AGE_STRIDE + stored["months_since_join"].to_numpy(np.int64)
+    stored = stored[["cell", "active_customers", "revenue"]].astype(
+        {"cell": np.int64, "active_customers": float, "revenue": float}
+    )
+    matrix = pd.concat([stored, added]).groupby("cell", as_index=False).sum()
+
+    cell = matrix["cell"].to_numpy(np.int64)
+    cohort_month, age = cell // AGE_STRIDE, cell % AGE_STRIDE
+    active = matrix["active_customers"].to_numpy(np.int64)
+    valid = cohorts >= 0
+    offset = int(cohorts[valid].min()) if valid.any() else 0
+    sizes = np.bincount(cohorts[valid] - offset) if valid.any() else np.zeros(1, dtype=np.int64)
+    size_pos = cohort_month - offset
+    in_range = (size_pos >= 0) & (size_pos < len(sizes))
+    cohort_size = np.where(in_range, sizes[np.clip(size_pos, 0, len(sizes) - 1)], 0)
+    table = pd.DataFrame(
+        {
+            "cohort_month": month_label(cohort_month),
+            "months_since_join": age,
+            "active_customers": active,
+            "revenue": matrix["revenue"].to_numpy(float),
+            "cohort_size": cohort_size,
+            "retention_rate": np.where(
+                cohort_size > 0, active / np.maximum(cohort_size, 1), np.nan
+            ).round(4),
+        }
+    )
+    cursor.execute("DELETE FROM cohort_retention;")
+    cursor.executemany(
+        f"INSERT INTO cohort_retention VALUES ({', '.join('?' * len(table.columns))});",  # noqa: S608
+        table.astype(object).where(table.notna(), None).itertuples(index=False),
+    )
+    cursor.execute(
+        "INSERT OR REPLACE INTO cohort_state VALUES (1, ?, ?);",
+        (scan["last_transaction_id"], datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.commit()
+    return {
+        "incremental": incremental,
+        "sales_read": scan["rows"],
+        "sales_skipped": scan["skipped"],
+        "new_customer_months": len(new_keys),
+        "cells": len(table),
+    }
+
+
+def retention_matrix(conn: sqlite3.Connection, value: str = "retention_rate") -> pd.DataFrame:
+    """Return ``value`` as a cohort_month x months_since_join matrix."""
+    df = pd.read_sql_query(
+        f"SELECT cohort_month, months_since_join, {value} FROM cohort_retention",  # noqa: S608
+        conn,
+    )
+    return df.pivot(index="cohort_month", columns="months_since_join", values=value)
+
+
+def main() -> None:
+    """Refresh the cohort retention tables in the DW."""
+    parser = argparse.ArgumentParser(description="Refresh cohort retention tables in the DW.")
+    parser.add_argument("--full", action="store_true", help="Rebuild from every sale.")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    stats = refresh_cohorts(conn, full=args.full)
+    print(f"Cohort refresh: {stats}")
+    print(retention_matrix(conn).iloc[:12, :13].to_string())
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Binary columnar storage for the data/clean and data/prepared layers.
+
+CSV loses dtypes (IDs become floats, dates become long strings such as
+``2025-05-04 00:00:00.000000``) and every downstream stage pays to parse it
+again. Tables here are written in a binary columnar format instead:
+
+- ``npy``: one ``.npy`` file per column plus ``schema.json`` in a
+  ``<name>.npcols/`` folder. Needs only NumPy; numeric and datetime columns
+  are memory-mapped on read (zero-copy), text is stored as category codes
+  plus the distinct values with their types (ints stay ints, dates dates).
+- ``parquet`` / ``feather``: via pyarrow, when it is installed. Feather is
+  memory-mapped on read.
+- ``csv``: kept as an export option.
+
+A table is addressed by its path without extension (e.g.
+``data/clean/sales_cleaned``); read_table() reads the most recently written
+format, so a stale ``.npcols`` never hides a regenerated CSV.
+
+Usage:
+    write_table(df, CLEAN_DATA_DIR / "sales_cleaned")
+    df = read_table(CLEAN_DATA_DIR / "sales_cleaned")
+"""
+
+import datetime
+import json
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+# Formats read_table() looks for (this order breaks modification-time ties)
+FORMATS: dict[str, str] = {
+    "npy": ".npcols",
+    "feather": ".feather",
+    "parquet": ".parquet",
+    "csv": ".csv",
+}
+
+# Default output format for the intermediate layers (override with the
+# SMART_STORE_FORMAT environment variable, e.g. "csv" for the old behavior)
+DEFAULT_FORMAT: str = os.environ.get("SMART_STORE_FORMAT", "npy")
+
+
+_MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def _require_pyarrow(fmt: str) -> None:
+    """Raise a clear error if pyarrow (needed for parquet/feather) is missing."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            f"The '{fmt}' format needs pyarrow (uv add pyarrow); use 'npy' or 'csv' instead."
+        ) from e
+
+
+def table_path(stem: pathlib.Path, fmt: str) -> pathlib.Path:
+    """Return the on-disk path of a table stored in ``fmt``."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from {list(FORMATS)}.")
+    stem = pathlib.Path(stem)
+    return stem.with_name(stem.name + FORMATS[fmt])
+
+
+def _encode_value(value):
+    """JSON form of one distinct value of a text/mixed column, keeping its type."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return {"datetime": pd.Timestamp(value).isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    raise TypeError(f"Can't store a {type(value).__name__} value in the npy format.")
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "datetime" in value:
+            return pd.Timestamp(value["datetime"])
+        return datetime.date.fromisoformat(value["date"])
+    return value
+
+
+def _write_uniques(uniques: pd.Index, folder: pathlib.Path, entry: dict) -> None:
+    """Store the distinct values with their dtype: an .npy array, or typed JSON."""
+    if uniques.dtype != object and not isinstance(uniques.dtype, pd.StringDtype):
+        if not isinstance(uniques.dtype, np.dtype):
+            uniques = pd.Index(uniques.to_numpy())  # e.g. tz-aware -> Timestamps
+        if uniques.dtype != object:
+            entry["categories_file"] = f"{entry['file']}.categories"
+            np.save(folder / f"{entry['categories_file']}.npy", uniques.to_numpy())
+            return
+    if uniques.dtype != object:
+        entry["categories_dtype"] = str(uniques.dtype)
+    entry["categories"] = [_encode_value(v) for v in uniques]
+
+
+def _read_uniques(folder: pathlib.Path, entry: dict) -> pd.Index:
+    if "categories_file" in entry:
+        return pd.Index(np.load(folder / f"{entry['categories_file']}.npy"))
+    values = [_decode_value(v) for v in entry["categories"]]
+    return pd.Index(values, dtype=entry.get("categories_dtype", object))
+
+
+def _write_npy(df: pd.DataFrame, folder: pathlib.Path) -> None:
+    """Write each column as .npy (plus a mask for nullable ints) and a schema."""
+    folder.mkdir(parents=True, exist_ok=True)
+    schema = {"rows": len(df), "columns": []}
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {"name": str(col), "file": f"c{i}"}
+        if isinstance(series.dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+        ):
+            # Text (or mixed) columns: integer codes + the typed distinct values
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry["kind"] = "category"
+                codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                entry["kind"] = "text"
+                entry["dtype"] = str(series.dtype)
+                codes, uniques = pd.factorize(series)
+                uniques = pd.Index(uniques)
+            _write_uniques(uniques, folder, entry)
+            np.save(folder / f"c{i}.npy", codes.astype(np.int32))
+        elif isinstance(series.array, _MASKED_ARRAYS):
+            # Nullable Int64/Float64/boolean: values plus a missing-value mask
+            entry["kind"] = "masked"
+            entry["dtype"] = str(series.dtype)
+            numpy_dtype = series.dtype.numpy_dtype
+            np.save(
+                folder / f"c{i}.npy", series.to_numpy(numpy_dtype, na_value=numpy_dtype.type(0))
+            )
+            np.save(folder / f"c{i}.mask.npy", series.isna().to_numpy())
+        else:
+            entry["kind"] = "numpy"
+            np.save(folder / f"c{i}.npy", series.to_numpy())
+        schema["columns"].append(entry)
+    (folder / "schema.json").write_text(json.dumps(schema, indent=2), encoding="utf-8")
+
+
+def _read_npy(folder: pathlib.Path, mmap: bool, columns: list[str] | None) -> pd.DataFrame:
+    """Read a table written by _write_npy, memory-mapping numeric columns."""
+    schema = json.loads((folder / "schema.json").read_text(encoding="utf-8"))
+    mode = "r" if mmap else None
+    data = {}
+    for entry in schema["columns"]:
+        if columns is not None and entry["name"] not in columns:
+            continue
+        values = np.load(folder / f"{entry['file']}.npy", mmap_mode=mode)
+        if entry["kind"] in ("category", "text"):
+            uniques = _read_uniques(folder, entry)
+            if entry["kind"] == "category":
+                data[entry["name"]] = pd.Categorical.from_codes(np.asarray(values), uniques)
+            else:
+                column = pd.api.extensions.take(uniques.array, np.asarray(values), allow_fill=True)
+                dtype = entry.get("dtype", "object")
+                dtype = object if dtype == "object" else dtype
+                data[entry["name"]] = pd.Series(column).astype(dtype)
+        elif entry["kind"] == "masked":
+            mask = np.load(folder / f"{entry['file']}.mask.npy", mmap_mode=mode)
+            dtype = pd.api.types.pandas_dtype(entry["dtype"])
+            data[entry["name"]] = dtype.construct_array_type()(values, mask)
+        else:
+            data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def write_table(df: pd.DataFrame, stem: pathlib.Path, fmt: str | None = None) -> pathlib.Path:
+    """Write ``df`` to ``stem`` + the format's extension and return the path.
+
+    Args:
+        df: Table to write.
+        stem: Path without extension, e.g. data/clean/sales_cleaned.
+        fmt: "npy", "parquet", "feather" or "csv" (defaults to DEFAULT_FORMAT).
+    """
+    fmt = fmt or DEFAULT_FORMAT
+    path = table_path(stem, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "npy":
+        _write_npy(df, path)
+    elif fmt == "parquet":
+        _require_pyarrow(fmt)
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        _require_pyarrow(fmt)
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def _written_at(path: pathlib.Path) -> float:
+    """Modification time of a stored table (schema.json is the last npy file written)."""
+    return (path / "schema.json" if path.is_dir() else path).stat().st_mtime
+
+
+def find_table(stem: pathlib.Path) -> tuple[pathlib.Path, str]:
+    """Return (path, format) of the most recently written version of a table."""
+    found = [(table_path(stem, fmt), fmt) for fmt in FORMATS if table_path(stem, fmt).exists()]
+    if found:
+        return max(found, key=lambda item: _written_at(item[0]))
+    raise FileNotFoundError(f"No stored table found for {stem} ({', '.join(FORMATS.values())}).")
+
+
+def read_table(
+    stem: pathlib.Path, fmt: str | None = None, mmap: bool = True, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """Read a table written by write_table(), zero-copy where the format allows.
+
+    Args:
+        stem: Path without extension.
+        fmt: Format to read; by default the most recently written one.
+        mmap: Memory-map npy columns and feather files instead of loading them.
+        columns: Optional subset of columns to read.
+    """
+    if fmt is None:
+        path, fmt = find_table(stem)
+    else:
+        path = table_path(stem, fmt)
+    if fmt == "npy":
+        return _read_npy(path, mmap, columns)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        return pd.read_parquet(path, columns=columns)
+    if fmt == "feather":
+        _require_pyarrow(fmt)
+        from pyarrow import feather
+
+        return feather.read_table(path, columns=columns, memory_map=mmap).to_pandas()
+    return pd.read_csv(path, usecols=columns)
@@ -5,25 +5,58 @@
 
 # Imports after the opening docstring
 
+from functools import partial
+import os
 import pathlib
 import pandas as pd
 
 # Absolute imports instead of relative
 from src.utils.logger import init_logger, logger, project_root
-from src.analytics_project.data_scrubber import DataScrubber
+from src.analytics_project.data_scrubber import DataScrubber, is_text_column
+from src.analytics_project.columnar_io import write_table
+from src.analytics_project.ingest import find_shards, ingest_files
+from src.analytics_project.profiling import profile_stage
+from src.analytics_project.quality_log import flush, record
+from src.analytics_project.memory import MEMORY_BUDGET_MB, downcast, read_csv_within_budget
 
 # Set up paths as constants
 DATA_DIR: pathlib.Path = project_root.joinpath("data")
 RAW_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("raw")
-CLEAN_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("clean")  # New folder for cleaned CSVs
+CLEAN_DATA_DIR: pathlib.Path = DATA_DIR.joinpath("clean")  # New folder for cleaned tables
+
+# Clean text columns as Arrow-backed strings with Arrow compute kernels
+# (SMART_STORE_ARROW_STRINGS=1 or the pipeline's --arrow-strings; needs pyarrow)
+ARROW_STRINGS: bool = os.environ.get("SMART_STORE_ARROW_STRINGS", "") not in ("", "0")
+
+# Low-cardinality text columns kept as pandas 'category' in memory
+# (the DW stores the same columns as dictionary-encoded integer keys)
+CATEGORY_COLUMNS: list[str] = [
+    "Region",
+    "CustomerStatus",
+    "Category",
+    "ProductSupplierRegion",
+    "SalePaymentType",
+]
+
+
+def convert_category_columns(scrubber: DataScrubber) -> DataScrubber:
+    """Convert any CATEGORY_COLUMNS present in the scrubber's DataFrame to category dtype."""
+    for col in CATEGORY_COLUMNS:
+        if col in scrubber.get_df().columns:
+            scrubber.convert_column_to_new_data_type(col, "category")
+    return scrubber
 
 
 # Define a reusable function that accepts a full path.
-def read_and_log(path: pathlib.Path) -> pd.DataFrame:
-    """Read a CSV at the given path into a DataFrame, with friendly logging."""
+def read_and_log(path: pathlib.Path, budget_mb: float | None = None) -> pd.DataFrame:
+    """Read a CSV at the given path into a DataFrame, with friendly logging.
+
+    With a memory budget the file is read in chunks with compact numeric
+    dtypes (text stays text for the string cleaning steps).
+    """
     try:
         logger.info(f"Reading raw data from {path}.")
-        df = pd.read_csv(path)
+        df = read_csv_within_budget(path, budget_mb, category_ratio=0)
         logger.info(
             f"{path.name}: loaded DataFrame with shape {df.shape[0]} rows x {df.shape[1]} cols"
         )
@@ -36,56 +69,104 @@ def read_and_log(path: pathlib.Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def main() -> None:
-    """Process raw data and clean it using DataScrubber."""
-    logger.info("Starting data preparation...")
-
-    # Build explicit paths for each file under data/raw
-    customer_path = RAW_DATA_DIR.joinpath("customers_data.csv")
-    product_path = RAW_DATA_DIR.joinpath("products_data.csv")
-    sales_path = RAW_DATA_DIR.joinpath("sales_data.csv")
-
-    # Prepare output folder
-    CLEAN_DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-    # ----------------------------
-    # Process Customers
-    # ----------------------------
-    df_customers = read_and_log(customer_path)
-    scrubber = DataScrubber(df_customers)
-    scrubber.handle_missing_data(fill_value="Unknown")
-    scrubber.remove_duplicate_records()
-    for col in scrubber.get_df().select_dtypes(include='object').columns:
-        scrubber.format_column_strings_to_lower_and_trim(col)
-    # Only rename if needed; 'CustomerID' already exists
-    scrubber.get_df().to_csv(CLEAN_DATA_DIR.joinpath("customers_cleaned.csv"), index=False)
-    logger.info("Saved cleaned customers data to clean folder.")
-
-    # ----------------------------
-    # Process Products
-    # ----------------------------
-    df_products = read_and_log(product_path)
-    scrubber = DataScrubber(df_products)
-    scrubber.handle_missing_data(fill_value="Unknown")
-    scrubber.remove_duplicate_records()
-    for col in scrubber.get_df().select_dtypes(include='object').columns:
-        scrubber.format_column_strings_to_lower_and_trim(col)
-    scrubber.get_df().to_csv(CLEAN_DATA_DIR.joinpath("products_cleaned.csv"), index=False)
-    logger.info("Saved cleaned products data to clean folder.")
-
-    # ----------------------------
-    # Process Sales
-    # ----------------------------
-    df_sales = read_and_log(sales_path)
-    scrubber = DataScrubber(df_sales)
+# Raw file -> cleaned table name (extension depends on the output format)
+TABLE_FILES: dict[str, tuple[str, str]] = {
+    "customers": ("customers_data.csv", "customers_cleaned"),
+    "products": ("products_data.csv", "products_cleaned"),
+    "sales": ("sales_data.csv", "sales_cleaned"),
+}
+
+
+def clean_frame(
+    df: pd.DataFrame, table: str = "data", arrow_strings: bool | None = None
+) -> pd.DataFrame:
+    """Apply the shared DataScrubber cleaning steps and return the cleaned DataFrame.
+
+    Missing values and duplicates are recorded in the data-quality log under
+    stage ``clean_<table>``. With ``arrow_strings`` (default: ARROW_STRINGS)
+    text columns are cleaned as Arrow-backed strings.
+    """
+    arrow_strings = ARROW_STRINGS if arrow_strings is None else arrow_strings
+    stage = f"clean_{table}"
+    for col in df.columns[df.isna().any()]:
+        record(stage, "missing_filled", col, df[col].isna(), df)
+    record(stage, "duplicate_rows", None, df.duplicated(), df)
+    scrubber = DataScrubber(df, arrow_strings=arrow_strings)
     scrubber.handle_missing_data(fill_value="Unknown")
     scrubber.remove_duplicate_records()
-    for col in scrubber.get_df().select_dtypes(include='object').columns:
-        scrubber.format_column_strings_to_lower_and_trim(col)
+    text_columns = [c for c in scrubber.get_df().columns if is_text_column(scrubber.get_df()[c])]
+    for col in text_columns:
+        # CATEGORY_COLUMNS come back as 'category' straight from the codes
+        scrubber.format_column_strings_to_lower_and_trim(col, col in CATEGORY_COLUMNS)
+    convert_category_columns(scrubber)
     if 'sale_date' in scrubber.get_df().columns:
         scrubber.parse_dates_to_add_standard_datetime('sale_date')
-    scrubber.get_df().to_csv(CLEAN_DATA_DIR.joinpath("sales_cleaned.csv"), index=False)
-    logger.info("Saved cleaned sales data to clean folder.")
+    return scrubber.get_df()
+
+
+def clean_all(
+    budget_mb: float | None = None, arrow_strings: bool | None = None
+) -> tuple[dict[str, pd.DataFrame], pd.DataFrame]:
+    """Read every raw table and return the cleaned DataFrames, keyed by table name.
+
+    If data/raw/sales/ holds sharded sales files, those are cleaned in
+    parallel (see ingest.py) instead of the single sales_data.csv.
+
+    Args:
+        budget_mb: Memory budget (defaults to memory.MEMORY_BUDGET_MB). When
+            set, raw files are read in chunks and cleaned tables are downcast.
+        arrow_strings: Clean text as Arrow-backed strings (defaults to ARROW_STRINGS).
+
+    Returns:
+        tuple: (cleaned DataFrames by table, per-file ingest stats of the
+        sharded sales files; empty when sales came from one file).
+    """
+    budget_mb = budget_mb or MEMORY_BUDGET_MB
+    arrow_strings = ARROW_STRINGS if arrow_strings is None else arrow_strings
+    cleaned = {}
+    ingest_stats = pd.DataFrame()
+    for table, (raw_name, _) in TABLE_FILES.items():
+        shards = find_shards() if table == "sales" else []
+        with profile_stage(f"clean_{table}"):
+            if shards:
+                clean = partial(clean_frame, table=table, arrow_strings=arrow_strings)
+                df, ingest_stats = ingest_files(shards, clean)
+            else:
+                raw = read_and_log(RAW_DATA_DIR.joinpath(raw_name), budget_mb)
+                df = clean_frame(raw, table, arrow_strings)
+            cleaned[table] = downcast(df) if budget_mb else df
+        flush(f"clean_{table}")
+    return cleaned, ingest_stats
+
+
+def log_ingest_stats(stats: pd.DataFrame) -> None:
+    """Log the totals of clean_all()'s per-file ingest stats, if any."""
+    if stats.empty:
+        return
+    logger.info(
+        f"Sharded sales: {len(stats)} files, {stats['rows_in'].sum()} rows in, "
+        f"{stats['rows_out'].sum()} clean, {stats['rows_kept'].sum()} kept after dedup."
+    )
+
+
+def write_clean(table: str, df: pd.DataFrame, fmt: str | None = None) -> pathlib.Path:
+    """Write one cleaned table to the clean folder and return its path.
+
+    The format defaults to columnar_io.DEFAULT_FORMAT; pass fmt="csv" to export CSV.
+    """
+    path = write_table(df, CLEAN_DATA_DIR.joinpath(TABLE_FILES[table][1]), fmt)
+    logger.info(f"Saved cleaned {table} data to {path.name}.")
+    return path
+
+
+def main(fmt: str | None = None) -> None:
+    """Process raw data and clean it using DataScrubber."""
+    logger.info("Starting data preparation...")
+
+    cleaned, ingest_stats = clean_all()
+    log_ingest_stats(ingest_stats)
+    for table, df in cleaned.items():
+        write_clean(table, df, fmt)
 
     logger.info("Data preparation complete.")
 
@@ -9,13 +9,24 @@
 
 import pandas as pd
 import os
+import pathlib
+import sys
 from datetime import datetime
 
 # -------------------------
 # File paths
 # -------------------------
 RAW_FILE = os.path.abspath("data/raw/customers_data.csv")
-CLEAN_FILE = os.path.abspath("data/prepared/customers_data_prepared.csv")
+# Extension depends on the output format (see columnar_io; SMART_STORE_FORMAT=csv for CSV)
+CLEAN_FILE = os.path.abspath("data/prepared/customers_data_prepared")
+
+# Run from the project root (like the paths above) so the shared modules import
+sys.path.insert(0, os.path.abspath("."))
+from src.analytics_project.columnar_io import write_table  # noqa: E402
+from src.analytics_project.memory import MEMORY_BUDGET_MB, downcast  # noqa: E402
+from src.analytics_project.profiling import profile_stage  # noqa: E402
+from src.analytics_project.quality_log import flush  # noqa: E402
+from src.analytics_project.validation import RULES, report  # noqa: E402
 
 # Ensure prepared directory exists
 os.makedirs(os.path.dirname(CLEAN_FILE), exist_ok=True)
@@ -35,62 +46,13 @@ df = df.drop_duplicates()
 print(f"Removed {before - len(df)} duplicate rows.")
 
 # -------------------------
-# Step 2: Handle missing values
+# Steps 2-3: Missing and invalid values
 # -------------------------
-# Fill missing Name with 'Unknown Customer'
-if 'Name' not in df.columns:
-    df['Name'] = 'Unknown Customer'
-else:
-    missing_names = df['Name'].isna().sum()
-    if missing_names > 0:
-        print(f"Found {missing_names} missing Name. Filling with 'Unknown Customer'.")
-        df['Name'] = df['Name'].fillna('Unknown Customer')
-
-# Fill missing Region with 'Unknown'
-if 'Region' not in df.columns:
-    df['Region'] = 'Unknown'
-else:
-    missing_regions = df['Region'].isna().sum()
-    if missing_regions > 0:
-        print(f"Found {missing_regions} missing Region. Filling with 'Unknown'.")
-        df['Region'] = df['Region'].fillna('Unknown')
-
-# Handle JoinDate
-if 'JoinDate' not in df.columns:
-    df['JoinDate'] = pd.Timestamp.today()
-else:
-    df['JoinDate'] = pd.to_datetime(df['JoinDate'], errors='coerce')
-    invalid_dates = df['JoinDate'].isna().sum()
-    if invalid_dates > 0:
-        print(f"Found {invalid_dates} invalid JoinDate values. Filling with today.")
-        df['JoinDate'] = df['JoinDate'].fillna(pd.Timestamp.today())
-
-# Fill missing numeric columns
-for col in ['CustomerRewardPoints']:
-    if col not in df.columns:
-        df[col] = 0
-    else:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            print(f"Found {missing_count} missing {col}. Filling with 0.")
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-# Fill missing CustomerStatus with 'New'
-if 'CustomerStatus' not in df.columns:
-    df['CustomerStatus'] = 'New'
-else:
-    missing_status = df['CustomerStatus'].isna().sum()
-    if missing_status > 0:
-        print(f"Found {missing_status} missing CustomerStatus. Filling with 'New'.")
-        df['CustomerStatus'] = df['CustomerStatus'].fillna('New')
-
-# -------------------------
-# Step 3: Remove invalid values
-# -------------------------
-# Ensure RewardPoints are non-negative
-before = len(df)
-df = df[df['CustomerRewardPoints'] >= 0]
-print(f"Removed {before - len(df)} rows with negative CustomerRewardPoints.")
+# Declared once in validation.RULES["customers"] (fills, non-negative checks)
+with profile_stage("prepare_customers"):  # no-op unless SMART_STORE_PROFILE=1
+    result = RULES["customers"].apply(df)
+report(result)
+df = result.df
 
 # -------------------------
 # Step 4: Ensure correct data types
@@ -105,6 +67,11 @@ df['CustomerStatus'] = df['CustomerStatus'].astype(str)
 # -------------------------
 # Save cleaned data
 # -------------------------
-df.to_csv(CLEAN_FILE, index=False)
-print(f"Cleaned customers data saved to {CLEAN_FILE}")
+# Memory-budget mode (SMART_STORE_MEMORY_MB): compact dtypes, text IDs back to ints
+if MEMORY_BUDGET_MB:
+    df = downcast(df, parse_numeric_text=True)
+    print(f"Downcast dtypes: {df.dtypes.astype(str).to_dict()}")
+saved_path = write_table(df, pathlib.Path(CLEAN_FILE))
+print(f"Cleaned customers data saved to {saved_path}")
 print(f"Final cleaned shape: {df.shape}")
+flush("customers")  # one data-quality summary (log + data_quality.jsonl)
@@ -4,12 +4,23 @@
 
 import pandas as pd
 import os
+import pathlib
+import sys
 
 # -------------------------
 # File paths
 # -------------------------
 RAW_FILE = os.path.abspath("data/raw/products_data.csv")
-CLEAN_FILE = os.path.abspath("data/prepared/products_data_prepared.csv")
+# Extension depends on the output format (see columnar_io; SMART_STORE_FORMAT=csv for CSV)
+CLEAN_FILE = os.path.abspath("data/prepared/products_data_prepared")
+
+# Run from the project root (like the paths above) so the shared modules import
+sys.path.insert(0, os.path.abspath("."))
+from src.analytics_project.columnar_io import write_table  # noqa: E402
+from src.analytics_project.memory import MEMORY_BUDGET_MB, downcast  # noqa: E402
+from src.analytics_project.profiling import profile_stage  # noqa: E402
+from src.analytics_project.quality_log import flush  # noqa: E402
+from src.analytics_project.validation import RULES, report  # noqa: E402
 
 # Ensure prepared directory exists
 os.makedirs(os.path.dirname(CLEAN_FILE), exist_ok=True)
@@ -29,35 +40,13 @@ df = df.drop_duplicates()
 print(f"Removed {before - len(df)} duplicate rows.")
 
 # -------------------------
-# Step 2: Handle missing values
+# Steps 2-3: Missing and invalid values
 # -------------------------
-# Fill missing ProductName or Category with 'Unknown'
-for col in ['ProductName', 'Category', 'ProductSupplierRegion']:
-    if col not in df.columns:
-        df[col] = 'Unknown'
-    else:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            print(f"Found {missing_count} missing {col}. Filling with 'Unknown'.")
-            df[col] = df[col].fillna('Unknown')
-
-# Fill numeric columns with 0
-for col in ['UnitPrice', 'ProductDiscountPercent']:
-    if col not in df.columns:
-        df[col] = 0.0
-    else:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            print(f"Found {missing_count} missing {col}. Filling with 0.")
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-
-# -------------------------
-# Step 3: Remove invalid / negative numbers
-# -------------------------
-for col in ['UnitPrice', 'ProductDiscountPercent']:
-    before = len(df)
-    df = df[df[col] >= 0]
-    print(f"Removed {before - len(df)} rows with negative {col} values.")
+# Declared once in validation.RULES["products"] (fills, non-negative checks)
+with profile_stage("prepare_products"):  # no-op unless SMART_STORE_PROFILE=1
+    result = RULES["products"].apply(df)
+report(result)
+df = result.df
 
 # -------------------------
 # Step 4: Ensure correct data types
@@ -69,6 +58,11 @@ for col in ['UnitPrice', 'ProductDiscountPercent']:
 # -------------------------
 # Save cleaned data
 # -------------------------
-df.to_csv(CLEAN_FILE, index=False)
-print(f"Cleaned products data saved to {CLEAN_FILE}")
+# Memory-budget mode (SMART_STORE_MEMORY_MB): compact dtypes, text IDs back to ints
+if MEMORY_BUDGET_MB:
+    df = downcast(df, parse_numeric_text=True)
+    print(f"Downcast dtypes: {df.dtypes.astype(str).to_dict()}")
+saved_path = write_table(df, pathlib.Path(CLEAN_FILE))
+print(f"Cleaned products data saved to {saved_path}")
 print(f"Final cleaned shape: {df.shape}")
+flush("products")  # one data-quality summary (log + data_quality.jsonl)
@@ -6,86 +6,70 @@
 # - Ensuring correct data types
 # - Removing outliers or invalid values
 # - Logging all steps
+# Sharded raw drops (data/raw/sales/*.csv[.gz|.zst]) are cleaned in parallel.
 
 import pandas as pd
 import os
+import pathlib
+import sys
 
 # -------------------------
 # File paths
 # -------------------------
 RAW_FILE = os.path.abspath("data/raw/sales_data.csv")
-CLEAN_FILE = os.path.abspath("data/prepared/sales_data_prepared.csv")
+# Extension depends on the output format (see columnar_io; SMART_STORE_FORMAT=csv for CSV)
+CLEAN_FILE = os.path.abspath("data/prepared/sales_data_prepared")
+
+# Run from the project root (like the paths above) so the shared modules import
+sys.path.insert(0, os.path.abspath("."))
+from src.analytics_project.columnar_io import write_table  # noqa: E402
+from src.analytics_project.memory import MEMORY_BUDGET_MB, downcast  # noqa: E402
+from src.analytics_project.profiling import profile_stage  # noqa: E402
+from src.analytics_project.quality_log import flush  # noqa: E402
+from src.analytics_project.ingest import SALES_SHARD_DIR, find_shards, ingest_files  # noqa: E402
+from src.analytics_project.sales_rules import clean_sales  # noqa: E402
 
 # Ensure prepared directory exists
 os.makedirs(os.path.dirname(CLEAN_FILE), exist_ok=True)
 
 # -------------------------
-# Load raw data
-# -------------------------
-print(f"Loading raw data from {RAW_FILE}...")
-df = pd.read_csv(RAW_FILE)
-print(f"Raw data shape: {df.shape}")
-
-# -------------------------
-# Step 1: Remove duplicates
-# -------------------------
-before = len(df)
-df = df.drop_duplicates()
-print(f"Removed {before - len(df)} duplicate rows.")
-
-# -------------------------
-# Step 2: Handle missing values
-# -------------------------
-# Fill missing CustomerID, ProductID, StoreID with 0
-missing_ids = df[['CustomerID', 'ProductID', 'StoreID']].isna().sum().sum()
-if missing_ids > 0:
-    print(f"Found {missing_ids} missing ID values. Filling with 0.")
-    df[['CustomerID', 'ProductID', 'StoreID']] = df[['CustomerID', 'ProductID', 'StoreID']].fillna(
-        0
-    )
-
-# Parse SaleDate
-df['SaleDate'] = pd.to_datetime(df['SaleDate'], errors='coerce')
-invalid_dates = df['SaleDate'].isna().sum()
-if invalid_dates > 0:
-    print(f"Found {invalid_dates} invalid SaleDate values. Filling with today.")
-    df['SaleDate'] = df['SaleDate'].fillna(pd.Timestamp.today())
-
-# -------------------------
-# Step 3: Remove outliers / invalid numbers
-# -------------------------
-# Convert numeric columns, coerce errors to NaN
-df['SaleAmount'] = pd.to_numeric(df['SaleAmount'], errors='coerce')
-df['DiscountPercent'] = pd.to_numeric(df['DiscountPercent'], errors='coerce')
-
-# Remove rows with invalid SaleAmount or DiscountPercent
-before = len(df)
-df = df[(df['SaleAmount'] >= 0) & (df['DiscountPercent'].between(0, 100))]
-print(f"Removed {before - len(df)} rows with invalid SaleAmount or DiscountPercent.")
-
-# -------------------------
-# Step 4: Standardize payment type
-# -------------------------
-valid_payment_types = ['DebitCard', 'CreditCard', 'Cash', 'GiftCard']
-invalid_payment_count = (~df['SalePaymentType'].isin(valid_payment_types)).sum()
-if invalid_payment_count > 0:
-    print(f"Found {invalid_payment_count} invalid payment types. Setting to 'Other'.")
-    df.loc[~df['SalePaymentType'].isin(valid_payment_types), 'SalePaymentType'] = 'Other'
+# Load and clean raw data
+# -------------------------
+# Guarded so worker processes (spawned on Windows) don't rerun the script
+if __name__ == "__main__":
+    # Sharded drops in data/raw/sales/ (csv, csv.gz, csv.zst) are cleaned in
+    # parallel and merged; otherwise the single sales_data.csv is used.
+    shards = find_shards()
+    if shards:
+        print(f"Ingesting {len(shards)} raw sales files from {SALES_SHARD_DIR}...")
+        df, file_stats = ingest_files(shards)
+        print(file_stats.to_string(index=False))
+    else:
+        print(f"Loading raw data from {RAW_FILE}...")
+        df = pd.read_csv(RAW_FILE)
+        print(f"Raw data shape: {df.shape}")
 
-# -------------------------
-# Step 5: Ensure correct data types
-# -------------------------
-df['TransactionID'] = df['TransactionID'].astype(str)
-df['CustomerID'] = df['CustomerID'].astype(str)
-df['ProductID'] = df['ProductID'].astype(str)
-df['StoreID'] = df['StoreID'].astype(str)
-df['CampaignID'] = df['CampaignID'].fillna(0).astype(int)
-df['SaleAmount'] = df['SaleAmount'].astype(float)
-df['DiscountPercent'] = df['DiscountPercent'].astype(float)
+        # Rules live in sales_rules.clean_sales (duplicates, missing IDs, dates,
+        # invalid amounts/discounts, payment types, column types)
+        with profile_stage("prepare_sales"):  # no-op unless SMART_STORE_PROFILE=1
+            df, stats = clean_sales(df)
+        print(f"Removed {stats['duplicates']} duplicate rows.")
+        if stats['missing_ids'] > 0:
+            print(f"Found {stats['missing_ids']} missing ID values. Filled with 0.")
+        if stats['invalid_dates'] > 0:
+            print(f"Found {stats['invalid_dates']} invalid SaleDate values. Filled with today.")
+        print(f"Removed {stats['invalid_numbers']} rows with invalid SaleAmount or DiscountPercent.")
+        if stats['invalid_payment_types'] > 0:
+            print(f"Found {stats['invalid_payment_types']} invalid payment types. Set to 'Other'.")
 
-# -------------------------
-# Save cleaned data
-# -------------------------
-df.to_csv(CLEAN_FILE, index=False)
-print(f"Cleaned sales data saved to {CLEAN_FILE}")
-print(f"Final cleaned shape: {df.shape}")
+    # -------------------------
+    # Save cleaned data
+    # -------------------------
+    # Memory-budget mode (SMART_STORE_MEMORY_MB): compact dtypes, text IDs back to ints
+    if MEMORY_BUDGET_MB:
+        df = downcast(df, parse_numeric_text=True)
+        print(f"Downcast dtypes: {df.dtypes.astype(str).to_dict()}")
+    saved_path = write_table(df, pathlib.Path(CLEAN_FILE))
+    print(f"Cleaned sales data saved to {saved_path}")
+    print(f"Final cleaned shape: {df.shape}")
+    flush("sales")  # one data-quality summary (log + data_quality.jsonl)
@@ -19,17 +19,176 @@
 #    scrubber = DataScrubber(df)
 #    df = scrubber.remove_duplicate_records().handle_missing_data(fill_value="N/A")
 
+# Arrow string mode:
+#    DataScrubber(df, arrow_strings=True) stores text columns as Arrow-backed
+#    strings (arrow_string_dtype()). The string formatting methods then run Arrow
+#    compute kernels over the whole column instead of a Python loop over
+#    objects; missing values stay missing without a mask.
+
+# Unique-value transforms:
+#    The string methods (lower/upper + trim, map_column_values_to_canonical)
+#    factorize the column once, transform only its distinct values and
+#    rebuild the column from the codes. Columns such as Region or
+#    SalePaymentType have a handful of values in many rows, so the work is
+#    per distinct value, not per row. With categorical=True the result is a
+#    'category' column (categorical=None decides from CATEGORICAL_MAX_RATIO);
+#    by default the column keeps its dtype. Near-unique columns (IDs,
+#    names) skip the factorize, which would cost more than it saves (see
+#    MEMOIZE_MAX_RATIO).
+
 # src/analytics_project/data_scrubber.py
 
 import io
+import numpy as np
 import pandas as pd
+from collections.abc import Callable
 from typing import Dict, Tuple, Union, List
 
+# Unique-value transforms return a 'category' column when the distinct
+# values are at most this share of the rows (categorical=None)
+CATEGORICAL_MAX_RATIO = 0.1
+
+# Columns whose sampled distinct-value ratio is above this are transformed
+# row by row (factorizing a near-unique column costs more than it saves)
+MEMOIZE_MAX_RATIO = 0.5
+
+# Rows sampled to estimate a column's distinct-value ratio
+DISTINCT_SAMPLE_ROWS = 10_000
+
+
+def is_text_column(series: pd.Series) -> bool:
+    """Return True for object and string columns (not category)."""
+    return pd.api.types.is_object_dtype(series) or (
+        pd.api.types.is_string_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype)
+    )
+
+
+def arrow_string_dtype() -> pd.StringDtype:
+    """Arrow-backed string dtype used in arrow_strings mode.
+
+    Built on demand so the module imports without pyarrow.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("arrow_strings mode needs pyarrow (uv add pyarrow).") from e
+    return pd.StringDtype("pyarrow")
+
+
+def is_arrow_string(series: pd.Series) -> bool:
+    """Return True if the column is a string dtype stored in Arrow memory."""
+    return isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == "pyarrow"
+
+
+def arrow_string_transform(series: pd.Series, *kernels: str) -> pd.Series:
+    """Apply Arrow compute kernels (by name, e.g. "utf8_lower") in order to a string column."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    values = pa.array(series)
+    for kernel in kernels:
+        values = pc.call_function(kernel, [values])
+    return pd.Series(pd.array(values, dtype=series.dtype), index=series.index, name=series.name)
+
+
+def unique_value_transform(
+    series: pd.Series,
+    transform: Callable[[pd.Series], pd.Series],
+    categorical: bool | None = False,
+) -> pd.Series:
+    """Apply a vectorized ``transform`` to the distinct values of ``series`` only.
+
+    The column is factorized once (categoricals reuse their codes), the
+    transformed uniques are factorized again (values that became equal,
+    e.g. "Cash" and "cash ", merge) and the column is rebuilt from codes.
+    Missing values stay missing.
+
+    Args:
+        series: Column to transform.
+        transform: Series -> Series of the same length (one row per unique).
+        categorical: True returns 'category' dtype; None decides from
+            CATEGORICAL_MAX_RATIO (categorical input stays categorical).
+            False (default) keeps the input's dtype.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = pd.Series(series.cat.categories)
+        categorical = True if categorical is None else categorical
+    else:
+        codes, uniques = pd.factorize(series)
+        uniques = pd.Series(uniques)
+    new_codes, new_uniques = pd.factorize(transform(uniques.reset_index(drop=True)))
+    new_codes = np.append(new_codes, -1)  # code -1 (missing) stays -1
+    codes = new_codes[codes]
+    if categorical is None:
+        categorical = len(new_uniques) <= CATEGORICAL_MAX_RATIO * len(series)
+    if categorical:
+        values = pd.Categorical.from_codes(codes, categories=new_uniques)
+        return pd.Series(values, index=series.index, name=series.name)
+    values = pd.api.extensions.take(new_uniques.array, codes, allow_fill=True)
+    dtype = None if isinstance(series.dtype, pd.CategoricalDtype) else series.dtype
+    return pd.Series(values, index=series.index, name=series.name, dtype=dtype)
+
+
+def estimate_distinct_ratio(series: pd.Series, sample_rows: int = DISTINCT_SAMPLE_ROWS) -> float:
+    """Share of distinct values in an evenly strided sample of ``series``."""
+    if len(series) == 0:
+        return 0.0
+    sample = series.iloc[:: max(1, len(series) // sample_rows)]
+    return sample.nunique(dropna=False) / len(sample)
+
+
+def transform_text_column(
+    series: pd.Series,
+    transform: Callable[[pd.Series], pd.Series],
+    categorical: bool | None = False,
+) -> pd.Series:
+    """Transform a text column via its unique values, or row by row if it is near-unique.
+
+    Categorical columns and ``categorical=True`` always use
+    unique_value_transform(). Otherwise a sampled distinct ratio above
+    MEMOIZE_MAX_RATIO applies ``transform`` to every non-missing row.
+    """
+    if (
+        categorical
+        or isinstance(series.dtype, pd.CategoricalDtype)
+        or estimate_distinct_ratio(series) <= MEMOIZE_MAX_RATIO
+    ):
+        return unique_value_transform(series, transform, categorical)
+    if is_arrow_string(series):
+        return transform(series)
+    result = series.copy()
+    mask = series.notnull()
+    result.loc[mask] = transform(series[mask])
+    return result
+
+
+def _case_and_trim(series: pd.Series, case: str) -> Callable[[pd.Series], pd.Series]:
+    """Return a transform for ``series``'s unique values: ``case`` ("lower"/"upper") + trim."""
+    if is_arrow_string(series):
+        return lambda values: arrow_string_transform(values, f"utf8_{case}", "utf8_trim_whitespace")
+    return lambda values: getattr(values.astype(str).str, case)().str.strip()
+
 
 class DataScrubber:
-    def __init__(self, df: pd.DataFrame):
-        """Initialize with a copy to avoid mutating the caller's DataFrame."""
+    def __init__(self, df: pd.DataFrame, arrow_strings: bool = False):
+        """Initialize with a copy to avoid mutating the caller's DataFrame.
+
+        With arrow_strings=True, text columns are converted to arrow_string_dtype().
+        """
         self.df = df.copy()
+        self.arrow_strings = arrow_strings
+        if arrow_strings:
+            self.convert_text_columns_to_arrow_strings()
+
+    def convert_text_columns_to_arrow_strings(self):
+        """Convert every text column to arrow_string_dtype()."""
+        dtype = arrow_string_dtype()
+        for column in self.df.columns:
+            series = self.df[column]
+            if is_text_column(series) and series.dtype != dtype:
+                self.df[column] = series.astype(dtype)
+        return self
 
     def get_df(self) -> pd.DataFrame:
         """Return the internal DataFrame (use after cleaning)."""
@@ -47,7 +206,7 @@ class DataScrubber:
         assert duplicate_count == 0, "Data still contains duplicate records after cleaning."
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
 
-    def convert_column_to_new_data_type(self, column: str, new_type: type):
+    def convert_column_to_new_data_type(self, column: str, new_type: type | str):
         if column not in self.df.columns:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
         self.df[column] = self.df[column].astype(new_type)
@@ -68,18 +227,48 @@ class DataScrubber:
         self.df = self.df[(self.df[column] >= lower_bound) & (self.df[column] <= upper_bound)]
         return self
 
-    def format_column_strings_to_lower_and_trim(self, column: str):
+    def format_column_strings_to_lower_and_trim(
+        self, column: str, categorical: bool | None = False
+    ):
+        if column not in self.df.columns:
+            raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        series = self.df[column]
+        self.df[column] = transform_text_column(
+            series, _case_and_trim(series, "lower"), categorical
+        )
+        return self
+
+    def format_column_strings_to_upper_and_trim(
+        self, column: str, categorical: bool | None = False
+    ):
         if column not in self.df.columns:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
-        mask = self.df[column].notnull()
-        self.df.loc[mask, column] = self.df.loc[mask, column].astype(str).str.lower().str.strip()
+        series = self.df[column]
+        self.df[column] = transform_text_column(
+            series, _case_and_trim(series, "upper"), categorical
+        )
         return self
 
-    def format_column_strings_to_upper_and_trim(self, column: str):
+    def map_column_values_to_canonical(
+        self,
+        column: str,
+        mapping: dict[str, str],
+        key: Callable[[pd.Series], pd.Series] | None = None,
+        categorical: bool | None = False,
+    ):
+        """Replace values with their canonical spelling; unmatched values are kept.
+
+        ``key`` normalizes values before the lookup (e.g. lowercase, letters
+        only), so "credit card" and "CREDITCARD" can both map to "CreditCard".
+        """
         if column not in self.df.columns:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
-        mask = self.df[column].notnull()
-        self.df.loc[mask, column] = self.df.loc[mask, column].astype(str).str.upper().str.strip()
+
+        def canonical(values: pd.Series) -> pd.Series:
+            lookup = values if key is None else key(values)
+            return lookup.map(mapping).fillna(values).astype(object)
+
+        self.df[column] = transform_text_column(self.df[column], canonical, categorical)
         return self
 
     def handle_missing_data(
@@ -0,0 +1,294 @@
+"""Dense array-backed lookup cache for the customer and product dimensions.
+
+Customer and product IDs are dense integers (1000+, 2000+), so each dimension
+is held as NumPy column arrays addressed by ``id - base``. Enriching a batch of
+sales is then a vectorized gather instead of a pandas merge or SQL join.
+Sparse ID ranges fall back to a hash index (``pd.Index.get_indexer``).
+
+Text attributes are stored as integer codes plus a small category array, so a
+gather returns ``category`` columns without touching Python strings.
+
+Usage:
+    cache = shared_cache(conn)
+    enriched = cache.enrich(sales_df, "product", ["unit_price", "category"])
+"""
+
+import copy
+import os
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Dimension table -> (key column, attribute columns kept in the cache)
+DIMENSIONS: dict[str, tuple[str, list[str]]] = {
+    "customer": ("customer_id", ["name", "region", "join_date", "reward_points", "status"]),
+    "product": (
+        "product_id",
+        ["product_name", "category", "unit_price", "product_discount_percent", "supplier_region"],
+    ),
+}
+
+# A dense position array is used while (max_id - min_id + 1) stays within
+# this multiple of the number of ids; wider ranges use the hash index.
+DENSE_SPAN_FACTOR = 4
+
+# SQLite limits the number of bound parameters per statement.
+_SQL_PARAM_CHUNK = 900
+
+
+class DimensionIndex:
+    """Map integer ids to row positions (``-1`` when the id is unknown)."""
+
+    def __init__(self, ids: np.ndarray):
+        """Index ``ids``; their positions are the row numbers."""
+        ids = np.asarray(ids, dtype=np.int64)
+        self.size = len(ids)
+        self.base = int(ids.min()) if self.size else 0
+        span = int(ids.max()) - self.base + 1 if self.size else 0
+        self.dense = span <= DENSE_SPAN_FACTOR * max(self.size, 1)
+        if self.dense:
+            self._positions = np.full(span, -1, dtype=np.int64)
+            self._positions[ids - self.base] = np.arange(self.size, dtype=np.int64)
+            self._hash = None
+        else:
+            self._positions = None
+            self._hash = pd.Index(ids)
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """Return the row position of each id, or -1 for ids not in the index."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._hash is not None:
+            return self._hash.get_indexer(ids).astype(np.int64)
+        offsets = ids - self.base
+        valid = (offsets >= 0) & (offsets < len(self._positions))
+        out = np.full(len(ids), -1, dtype=np.int64)
+        out[valid] = self._positions[offsets[valid]]
+        return out
+
+
+class DimensionTable:
+    """Column arrays for one dimension, aligned to a ``DimensionIndex``."""
+
+    def __init__(self, name: str, key: str, df: pd.DataFrame):
+        """Take the columns of dimension ``name`` from ``df``, keyed by ``key``."""
+        self.name = name
+        self.key = key
+        self.ids = np.empty(0, dtype=np.int64)
+        self.values: dict[str, np.ndarray] = {}
+        self.categories: dict[str, pd.Index] = {}
+        self.index = DimensionIndex(self.ids)
+        self.upsert(df)
+
+    def _encode(self, column: str, values: pd.Series) -> np.ndarray:
+        """Convert incoming values to the stored representation for ``column``."""
+        if column in self.categories or not pd.api.types.is_numeric_dtype(values):
+            known = self.categories.get(column, pd.Index([], dtype=object))
+            new = pd.Index(values.dropna().unique()).difference(known)
+            if len(new):
+                known = known.append(new)
+            self.categories[column] = known
+            return known.get_indexer(values).astype(np.int32)
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def upsert(self, df: pd.DataFrame) -> None:
+        """Insert new rows and overwrite existing ones, keyed on ``self.key``."""
+        if df.empty:
+            return
+        df = df.drop_duplicates(subset=[self.key], keep="last")
+        ids = df[self.key].to_numpy(dtype=np.int64)
+        pos = self.index.positions(ids)
+        is_new = pos < 0
+        n_old = len(self.ids)
+
+        self.ids = np.concatenate([self.ids, ids[is_new]])
+        target = pos.copy()
+        target[is_new] = np.arange(n_old, n_old + int(is_new.sum()))
+
+        for column in df.columns.drop(self.key):
+            encoded = self._encode(column, df[column])
+            current = self.values.get(column)
+            if current is None:
+                fill = -1 if encoded.dtype == np.int32 else np.nan
+                current = np.full(n_old, fill, dtype=encoded.dtype)
+            grown = np.resize(current, len(self.ids))
+            grown[target] = encoded
+            self.values[column] = grown
+
+        if is_new.any():
+            self.index = DimensionIndex(self.ids)
+
+    def remove(self, ids: np.ndarray) -> None:
+        """Drop rows for the given ids (used when a refresh finds them deleted)."""
+        pos = self.index.positions(ids)
+        pos = pos[pos >= 0]
+        if not len(pos):
+            return
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[pos] = False
+        self.ids = self.ids[keep]
+        self.values = {column: values[keep] for column, values in self.values.items()}
+        self.index = DimensionIndex(self.ids)
+
+    def gather(self, ids: np.ndarray, columns: list[str]) -> dict[str, pd.Categorical | np.ndarray]:
+        """Return the requested attributes for each id (missing ids give NaN)."""
+        pos = self.index.positions(ids)
+        missing = pos < 0
+        safe = np.where(missing, 0, pos) if len(self.ids) else None
+        out: dict[str, pd.Categorical | np.ndarray] = {}
+        for column in columns:
+            stored = self.values.get(column)
+            is_text = column in self.categories
+            fill = -1 if is_text else np.nan
+            if stored is None or safe is None:
+                picked = np.full(len(pos), fill)
+            else:
+                picked = np.where(missing, fill, stored[safe])
+            if is_text:
+                out[column] = pd.Categorical.from_codes(
+                    picked.astype(np.int32), categories=self.categories[column]
+                )
+            else:
+                out[column] = picked.astype(np.float64)
+        return out
+
+
+class DimensionCache:
+    """In-memory cache of all dimensions, reusable across ETL chunks and queries."""
+
+    def __init__(self):
+        """Start with no dimensions loaded."""
+        self.tables: dict[str, DimensionTable] = {}
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "DimensionCache":
+        """Build a cache holding every dimension in ``DIMENSIONS``."""
+        cache = cls()
+        for name in DIMENSIONS:
+            cache.refresh(conn, name)
+        return cache
+
+    def copy(self) -> "DimensionCache":
+        """Return an independent copy (e.g. to seed a shadow database's cache)."""
+        return copy.deepcopy(self)
+
+    def _read(self, conn: sqlite3.Connection, name: str, ids=None) -> pd.DataFrame:
+        key, columns = DIMENSIONS[name]
+        select = f"SELECT {', '.join([key, *columns])} FROM {name}"  # noqa: S608
+        if ids is None:
+            return pd.read_sql_query(select, conn)
+        ids = [int(i) for i in ids]
+        frames = []
+        for start in range(0, len(ids), _SQL_PARAM_CHUNK):
+            chunk = ids[start : start + _SQL_PARAM_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            frames.append(
+                pd.read_sql_query(f"{select} WHERE {key} IN ({marks})", conn, params=chunk)
+            )
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def refresh(self, conn: sqlite3.Connection, name: str, ids=None) -> None:
+        """Reload a dimension from the DW.
+
+        With ``ids`` only those rows are re-read: changed rows are overwritten,
+        new ones appended and ids that no longer exist are dropped. Without
+        ``ids`` the whole dimension is reloaded.
+        """
+        key, _ = DIMENSIONS[name]
+        df = self._read(conn, name, ids)
+        if ids is None or name not in self.tables:
+            self.tables[name] = DimensionTable(name, key, df)
+            return
+        table = self.tables[name]
+        table.upsert(df)
+        present = set(df[key].astype(int)) if not df.empty else set()
+        gone = np.array([i for i in ids if int(i) not in present], dtype=np.int64)
+        table.remove(gone)
+
+    def contains(self, name: str, ids) -> np.ndarray:
+        """Return a boolean mask of which ids exist in the dimension."""
+        return self.tables[name].index.positions(np.asarray(ids, dtype=np.int64)) >= 0
+
+    def enrich(
+        self,
+        df: pd.DataFrame,
+        name: str,
+        columns: list[str],
+        key: str | None = None,
+        prefix: str = "",
+    ) -> pd.DataFrame:
+        """Return a copy of ``df`` with dimension attributes gathered by id.
+
+        Args:
+            df: Fact rows, for example a sales batch.
+            name: Dimension to read from ("customer" or "product").
+            columns: Dimension attributes to add.
+            key: Column of ``df`` holding the dimension id (defaults to the
+                dimension key, e.g. ``product_id``).
+            prefix: Optional prefix for the added column names.
+
+        Returns:
+            pd.DataFrame: ``df`` with the new columns appended.
+        """
+        table = self.tables[name]
+        ids = pd.to_numeric(df[key or table.key], errors="coerce").fillna(-1).to_numpy(np.int64)
+        gathered = table.gather(ids, columns)
+        out = df.copy()
+        for column, values in gathered.items():
+            out[prefix + column] = values
+        return out
+
+
+# One cache per database file, shared by everything running in this process.
+# In-memory databases are never shared: they have no name to key them by
+# (an id() key could be reused by a new connection after the old one is gone).
+_SHARED: dict[str, DimensionCache] = {}
+
+
+def _database_file(conn: sqlite3.Connection) -> str:
+    """Return the main database file of a connection ('' for in-memory DBs)."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path
+    return ""
+
+
+def shared_cache(conn: sqlite3.Connection, reload: bool = False) -> DimensionCache:
+    """Return the process-wide cache for this connection's database.
+
+    The cache is loaded on first use; pass ``reload=True`` after a full reload
+    of the dimension tables. An in-memory database gets a new cache each call.
+    """
+    path = _database_file(conn)
+    if not path:
+        return DimensionCache.from_connection(conn)
+    if reload or path not in _SHARED:
+        _SHARED[path] = DimensionCache.from_connection(conn)
+    return _SHARED[path]
+
+
+def _cache_key(db: sqlite3.Connection | str | os.PathLike) -> str:
+    if isinstance(db, sqlite3.Connection):
+        return _database_file(db)
+    return str(pathlib.Path(db).resolve())
+
+
+def peek_shared_cache(db: sqlite3.Connection | str | os.PathLike) -> DimensionCache | None:
+    """Return the shared cache of a database file (or a connection to one), if loaded."""
+    return _SHARED.get(_cache_key(db))
+
+
+def set_shared_cache(db: sqlite3.Connection | str | os.PathLike, cache: DimensionCache) -> None:
+    """Install ``cache`` as the shared cache of a database file (ignored for in-memory DBs)."""
+    key = _cache_key(db)
+    if key:
+        _SHARED[key] = cache
+
+
+def drop_shared_cache(db: sqlite3.Connection | str | os.PathLike) -> None:
+    """Forget the shared cache of a connection's database or a database file.
+
+    Called when a database file is replaced wholesale (see shadow_db.py).
+    """
+    _SHARED.pop(_cache_key(db), None)
@@ -0,0 +1,271 @@
+"""Fuzzy customer de-duplication with blocking indexes.
+
+The raw customer feed has the same person under several IDs with slightly
+different Name spellings ("Jon Smith" / "John Smith"). Exact duplicate
+removal can't see that, and comparing every pair of customers is O(n²).
+This module resolves them in four vectorized steps:
+
+1. Blocking: each customer gets one key per BLOCKING_KEYS scheme, always
+   within its Region (phonetic: Soundex of first and last name; prefix: the
+   first letters of the name; ngram: the leading trigram of first and last
+   name). Only customers that share a key become candidate pairs, and
+   oversized blocks are skipped.
+2. Candidate pairs whose join dates are more than JOIN_WINDOW_DAYS apart
+   are dropped.
+3. Similarity: names become arrays of hashed character trigrams and each
+   pair's Jaccard similarity is computed with row-wise sorts over the pairs.
+4. Pairs at or above SIMILARITY_THRESHOLD whose surnames also match (same
+   Soundex or similar spelling) are linked. Connected components are the
+   clusters, and each cluster's canonical customer is the one that joined
+   first (then the lowest ID).
+
+The result (customer_id -> canonical_customer_id) is stored in
+``customer_merge_map``, and insert_sales() rewrites sales to the canonical ID.
+
+Usage:
+    mapping = build_customer_merge_map(conn)
+    insert_sales(df, cursor, customer_map=mapping)
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Name similarity (trigram Jaccard) needed to link two customers
+SIMILARITY_THRESHOLD = 0.5
+
+# Customers whose join dates differ by more than this are never linked
+JOIN_WINDOW_DAYS = 90
+
+# Blocks with more customers than this are skipped (too generic to be useful)
+MAX_BLOCK_SIZE = 500
+
+# Candidate pairs scored per vectorized batch
+PAIR_BATCH = 200_000
+
+BLOCKING_KEYS = ("phonetic", "prefix", "ngram")
+
+# Tokens dropped before comparing names
+HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "prof", "jr", "sr", "ii", "iii", "iv"}
+
+_SOUNDEX = str.maketrans("abcdefghijklmnopqrstuvwxyz", "01230120022455012623010202")
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Lowercase, keep letters and spaces, drop honorifics, collapse spaces."""
+    honorifics = r"\b(?:" + "|".join(sorted(HONORIFICS)) + r")\b"
+    return (
+        names.fillna("").astype("str").str.lower()
+        .str.replace(r"[^a-z ]+", " ", regex=True)
+        .str.replace(honorifics, " ", regex=True)
+        .str.replace(r" +", " ", regex=True)
+        .str.strip()
+    )  # fmt: skip
+
+
+def first_word(names: pd.Series) -> pd.Series:
+    """First word of each normalized name."""
+    return names.str.replace(r" .*", "", regex=True)
+
+
+def last_word(names: pd.Series) -> pd.Series:
+    """Last word of each normalized name."""
+    return names.str.replace(r".* ", "", regex=True)
+
+
+def soundex(words: pd.Series) -> pd.Series:
+    """American Soundex codes (e.g. "robert" -> "r163") for lowercase words."""
+    words = words.fillna("")
+    digits = words.str.replace(r"[hw]", "", regex=True).str.translate(_SOUNDEX)
+    # Adjacent letters with the same code count once (no backreferences in Arrow's regex)
+    for code in "123456":
+        digits = digits.str.replace(f"{code}{code}+", code, regex=True)
+    # The first letter is kept as a letter; vowels (0) are dropped after it
+    rest = digits.str[1:].str.replace("0", "", regex=False)
+    codes = words.str[:1] + (rest + "000").str[:3]
+    return codes.where(words.str.len() > 0, "")
+
+
+def blocking_keys(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Return an integer block code per customer for each scheme (-1: no block).
+
+    ``df`` needs ``name`` (normalized) and ``region`` columns.
+    """
+    first, last = first_word(df["name"]), last_word(df["name"])
+    region = df["region"].fillna("").astype(str) + "|"
+    raw = {
+        "phonetic": region + soundex(first) + soundex(last),
+        "prefix": region + df["name"].str.replace(" ", "", regex=False).str[:4],
+        "ngram": region + first.str[:3] + "|" + last.str[:3],
+    }
+    keys = {}
+    for scheme in BLOCKING_KEYS:
+        values = raw[scheme].where(df["name"].str.len() > 0)
+        keys[scheme] = pd.factorize(values)[0].astype(np.int64)
+    return keys
+
+
+def _pairs_within_blocks(blocks: np.ndarray, max_block: int) -> np.ndarray:
+    """Return every (i, j), i < j, of rows sharing a block code, packed as i<<32 | j."""
+    rows = np.flatnonzero(blocks >= 0)
+    order = rows[np.argsort(blocks[rows], kind="stable")]
+    codes = blocks[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    sizes = np.diff(np.r_[starts, len(codes)])
+    keep = (sizes > 1) & (sizes <= max_block)
+    starts, sizes = starts[keep], sizes[keep]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64)
+    # Member positions of the kept blocks, and how many later members each has
+    offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    member = np.repeat(starts, sizes) + offsets
+    later = np.repeat(starts + sizes, sizes) - member - 1
+    left = np.repeat(member, later)
+    first_partner = np.repeat(np.cumsum(later) - later, later)
+    right = left + 1 + (np.arange(len(left)) - first_partner)
+    a, b = order[left], order[right]
+    return np.minimum(a, b) * np.int64(1 << 32) + np.maximum(a, b)
+
+
+def candidate_pairs(
+    df: pd.DataFrame, max_block: int = MAX_BLOCK_SIZE, window_days: int = JOIN_WINDOW_DAYS
+) -> np.ndarray:
+    """Return the (n, 2) candidate pairs from all blocking schemes, join-date filtered."""
+    keys = blocking_keys(df)
+    packed = np.sort(np.concatenate([_pairs_within_blocks(k, max_block) for k in keys.values()]))
+    packed = packed[np.r_[True, packed[1:] != packed[:-1]]] if len(packed) else packed
+    pairs = np.stack([packed >> 32, packed & 0xFFFFFFFF], axis=1)
+    joined = pd.to_datetime(df["join_date"], errors="coerce", format="mixed").to_numpy()
+    days = np.abs((joined[pairs[:, 0]] - joined[pairs[:, 1]]) / np.timedelta64(1, "D"))
+    # Missing join dates don't rule a pair out
+    return pairs[~(days > window_days)]
+
+
+def trigram_codes(names: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Return hashed trigrams of each padded name as an (n, w) array and its valid mask."""
+    padded = ("  " + names.fillna("") + " ").to_numpy(dtype=str)
+    width = max(int(np.char.str_len(padded).max()) if len(padded) else 3, 3)
+    chars = padded.astype(f"U{width}").view(np.uint32).reshape(len(padded), width)
+    chars = chars.astype(np.uint64)
+    grams = (chars[:, :-2] << np.uint64(42)) ^ (chars[:, 1:-1] << np.uint64(21)) ^ chars[:, 2:]
+    grams = (grams % np.uint64(4294967291)).astype(np.int64)  # 32-bit hash
+    lengths = np.char.str_len(padded)
+    valid = np.arange(width - 2)[None, :] <= (lengths - 3)[:, None]
+    return grams, valid
+
+
+def trigram_sets(grams: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Sort each row's trigrams and blank out (-1) padding and repeated grams."""
+    sets = np.where(valid, grams, -1)
+    sets.sort(axis=1)
+    sets[:, 1:][sets[:, 1:] == sets[:, :-1]] = -1
+    return sets
+
+
+def jaccard(sets: np.ndarray, pairs: np.ndarray, batch: int = PAIR_BATCH) -> np.ndarray:
+    """Trigram Jaccard similarity of each candidate pair (row-wise, no global sort)."""
+    sizes = (sets >= 0).sum(axis=1)
+    scores = np.empty(len(pairs))
+    for start in range(0, len(pairs), batch):
+        i, j = pairs[start : start + batch, 0], pairs[start : start + batch, 1]
+        both = np.sort(np.concatenate([sets[i], sets[j]], axis=1), axis=1)
+        inter = ((both[:, 1:] == both[:, :-1]) & (both[:, 1:] >= 0)).sum(axis=1)
+        union = sizes[i] + sizes[j] - inter
+        scores[start : start + len(i)] = np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+    return scores
+
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Label each of ``n`` nodes with the smallest node index in its component."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        updated = labels.copy()
+        np.minimum.at(updated, a, low)
+        np.minimum.at(updated, b, low)
+        updated = updated[updated]  # pointer jumping
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def resolve_customers(
+    customers: pd.DataFrame,
+    threshold: float = SIMILARITY_THRESHOLD,
+    window_days: int = JOIN_WINDOW_DAYS,
+    max_block: int = MAX_BLOCK_SIZE,
+) -> pd.DataFrame:
+    """Cluster near-duplicate customers.
+
+    Args:
+        customers: customer_id, name, region and join_date per customer.
+        threshold: Smallest name similarity that links two customers.
+        window_days: Largest join-date gap between linked customers.
+        max_block: Largest blocking group compared pairwise.
+
+    Returns:
+        DataFrame: customer_id, canonical_customer_id, cluster_size and
+        similarity (best score that linked the customer; 1.0 for singletons).
+    """
+    df = customers[["customer_id", "name", "region", "join_date"]].reset_index(drop=True)
+    df["name"] = normalize_names(df["name"])
+    pairs = candidate_pairs(df, max_block, window_days)
+    scores = jaccard(trigram_sets(*trigram_codes(df["name"])), pairs)
+    # The surname must agree too, by sound or spelling, so a long shared
+    # first name can't link two different people on its own
+    last = last_word(df["name"])
+    last_sound = soundex(last).to_numpy(dtype=object)
+    same_last = (last_sound[pairs[:, 0]] == last_sound[pairs[:, 1]]) | (
+        jaccard(trigram_sets(*trigram_codes(last)), pairs) >= threshold
+    )
+    linked = (scores >= threshold) & same_last
+    labels = connected_components(len(df), pairs[linked])
+
+    # Canonical record per cluster: earliest join date, then lowest customer_id
+    joined = pd.to_datetime(df["join_date"], errors="coerce", format="mixed")
+    join_key = joined.fillna(pd.Timestamp.max).to_numpy()
+    ids = df["customer_id"].to_numpy(np.int64)
+    order = np.lexsort((ids, join_key, labels))
+    first = order[np.r_[True, labels[order][1:] != labels[order][:-1]]]
+    canonical = pd.Series(ids[first], index=labels[first])
+
+    cluster_size = np.bincount(labels, minlength=len(df))[labels]
+    best = np.where(cluster_size > 1, 0.0, 1.0)
+    np.maximum.at(best, pairs[linked, 0], scores[linked])
+    np.maximum.at(best, pairs[linked, 1], scores[linked])
+    return pd.DataFrame(
+        {
+            "customer_id": ids,
+            "canonical_customer_id": canonical.reindex(labels).to_numpy(np.int64),
+            "cluster_size": cluster_size,
+            "similarity": best.round(4),
+        }
+    )
+
+
+def build_customer_merge_map(conn: sqlite3.Connection, **options) -> pd.Series:
+    """Resolve the customers in the DW and store the result in customer_merge_map.
+
+    Returns:
+        pd.Series: canonical_customer_id indexed by customer_id, for the
+        customers that were merged into another one (empty if none).
+    """
+    customers = pd.read_sql_query("SELECT customer_id, name, region, join_date FROM customer", conn)
+    mapping = resolve_customers(customers, **options)
+    merged = mapping[mapping["customer_id"] != mapping["canonical_customer_id"]]
+    conn.execute("DROP TABLE IF EXISTS customer_merge_map;")
+    conn.execute("""
+    CREATE TABLE customer_merge_map (
+        customer_id INTEGER PRIMARY KEY,
+        canonical_customer_id INTEGER,
+        cluster_size INTEGER,
+        similarity REAL
+    );
+    """)
+    merged.to_sql("customer_merge_map", conn, if_exists="append", index=False)
+    conn.commit()
+    return merged.set_index("customer_id")["canonical_customer_id"]
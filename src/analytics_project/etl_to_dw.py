@@ -1,10 +1,10 @@
-"""ETL Script to Load Data into the Data Warehouse
-This script extracts cleaned data from prepared CSV files, transforms it as necessary,
-and loads it into a SQLite data warehouse."""
+"""ETL Script to Load Data into the Data Warehouse.
+
+This script extracts cleaned data from the clean layer (columnar or CSV files), transforms it as necessary,
+and loads it into a SQLite data warehouse.
 
-"""
 etl_to_dw.py
-Robust ETL to create a small DW from your cleaned CSVs found in data/clean/.
+Robust ETL to create a small DW from your cleaned tables found in data/clean/.
 
 Usage (from project root):
     python -m analytics_project.etl_to_dw
@@ -15,27 +15,67 @@ import pandas as pd
 from pathlib import Path
 import os
 
+from src.analytics_project.columnar_io import read_table
+from src.analytics_project.dim_cache import DimensionCache, shared_cache
+from src.analytics_project.entity_resolution import build_customer_merge_map
+from src.analytics_project.profiling import profile_stage
+from src.analytics_project.scd2 import SCD2_DIMENSIONS, apply_scd2
+from src.utils.logger import project_root
+
 # -----------------------------
 # Paths
 # -----------------------------
-PROJECT_ROOT = Path(r"C:\Repos\smart-store-jacksongentzell")
+PROJECT_ROOT = Path(project_root)
 DATA_DIR = PROJECT_ROOT / "data"
 CLEAN_DIR = DATA_DIR / "clean"
 DW_DIR = DATA_DIR / "dw"
 DB_PATH = DW_DIR / "smart_store_dw.db"
+TOPN_PATH = DW_DIR / "topn_summaries.npz"
 
 # Ensure DW directory exists
 os.makedirs(DW_DIR, exist_ok=True)
 
-# CSV files
-CUSTOMERS_CSV = CLEAN_DIR / "customers_cleaned.csv"
-PRODUCTS_CSV = CLEAN_DIR / "products_cleaned.csv"
-SALES_CSV = CLEAN_DIR / "sales_cleaned.csv"
+# Cleaned tables (path without extension; read_table finds npy/parquet/feather/csv)
+CUSTOMERS_CLEAN = CLEAN_DIR / "customers_cleaned"
+PRODUCTS_CLEAN = CLEAN_DIR / "products_cleaned"
+SALES_CLEAN = CLEAN_DIR / "sales_cleaned"
+
+# Derived measures stored on the sales fact (computed once at load time).
+# The SQL is the equivalent on-the-fly formula over sales s JOIN product p,
+# kept here so reports and tests can check the stored values against it.
+DERIVED_SALES_MEASURES = {
+    "unit_price": "p.unit_price",
+    "discount_amount": "s.sale_amount * s.discount_percent / 100.0",
+    "net_revenue": "s.sale_amount - s.sale_amount * s.discount_percent / 100.0",
+    "margin_proxy": "(s.sale_amount - s.sale_amount * s.discount_percent / 100.0) - p.unit_price",
+}
+
+# Low-cardinality text columns stored as integer keys into small lookup
+# tables (table -> {column: lookup table}). Regions share one dictionary.
+DICTIONARY_COLUMNS = {
+    "customer": {"region": "lookup_region", "status": "lookup_status"},
+    "product": {"category": "lookup_category", "supplier_region": "lookup_region"},
+    "sales": {"sale_payment_type": "lookup_payment_type"},
+}
+
+# Stratified sample of the sales fact (one stratum per store x month) used by
+# approx.py for fast approximate answers. Each stratum keeps SAMPLE_FRACTION
+# of its rows, but at least SAMPLE_MIN_ROWS (or all of them if smaller).
+SAMPLE_FRACTION = 0.05
+SAMPLE_MIN_ROWS = 30
 
 
 # -----------------------------
 # Helper Functions
 # -----------------------------
+def clean_date_column(df, col):
+    """Store dates as ISO strings (YYYY-MM-DD) whatever format they arrived in."""
+    if col in df.columns:
+        parsed = pd.to_datetime(df[col], format="mixed", errors="coerce")
+        df[col] = parsed.dt.strftime("%Y-%m-%d")
+    return df
+
+
 def clean_numeric_column(df, col):
     """Clean numeric columns: remove %, convert to float, handle errors."""
     if col in df.columns:
@@ -48,31 +88,83 @@ def clean_numeric_column(df, col):
 # -----------------------------
 # ETL Functions
 # -----------------------------
+def _migrate_legacy_tables(cursor: sqlite3.Cursor):
+    """Move pre-encoding tables named customer/product/sales out of the way.
+
+    Those names are now compatibility views, so old plain-TEXT tables are
+    renamed to <name>_legacy (the ETL reloads everything from data/clean).
+    """
+    for name in DICTIONARY_COLUMNS:
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = ?;", (name,))
+        row = cursor.fetchone()
+        if row and row[0] == "table":
+            cursor.execute(f"DROP TABLE IF EXISTS {name}_legacy;")
+            cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_legacy;")
+            print(f"Renamed legacy table {name} to {name}_legacy.")
+
+
+def _create_compat_view(cursor: sqlite3.Cursor, name: str):
+    """Create the view <name> over <name>_base with the original column names.
+
+    Every <col>_key column is decoded through its lookup table with a LEFT
+    JOIN on the lookup's primary key (a rowid search per row). Heavy GROUP BY
+    queries can use <name>_base and the integer keys directly.
+    """
+    encoded = DICTIONARY_COLUMNS[name]
+    select, joins = [], []
+    for row in cursor.execute(f"PRAGMA table_info({name}_base);").fetchall():
+        col = row[1]
+        text_col = col[: -len("_key")]
+        if col.endswith("_key") and text_col in encoded:
+            alias = f"l_{text_col}"
+            select.append(f"{alias}.value AS {text_col}")
+            joins.append(
+                f"LEFT JOIN {encoded[text_col]} {alias} ON {alias}.{encoded[text_col]}_id = b.{col}"
+            )
+        else:
+            select.append(f"b.{col}")
+    cursor.execute(f"DROP VIEW IF EXISTS {name};")
+    cursor.execute(
+        f"CREATE VIEW {name} AS SELECT {', '.join(select)} FROM {name}_base b {' '.join(joins)};"  # noqa: S608
+    )
+
+
 def create_schema(cursor: sqlite3.Cursor):
+    _migrate_legacy_tables(cursor)
+
+    # Small dictionaries for the low-cardinality text columns
+    for lookup in sorted({t for cols in DICTIONARY_COLUMNS.values() for t in cols.values()}):
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {lookup} (
+            {lookup}_id INTEGER PRIMARY KEY,
+            value TEXT UNIQUE NOT NULL
+        );
+        """)
+
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS customer (
+    CREATE TABLE IF NOT EXISTS customer_base (
         customer_id INTEGER PRIMARY KEY,
         name TEXT,
-        region TEXT,
+        region_key INTEGER,
         join_date TEXT,
         reward_points INTEGER,
-        status TEXT
+        status_key INTEGER
     );
     """)
 
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS product (
+    CREATE TABLE IF NOT EXISTS product_base (
         product_id INTEGER PRIMARY KEY,
         product_name TEXT,
-        category TEXT,
+        category_key INTEGER,
         unit_price REAL,
         product_discount_percent REAL,
-        supplier_region TEXT
+        supplier_region_key INTEGER
     );
     """)
 
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sales (
+    CREATE TABLE IF NOT EXISTS sales_base (
         transaction_id INTEGER PRIMARY KEY,
         sale_date TEXT,
         customer_id INTEGER,
@@ -81,12 +173,53 @@ def create_schema(cursor: sqlite3.Cursor):
         campaign_id INTEGER,
         sale_amount REAL,
         discount_percent REAL,
-        sale_payment_type TEXT
+        sale_payment_type_key INTEGER,
+        unit_price REAL,
+        discount_amount REAL,
+        net_revenue REAL,
+        margin_proxy REAL
     );
     """)
 
+    # Older databases were created before the derived measures existed, or
+    # still have list_price_revenue (a copy of unit_price, since dropped)
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(sales_base);")}
+    for col in DERIVED_SALES_MEASURES:
+        if col not in existing:
+            cursor.execute(f"ALTER TABLE sales_base ADD COLUMN {col} REAL;")
+    if "list_price_revenue" in existing:
+        cursor.execute("DROP VIEW IF EXISTS sales;")
+        cursor.execute("ALTER TABLE sales_base DROP COLUMN list_price_revenue;")
+
+    # Compatibility views keep the original table and column names for queries
+    for name in DICTIONARY_COLUMNS:
+        _create_compat_view(cursor, name)
+
+
+def encode_dictionary_columns(df: pd.DataFrame, table: str, cursor: sqlite3.Cursor) -> pd.DataFrame:
+    """Replace each dictionary-encoded text column with its <col>_key integer.
+
+    New values are added to the lookup table first; each column is factorized
+    so only its distinct values are looked up.
+    """
+    for col, lookup in DICTIONARY_COLUMNS[table].items():
+        if col not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[col])
+        values = [str(v) for v in uniques]
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {lookup} (value) VALUES (?);",  # noqa: S608
+            [(v,) for v in values],
+        )
+        keys = dict(cursor.execute(f"SELECT value, {lookup}_id FROM {lookup};").fetchall())  # noqa: S608
+        key_array = pd.array([keys[v] for v in values] + [None], dtype="Int64")
+        # factorize marks missing values with -1, which picks the trailing None
+        df[f"{col}_key"] = key_array[codes]
+        df = df.drop(columns=[col])
+    return df
+
 
-def insert_customers(df: pd.DataFrame, cursor: sqlite3.Cursor):
+def insert_customers(df: pd.DataFrame, cursor: sqlite3.Cursor) -> pd.DataFrame:
     df = df.rename(
         columns={
             "CustomerID": "customer_id",
@@ -99,12 +232,15 @@ def insert_customers(df: pd.DataFrame, cursor: sqlite3.Cursor):
     )
     df = df.drop_duplicates(subset=["customer_id"])
     df["reward_points"] = pd.to_numeric(df["reward_points"], errors="coerce")
+    df = clean_date_column(df, "join_date")
     df = df.dropna(subset=["customer_id"])
     df["customer_id"] = df["customer_id"].astype(int)
-    df.to_sql("customer", cursor.connection, if_exists="append", index=False)
+    df = encode_dictionary_columns(df, "customer", cursor)
+    df.to_sql("customer_base", cursor.connection, if_exists="append", index=False)
+    return df
 
 
-def insert_products(df: pd.DataFrame, cursor: sqlite3.Cursor):
+def insert_products(df: pd.DataFrame, cursor: sqlite3.Cursor) -> pd.DataFrame:
     df = df.rename(
         columns={
             "ProductID": "product_id",
@@ -123,11 +259,44 @@ def insert_products(df: pd.DataFrame, cursor: sqlite3.Cursor):
 
     df = df.dropna(subset=["product_id", "unit_price", "product_discount_percent"])
     df["product_id"] = df["product_id"].astype(int)
+    df = encode_dictionary_columns(df, "product", cursor)
+
+    df.to_sql("product_base", cursor.connection, if_exists="append", index=False)
+    return df
+
+
+def add_derived_measures(df: pd.DataFrame, dim_cache: DimensionCache) -> pd.DataFrame:
+    """Add the DERIVED_SALES_MEASURES columns in one vectorized pass.
+
+    unit_price is gathered from the cached product dimension (no join);
+    sales for unknown products get NULL unit price and margin.
+    """
+    df = dim_cache.enrich(df, "product", ["unit_price"])
+    sale_amount = df["sale_amount"].to_numpy(dtype=float)
+    discount = df["discount_percent"].to_numpy(dtype=float)
+    unit_price = df["unit_price"].to_numpy(dtype=float)
+
+    discount_amount = sale_amount * discount / 100.0
+    net_revenue = sale_amount - discount_amount
+    df["discount_amount"] = discount_amount
+    df["net_revenue"] = net_revenue
+    df["margin_proxy"] = net_revenue - unit_price
+    return df
 
-    df.to_sql("product", cursor.connection, if_exists="append", index=False)
 
+def insert_sales(
+    df: pd.DataFrame,
+    cursor: sqlite3.Cursor,
+    dim_cache: DimensionCache | None = None,
+    customer_map: pd.Series | None = None,
+) -> pd.DataFrame:
+    """Clean, enrich and append a batch of sales; return the rows as loaded.
 
-def insert_sales(df: pd.DataFrame, cursor: sqlite3.Cursor):
+    The returned frame has the DW column names, the derived measures and the
+    decoded sale_payment_type, for consumers such as the top-N engine.
+    ``customer_map`` (customer_id -> canonical_customer_id, from
+    build_customer_merge_map) rewrites sales of duplicate customers.
+    """
     df = df.rename(
         columns={
             "TransactionID": "transaction_id",
@@ -154,6 +323,8 @@ def insert_sales(df: pd.DataFrame, cursor: sqlite3.Cursor):
     ]:
         df = clean_numeric_column(df, col)
 
+    df = clean_date_column(df, "sale_date")
+
     # Drop rows with missing critical numeric values
     df = df.dropna(subset=["transaction_id", "customer_id", "product_id", "sale_amount"])
 
@@ -165,51 +336,190 @@ def insert_sales(df: pd.DataFrame, cursor: sqlite3.Cursor):
     df["customer_id"] = df["customer_id"].astype(int)
     df["product_id"] = df["product_id"].astype(int)
 
-    df.to_sql("sales", cursor.connection, if_exists="append", index=False)
+    if customer_map is not None and len(customer_map):
+        canonical = df["customer_id"].map(customer_map)
+        remapped = int(canonical.notna().sum())
+        df["customer_id"] = canonical.fillna(df["customer_id"]).astype(int)
+        if remapped:
+            print(f"Reassigned {remapped} sales rows to canonical customers.")
+
+    if dim_cache is None:
+        dim_cache = shared_cache(cursor.connection)
+
+    # Report sales that reference unknown customers/products (array lookup, no join)
+    for name, key in [("customer", "customer_id"), ("product", "product_id")]:
+        orphans = int((~dim_cache.contains(name, df[key].to_numpy())).sum())
+        if orphans:
+            print(f"Warning: {orphans} sales rows reference an unknown {name}.")
+
+    # Precompute derived measures so reports are single-table sums
+    df = add_derived_measures(df, dim_cache)
+    encoded = encode_dictionary_columns(df.copy(), "sales", cursor)
+
+    encoded.to_sql("sales_base", cursor.connection, if_exists="append", index=False)
+    return df
+
+
+def refresh_sales_sample(
+    cursor: sqlite3.Cursor,
+    fraction: float = SAMPLE_FRACTION,
+    min_rows: int = SAMPLE_MIN_ROWS,
+    seed: int = 0,
+) -> int:
+    """Rebuild the stratified sales sample and its stratum sizes; return sample rows.
+
+    Rows are picked per stratum in a pseudo-random but repeatable order (a
+    hash of transaction_id and ``seed``), so the same data gives the same
+    sample. ``sales_strata`` records population and sample size per stratum.
+    """
+    cursor.execute("DROP TABLE IF EXISTS sales_sample;")
+    cursor.execute("DROP TABLE IF EXISTS sales_strata;")
+    cursor.execute(
+        """
+    CREATE TABLE sales_sample AS
+    SELECT * FROM (
+        SELECT s.*,
+               COALESCE(s.store_id, -1) || '|' || COALESCE(substr(s.sale_date, 1, 7), '') AS stratum,
+               ROW_NUMBER() OVER w AS sample_rank,
+               COUNT(*) OVER (PARTITION BY s.store_id, substr(s.sale_date, 1, 7)) AS population
+        FROM sales_base s
+        WINDOW w AS (
+            PARTITION BY s.store_id, substr(s.sale_date, 1, 7)
+            ORDER BY (s.transaction_id * 2654435761 + ?) % 4294967291, s.transaction_id
+        )
+    )
+    WHERE sample_rank <= MAX(?, CAST(? * population + 0.999999 AS INTEGER));
+    """,
+        (seed, min_rows, fraction),
+    )
+    cursor.execute("""
+    CREATE TABLE sales_strata AS
+    SELECT stratum, MAX(population) AS population, COUNT(*) AS sample_size
+    FROM sales_sample
+    GROUP BY stratum;
+    """)
+    cursor.execute("CREATE INDEX idx_sales_sample_stratum ON sales_sample (stratum);")
+    return cursor.execute("SELECT COUNT(*) FROM sales_sample;").fetchone()[0]
 
 
 # -----------------------------
 # Main ETL
 # -----------------------------
-def main():
-    print("Connecting to SQLite database...")
-    conn = sqlite3.connect(DB_PATH)
+def load_dw(
+    conn: sqlite3.Connection,
+    customers_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+    sales_df: pd.DataFrame,
+    batch_consumers: list | None = None,
+    dedupe_customers: bool = True,
+    dim_cache: DimensionCache | None = None,
+) -> dict[str, int]:
+    """Replace the DW contents with the given cleaned DataFrames.
+
+    Used both by main() (reading data/clean/) and by the fused pipeline,
+    which passes the cleaned frames straight from data_prep.
+
+    Args:
+        conn: DW connection; the schema is (re)created on it.
+        customers_df: Cleaned customers.
+        products_df: Cleaned products.
+        sales_df: Cleaned sales.
+        batch_consumers: Objects with an ``update(sales_df)`` method (e.g. a
+            TopNEngine) that are fed every sales batch after it is loaded.
+        dedupe_customers: Resolve near-duplicate customers (see
+            entity_resolution) and load their sales under the canonical ID.
+        dim_cache: Cache of the dimensions as they were before this load
+            (e.g. a copy of the live DW's, see pipeline.load_and_publish).
+            Only the rows SCD2 records as new, changed or closed are re-read
+            into it; an empty cache is filled in full. Defaults to the
+            database's shared cache, reloaded in full.
+
+    Returns:
+        dict[str, int]: Row counts per table after the load.
+    """
     cursor = conn.cursor()
 
     print("Creating schema...")
     create_schema(cursor)
 
     print("Deleting existing records...")
-    cursor.execute("DELETE FROM sales;")
-    cursor.execute("DELETE FROM product;")
-    cursor.execute("DELETE FROM customer;")
+    cursor.execute("DELETE FROM sales_base;")
+    cursor.execute("DELETE FROM product_base;")
+    cursor.execute("DELETE FROM customer_base;")
     conn.commit()
 
-    print("Loading CSVs...")
-    customers_df = pd.read_csv(CUSTOMERS_CSV)
-    products_df = pd.read_csv(PRODUCTS_CSV)
-    sales_df = pd.read_csv(SALES_CSV)
-
     print("Inserting customers...")
-    insert_customers(customers_df, cursor)
+    with profile_stage("load_customers"):
+        loaded = {"customer": insert_customers(customers_df, cursor)}
 
     print("Inserting products...")
-    insert_products(products_df, cursor)
+    with profile_stage("load_products"):
+        loaded["product"] = insert_products(products_df, cursor)
+
+    print("Recording dimension history (SCD2)...")
+    changed = {}
+    for name in SCD2_DIMENSIONS:
+        with profile_stage(f"scd2_{name}"):
+            stats, changed[name] = apply_scd2(conn, name, source=loaded[name], return_keys=True)
+        print(f"{name}: {stats}")
+
+    customer_map = None
+    if dedupe_customers:
+        print("Resolving duplicate customers...")
+        with profile_stage("entity_resolution"):
+            customer_map = build_customer_merge_map(conn)
+        print(f"Customers merged into another record: {len(customer_map)}")
+
+    print("Caching dimensions...")
+    if dim_cache is None:
+        dim_cache = shared_cache(conn, reload=True)
+    else:
+        for name in SCD2_DIMENSIONS:
+            dim_cache.refresh(conn, name, ids=changed[name])
 
     print("Inserting sales...")
-    insert_sales(sales_df, cursor)
+    with profile_stage("load_sales"):
+        loaded_sales = insert_sales(
+            sales_df, cursor, dim_cache=dim_cache, customer_map=customer_map
+        )
+    with profile_stage("batch_consumers"):
+        for consumer in batch_consumers or []:
+            consumer.update(loaded_sales)
+
+    print("Refreshing stratified sales sample...")
+    with profile_stage("sales_sample"):
+        sampled = refresh_sales_sample(cursor)
+    print(f"Sample rows: {sampled}")
 
     conn.commit()
 
     # Validation
-    cursor.execute("SELECT COUNT(*) FROM customer;")
-    print(f"Customers loaded: {cursor.fetchone()[0]}")
-    cursor.execute("SELECT COUNT(*) FROM product;")
-    print(f"Products loaded: {cursor.fetchone()[0]}")
-    cursor.execute("SELECT COUNT(*) FROM sales;")
-    print(f"Sales loaded: {cursor.fetchone()[0]}")
-
-    conn.close()
+    counts = {}
+    for table in ("customer", "product", "sales"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table};")  # noqa: S608
+        counts[table] = cursor.fetchone()[0]
+    print(f"Customers loaded: {counts['customer']}")
+    print(f"Products loaded: {counts['product']}")
+    print(f"Sales loaded: {counts['sales']}")
+    return counts
+
+
+def main():
+    print("Loading cleaned tables...")
+    customers_df = read_table(CUSTOMERS_CLEAN)
+    products_df = read_table(PRODUCTS_CLEAN)
+    sales_df = read_table(SALES_CLEAN)
+
+    # Load into a shadow copy; readers keep the old DW until it is swapped in.
+    # The Top-N, rolling-window and anomaly consumers are set up by the
+    # pipeline module, which imports this one (hence the local import).
+    from src.analytics_project.pipeline import load_and_publish
+
+    print("Building shadow database...")
+    load_and_publish(DB_PATH, customers_df, products_df, sales_df)
+    print(f"Published {DB_PATH}")
+    print(f"Top-N, rolling-window and anomaly state saved to {DW_DIR}")
+
     print("ETL completed successfully!")
 
 
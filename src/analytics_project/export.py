@@ -0,0 +1,394 @@
+r"""Streaming export of DW query results.
+
+``read_sql``/``fetchall`` hold a whole result in memory before writing it,
+which does not scale to full-history extracts. export_query() instead steps a
+read-only cursor with ``fetchmany(batch_rows)`` and hands each batch to a
+writer, so memory stays at one batch however many rows the query returns.
+
+- formats: ``csv``, ``jsonl`` and ``parquet`` (parquet needs pyarrow),
+- ``compress=True`` gzips CSV/JSONL (``.gz``) and uses gzip pages in parquet,
+- progress (rows, rows/s) is logged every PROGRESS_SECONDS,
+- export_partitions() writes one file per value of a partition expression
+  (e.g. month) in parallel worker processes, each with its own connection.
+
+Usage (from project root):
+    python -m src.analytics_project.export "SELECT * FROM sales" sales.csv.gz
+    python -m src.analytics_project.export "SELECT * FROM sales" sales --format parquet \\
+        --partition-by "substr(sale_date, 1, 7)" --workers 4
+"""
+
+import argparse
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import time
+
+from src.analytics_project.columnar_io import _require_pyarrow
+from src.analytics_project.etl_to_dw import DB_PATH
+from src.utils.logger import init_logger, logger, project_root
+
+EXPORT_DIR: pathlib.Path = project_root.joinpath("data", "export")
+
+# Rows fetched and written per batch
+BATCH_ROWS = 50_000
+
+# Seconds between progress log lines
+PROGRESS_SECONDS = 5.0
+
+# Format -> file extension (".gz" is appended for compressed CSV/JSONL)
+EXTENSIONS: dict[str, str] = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+
+def connect_read_only(db_path: str | os.PathLike = DB_PATH) -> sqlite3.Connection:
+    """Open the DW read-only, so an export never takes a write lock."""
+    return sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def iter_batches(
+    conn: sqlite3.Connection, sql: str, params: tuple = (), batch_rows: int = BATCH_ROWS
+) -> Iterator[tuple[list[str], list[tuple]]]:
+    """Yield (column names, rows) for each batch of the query's result.
+
+    An empty result yields one empty batch, so writers still get the columns.
+    """
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    rows = cursor.fetchmany(batch_rows)
+    yield columns, rows
+    while rows := cursor.fetchmany(batch_rows):
+        yield columns, rows
+
+
+def guess_format(path: pathlib.Path) -> str:
+    """Infer the export format from a file name like sales.csv.gz."""
+    suffixes = [s for s in path.suffixes if s != ".gz"]
+    for fmt, ext in EXTENSIONS.items():
+        if suffixes and suffixes[-1] == ext:
+            return fmt
+    raise ValueError(f"Can't infer the export format of '{path.name}'; pass fmt.")
+
+
+def output_path(path: str | os.PathLike, fmt: str, compress: bool) -> pathlib.Path:
+    """Add the format's extension (and .gz) to ``path`` unless it already has them.
+
+    sales, sales.csv and sales.csv.gz all become sales.csv.gz when compressed.
+    """
+    path = pathlib.Path(path)
+    name = path.name.removesuffix(".gz")
+    if not name.endswith(EXTENSIONS[fmt]):
+        name += EXTENSIONS[fmt]
+    return path.with_name(name + (".gz" if compress and fmt != "parquet" else ""))
+
+
+class _TextWriter:
+    """Base for CSV and JSON Lines: a text stream, gzipped if requested."""
+
+    def __init__(self, path: pathlib.Path, compress: bool):
+        # Closed by close() once the last batch is written
+        if compress:
+            self.file = gzip.open(path, "wt", encoding="utf-8", newline="")  # noqa: SIM115
+        else:
+            self.file = path.open("w", encoding="utf-8", newline="")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _CsvWriter(_TextWriter):
+    def __init__(self, path: pathlib.Path, compress: bool):
+        super().__init__(path, compress)
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write(self, columns: list[str], rows: list[tuple]) -> None:
+        if not self.header_written:
+            self.writer.writerow(columns)
+            self.header_written = True
+        self.writer.writerows(rows)
+
+
+class _JsonlWriter(_TextWriter):
+    def write(self, columns: list[str], rows: list[tuple]) -> None:
+        self.file.writelines(
+            json.dumps(dict(zip(columns, row, strict=True))) + "\n" for row in rows
+        )
+
+
+def _arrow_column(values: list):
+    """Arrow array for one batch column; mixed-type values (legal in SQLite) become text."""
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def _widen(current, new):
+    """Smallest type holding both: NULL < int64 < float64; anything else mixed is text."""
+    import pyarrow as pa
+
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if pa.types.is_integer(current) and pa.types.is_floating(new):
+        return new
+    if pa.types.is_floating(current) and pa.types.is_integer(new):
+        return current
+    return pa.string()
+
+
+class _ParquetWriter:
+    """Appends one row group per batch.
+
+    SQLite columns have no fixed type, so each column's type is widened as
+    batches arrive (all-NULL -> the first real type, int64 -> float64,
+    mixed -> string) and every batch is cast with ``safe=True``. When a
+    batch widens the schema, the row groups written so far are rewritten
+    with the new schema, which happens at most a few times per column.
+    """
+
+    def __init__(self, path: pathlib.Path, compress: bool):
+        _require_pyarrow("parquet")
+        self.path = path
+        self.compression = "gzip" if compress else "snappy"
+        self.writer = None
+        self.schema = None
+
+    def write(self, columns: list[str], rows: list[tuple]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrays = [_arrow_column([row[i] for row in rows]) for i in range(len(columns))]
+        types = [a.type for a in arrays]
+        if self.schema is not None:
+            types = [_widen(f.type, t) for f, t in zip(self.schema, types, strict=True)]
+        schema = pa.schema([pa.field(col, t) for col, t in zip(columns, types, strict=True)])
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        elif not schema.equals(self.schema):
+            self._rewrite(schema)
+        self.schema = schema
+        arrays = [a.cast(t, safe=True) for a, t in zip(arrays, types, strict=True)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def _rewrite(self, schema) -> None:
+        """Copy the row groups written so far into a new file with the wider ``schema``."""
+        import pyarrow.parquet as pq
+
+        self.writer.close()
+        old = self.path.with_name(self.path.name + ".narrow")
+        self.path.replace(old)
+        self.writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        source = pq.ParquetFile(old)
+        for i in range(source.num_row_groups):
+            self.writer.write_table(source.read_row_group(i).cast(schema, safe=True))
+        source.close()
+        old.unlink()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+def export_query(
+    sql: str,
+    path: str | os.PathLike,
+    fmt: str | None = None,
+    params: tuple = (),
+    db_path: str | os.PathLike = DB_PATH,
+    batch_rows: int = BATCH_ROWS,
+    compress: bool = False,
+) -> dict:
+    """Stream the result of ``sql`` into a file, one batch at a time.
+
+    Args:
+        sql: Query to export (run on a read-only connection).
+        path: Output file; the extension is added if missing.
+        fmt: "csv", "jsonl" or "parquet" (default: inferred from ``path``).
+        params: Query parameters.
+        db_path: DW database file.
+        batch_rows: Rows per fetchmany() call and per write.
+        compress: gzip the output (implied by a ``.gz`` file name).
+
+    Returns:
+        dict: path, rows, seconds and rows_per_second.
+    """
+    fmt = fmt or guess_format(pathlib.Path(path))
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'; use one of {list(WRITERS)}.")
+    compress = compress or (pathlib.Path(path).suffix == ".gz" and fmt != "parquet")
+    path = output_path(path, fmt, compress)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    start = last_report = time.perf_counter()
+    rows = 0
+    conn = connect_read_only(db_path)
+    writer = WRITERS[fmt](path, compress)
+    try:
+        for columns, batch in iter_batches(conn, sql, params, batch_rows):
+            writer.write(columns, batch)
+            rows += len(batch)
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_SECONDS:
+                logger.info(f"{path.name}: {rows:,} rows ({rows / (now - start):,.0f} rows/s)")
+                last_report = now
+    except BaseException:
+        writer.close()
+        path.unlink(missing_ok=True)
+        raise
+    finally:
+        conn.close()
+    writer.close()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "path": str(path),
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else rows,
+    }
+    logger.info(
+        f"Exported {rows:,} rows to {path} in {stats['seconds']}s "
+        f"({stats['rows_per_second']:,} rows/s)"
+    )
+    return stats
+
+
+def _partition_names(values: list) -> list[str]:
+    """File names for partition values, unique even where sanitizing is lossy.
+
+    A name is the value with unsafe characters replaced by ``_``. When that
+    changes the text ("a/b" -> "a_b", NULL -> "null") or two values print the
+    same (1 and '1'), a short hash of the raw value is appended so no
+    partition overwrites another.
+    """
+    names = [re.sub(r"[^\w.-]", "_", "null" if v is None else str(v)) for v in values]
+    lossy = [v is None or name != str(v) for v, name in zip(values, names, strict=True)]
+    taken: dict[str, int] = {}
+    for name, changed in zip(names, lossy, strict=True):
+        if not changed:
+            taken[name] = taken.get(name, 0) + 1
+    for i, (value, name) in enumerate(zip(values, names, strict=True)):
+        if lossy[i] or taken[name] > 1:
+            digest = hashlib.blake2s(repr(value).encode(), digest_size=4).hexdigest()
+            names[i] = f"{name}-{digest}"
+    if len(set(names)) < len(names):
+        raise ValueError("Partition values map to clashing file names.")
+    return names
+
+
+def _export_partition(job: tuple) -> dict:
+    """Worker: export one partition (module-level so it pickles)."""
+    sql, partition_by, value, path, fmt, db_path, batch_rows, compress = job
+    return export_query(
+        f"SELECT * FROM ({sql}) WHERE ({partition_by}) IS ?",  # noqa: S608
+        path,
+        fmt,
+        (value,),
+        db_path,
+        batch_rows,
+        compress,
+    )
+
+
+def export_partitions(
+    sql: str,
+    partition_by: str,
+    out_dir: str | os.PathLike,
+    fmt: str = "csv",
+    db_path: str | os.PathLike = DB_PATH,
+    batch_rows: int = BATCH_ROWS,
+    compress: bool = False,
+    workers: int | None = None,
+) -> list[dict]:
+    """Export ``sql`` as one file per distinct value of ``partition_by``.
+
+    Args:
+        sql: Query whose result is partitioned.
+        partition_by: SQL expression over the query's columns, e.g.
+            "store_id" or "substr(sale_date, 1, 7)".
+        out_dir: Folder for the files (named ``<value><ext>``, plus a short
+            hash when the value is not a safe file name).
+        fmt: "csv", "jsonl" or "parquet".
+        db_path: DW database file.
+        batch_rows: Rows per fetchmany() call and per write.
+        compress: gzip the CSV/JSONL output.
+        workers: Worker processes (default: one per core, at most one per
+            partition). Each opens its own read-only connection.
+
+    Returns:
+        list[dict]: export_query() stats per partition.
+    """
+    conn = connect_read_only(db_path)
+    try:
+        values = [
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT ({partition_by}) FROM ({sql}) ORDER BY 1"  # noqa: S608
+            )
+        ]
+    finally:
+        conn.close()
+    out_dir = pathlib.Path(out_dir)
+    jobs = [
+        (sql, partition_by, v, out_dir / name, fmt, db_path, batch_rows, compress)
+        for v, name in zip(values, _partition_names(values), strict=True)
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs) or 1)
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_export_partition, jobs))
+    else:
+        results = [_export_partition(job) for job in jobs]
+    seconds = time.perf_counter() - start
+    rows = sum(r["rows"] for r in results)
+    logger.info(
+        f"Exported {len(results)} partitions ({rows:,} rows) with {workers} workers "
+        f"in {seconds:.2f}s ({rows / seconds if seconds else rows:,.0f} rows/s)"
+    )
+    return results
+
+
+def main() -> None:
+    """Export a DW query from the command line."""
+    parser = argparse.ArgumentParser(description="Stream a DW query into CSV/JSONL/Parquet.")
+    parser.add_argument("sql", help="Query to export.")
+    parser.add_argument("path", help="File (folder with --partition-by) under data/export/.")
+    parser.add_argument("--format", choices=list(WRITERS), help="Default: from the file name.")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output.")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--partition-by", help="SQL expression; one file per distinct value.")
+    parser.add_argument("--workers", type=int, help="Processes for partitioned exports.")
+    args = parser.parse_args()
+
+    path = EXPORT_DIR / args.path
+    if args.partition_by:
+        export_partitions(
+            args.sql,
+            args.partition_by,
+            path,
+            args.format or "csv",
+            batch_rows=args.batch_rows,
+            compress=args.gzip,
+            workers=args.workers,
+        )
+    else:
+        export_query(args.sql, path, args.format, batch_rows=args.batch_rows, compress=args.gzip)
+
+
+if __name__ == "__main__":
+    init_logger()
+    main()
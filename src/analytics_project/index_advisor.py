@@ -0,0 +1,479 @@
+"""Workload recorder and index advisor for the DW.
+
+Queries against smart_store_dw.db come from many notebooks and reports, so
+nobody knows which indexes it needs. This module records what actually
+runs and lets SQLite tell us where it scans:
+
+- WorkloadRecorder.connect() is a connection factory whose connections
+  report every executed statement (sqlite3 trace callback, bound values
+  expanded, so pandas ``read_sql_query`` is captured too). Statements are
+  normalized (literals -> ``?``, ``IN (...)`` lists collapsed) and counted
+  per fingerprint with one runnable sample each; save() merges the counts
+  into data/dw/workload.jsonl.
+- analyze() runs ``EXPLAIN QUERY PLAN`` on each recorded read and lists its
+  full table scans and temp B-tree sorts (ORDER BY / GROUP BY / DISTINCT),
+  with view aliases (``SCAN b``) resolved to base tables.
+- advise() proposes indexes for the scanned tables: equality columns, then
+  a range or the GROUP BY / ORDER BY columns, then the other columns the
+  statement reads, so the index covers it when that stays small. Each
+  candidate is created inside a SAVEPOINT, the affected statements are
+  re-planned and timed, and the SAVEPOINT is rolled back. The estimated
+  benefit is the measured saving weighted by each statement's count; the
+  fastest candidate per statement is recommended if it saves at least
+  MIN_SPEEDUP of that statement's time.
+- create_indexes() builds the recommendations; main() times the recorded
+  workload before and after.
+
+Only SELECT/WITH statements are analyzed and replayed; writes are counted
+but never re-run. Column matching is a heuristic over the SQL text, which
+is why every candidate is measured before it is recommended.
+
+Usage:
+    recorder = WorkloadRecorder()
+    conn = recorder.connect()
+    ...  # notebook or report queries
+    recorder.save()
+
+    python -m src.analytics_project.index_advisor            # report only
+    python -m src.analytics_project.index_advisor --apply    # create + before/after
+"""
+
+import argparse
+from collections.abc import Iterator
+from contextlib import contextmanager
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from src.analytics_project.etl_to_dw import DB_PATH, DW_DIR
+
+WORKLOAD_PATH = DW_DIR / "workload.jsonl"
+
+# Timing runs per statement (the best one counts)
+REPEATS = 3
+
+# Share of a statement's time an index must save to be recommended
+MIN_SPEEDUP = 0.2
+
+# Longest recommended index; covering columns are dropped beyond this
+MAX_INDEX_COLUMNS = 6
+
+# Most indexes recommended in one run
+MAX_INDEXES = 5
+
+INDEX_PREFIX = "idx_advisor_"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+_READ = re.compile(r"^\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_SOURCE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"SCAN (\w+)(?: LEFT-JOIN)?")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)")
+_CLAUSE = re.compile(r"\b(WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|WINDOW)\b", re.IGNORECASE)
+_ON = re.compile(
+    r"\bON\b(.*?)(?=\b(?:LEFT|RIGHT|FULL|INNER|CROSS|JOIN|WHERE|GROUP|ORDER|LIMIT)\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_REF = re.compile(r"(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\b")
+_EQUALITY = re.compile(r"^\s*(?:==?|IN\b|IS\b)", re.IGNORECASE)
+_RANGE = re.compile(r"^\s*(?:<=|>=|<|>|BETWEEN\b|LIKE\b|GLOB\b)", re.IGNORECASE)
+_KEYWORDS = {
+    "where", "on", "left", "right", "full", "inner", "outer", "cross", "natural", "join",
+    "group", "order", "limit", "having", "using", "union", "window", "except", "intersect",
+}  # fmt: skip
+
+
+def normalize_sql(sql: str) -> str:
+    """Fingerprint a statement: literals become ``?`` and whitespace is collapsed."""
+    text = _STRING.sub("?", sql.strip().rstrip(";"))
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(?)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+class WorkloadRecorder:
+    """Per-fingerprint statement counts, each with one runnable sample."""
+
+    def __init__(self):
+        """Start with no recorded statements."""
+        # fingerprint -> [count, sample SQL]
+        self.statements: dict[str, list] = {}
+
+    def record(self, sql: str) -> None:
+        """Count one executed statement (the trace callback of connect())."""
+        if sql.startswith("--"):  # statements run by triggers
+            return
+        entry = self.statements.setdefault(normalize_sql(sql), [0, sql])
+        entry[0] += 1
+
+    def connect(self, db_path: str | os.PathLike = DB_PATH, **kwargs) -> sqlite3.Connection:
+        """``sqlite3.connect()`` whose statements are recorded here."""
+        conn = sqlite3.connect(db_path, **kwargs)
+        conn.set_trace_callback(self.record)
+        return conn
+
+    def merge(self, other: "WorkloadRecorder") -> None:
+        """Add the counts of ``other`` to these (keeping the existing samples)."""
+        for fingerprint, (count, sample) in other.statements.items():
+            entry = self.statements.setdefault(fingerprint, [0, sample])
+            entry[0] += count
+
+    def workload(self, reads_only: bool = True) -> pd.DataFrame:
+        """Statements by descending count: fingerprint, count, sample."""
+        rows = [
+            (fingerprint, count, sample)
+            for fingerprint, (count, sample) in self.statements.items()
+            if not reads_only or _READ.match(sample)
+        ]
+        df = pd.DataFrame(rows, columns=["fingerprint", "count", "sample"])
+        return df.sort_values("count", ascending=False, ignore_index=True)
+
+    def save(self, path: pathlib.Path = WORKLOAD_PATH) -> None:
+        """Add the counts to the workload file (atomically) and reset them."""
+        saved = WorkloadRecorder.load(path) if path.exists() else WorkloadRecorder()
+        saved.merge(self)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for fingerprint, (count, sample) in saved.statements.items():
+                line = {"fingerprint": fingerprint, "count": count, "sample": sample}
+                f.write(json.dumps(line) + "\n")
+        tmp.replace(path)
+        self.statements = {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path = WORKLOAD_PATH) -> "WorkloadRecorder":
+        """Read a workload file written by save()."""
+        recorder = cls()
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    recorder.statements[row["fingerprint"]] = [row["count"], row["sample"]]
+        return recorder
+
+
+@contextmanager
+def recording_connection(
+    db_path: str | os.PathLike = DB_PATH, path: pathlib.Path = WORKLOAD_PATH, **kwargs
+) -> Iterator[sqlite3.Connection]:
+    """Yield a recorded connection whose workload is saved to ``path`` on exit."""
+    recorder = WorkloadRecorder()
+    conn = recorder.connect(db_path, **kwargs)
+    try:
+        yield conn
+    finally:
+        conn.close()
+        recorder.save(path)
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> list[str]:
+    """Return the detail column of ``EXPLAIN QUERY PLAN``."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(details: list[str]) -> list[str]:
+    """Full scans (``SCAN x`` without an index) and temp B-tree sorts in a plan."""
+    return [d for d in details if _FULL_SCAN.fullmatch(d) or _TEMP_BTREE.fullmatch(d)]
+
+
+def _schema(conn: sqlite3.Connection) -> tuple[dict[str, list[str]], dict[str, str]]:
+    """(table -> columns, view -> CREATE VIEW SQL)."""
+    objects = conn.execute(
+        "SELECT name, type, sql FROM sqlite_master WHERE type IN ('table', 'view')"
+    ).fetchall()
+    tables = {
+        name: [row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')]
+        for name, kind, _ in objects
+        if kind == "table" and not name.startswith("sqlite_")
+    }
+    views = {name: sql for name, kind, sql in objects if kind == "view"}
+    return tables, views
+
+
+def _sources(sql: str, views: dict[str, str], seen: frozenset = frozenset()) -> dict[str, set]:
+    """Alias or name -> base tables it reads, expanding views (and their aliases)."""
+    aliases: dict[str, set] = {}
+    for name, alias in _SOURCE.findall(sql):
+        if name in seen:
+            continue
+        if name in views:
+            inner = _sources(views[name], views, seen | {name})
+            for key, bases in inner.items():
+                aliases.setdefault(key, set()).update(bases)
+            bases = set().union(*inner.values()) if inner else set()
+        else:
+            bases = {name}
+        aliases.setdefault(name, set()).update(bases)
+        if alias and alias.lower() not in _KEYWORDS:
+            aliases.setdefault(alias, set()).update(bases)
+    return aliases
+
+
+def _column(name: str, columns: list[str]) -> str | None:
+    """Return the base column of a referenced name.
+
+    Dictionary-encoded views expose ``<col>_key`` as ``<col>``.
+    """
+    if name in columns:
+        return name
+    return f"{name}_key" if f"{name}_key" in columns else None
+
+
+def _refs(text: str, table: str, columns: list[str], aliases: dict[str, set]) -> list[tuple]:
+    """(column, end offset) of every reference in ``text`` that can mean ``table``."""
+    found = []
+    for match in _REF.finditer(text):
+        qualifier, name = match.groups()
+        if qualifier and qualifier in aliases and table not in aliases[qualifier]:
+            continue
+        col = _column(name, columns)
+        if col:
+            found.append((col, match.end()))
+    return found
+
+
+def _clauses(sql: str) -> dict[str, str]:
+    """Top-level WHERE / GROUP BY / ORDER BY text (ignores nesting; good enough here)."""
+    parts, last, name = {}, 0, "select"
+    for match in _CLAUSE.finditer(sql):
+        parts[name] = parts.get(name, "") + " " + sql[last : match.start()]
+        name, last = _SPACE.sub(" ", match.group(1).lower()), match.end()
+    parts[name] = parts.get(name, "") + " " + sql[last:]
+    return parts
+
+
+def _unique(items) -> list:
+    return list(dict.fromkeys(items))
+
+
+def candidate_indexes(
+    sql: str, table: str, columns: list[str], views: dict[str, str]
+) -> list[tuple[str, ...]]:
+    """Column lists of indexes that could remove a scan of ``table`` in ``sql``."""
+    aliases = _sources(sql, views)
+    clauses = _clauses(sql)
+    where = clauses.get("where", "")
+    equality, ranges = [], []
+    for col, end in _refs(where, table, columns, aliases):
+        if _EQUALITY.match(where[end:]):
+            equality.append(col)
+        elif _RANGE.match(where[end:]):
+            ranges.append(col)
+    view_sql = " ".join(views[name] for name in aliases if name in views)
+    joins = [col for on in _ON.findall(sql) for col, _ in _refs(on, table, columns, aliases)]
+    grouping = [
+        col
+        for clause in ("group by", "order by")
+        for col, _ in _refs(clauses.get(clause, ""), table, columns, aliases)
+    ]
+    star = re.search(r"(?:SELECT|,)\s*(?:\w+\.)?\*", clauses["select"], re.IGNORECASE) is not None
+    view_joins = " ".join(_ON.findall(view_sql))
+    read = [col for col, _ in _refs(f"{sql} {view_joins}", table, columns, aliases)]
+
+    equality = _unique(equality)
+    keys = [
+        equality + ranges[:1] if ranges else equality + grouping,
+        _unique(joins + equality) + (ranges[:1] if ranges else grouping),
+        grouping,
+    ]
+    candidates = []
+    for key in keys:
+        key = _unique(key)[:MAX_INDEX_COLUMNS]
+        if not key:
+            continue
+        cover = _unique(key + read)
+        candidates.append(tuple(cover if not star and len(cover) <= MAX_INDEX_COLUMNS else key))
+    return _unique(candidates)
+
+
+def time_statement(conn: sqlite3.Connection, sql: str, repeats: int = REPEATS) -> float:
+    """Best wall time in seconds of running ``sql`` and fetching every row."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def analyze(conn: sqlite3.Connection, recorder: WorkloadRecorder) -> pd.DataFrame:
+    """Plan problems of each recorded read: fingerprint, count, sample, problems, tables.
+
+    ``tables`` are the base tables behind the full scans.
+    """
+    tables, views = _schema(conn)
+    rows = []
+    for row in recorder.workload().itertuples(index=False):
+        try:
+            problems = plan_problems(explain(conn, row.sample))
+        except sqlite3.Error:  # e.g. a table that no longer exists
+            continue
+        aliases = _sources(row.sample, views)
+        scanned = sorted(
+            {
+                base
+                for problem in problems
+                if (scan := _FULL_SCAN.fullmatch(problem))
+                for base in aliases.get(scan.group(1), {scan.group(1)})
+                if base in tables
+            }
+        )
+        rows.append((row.fingerprint, row.count, row.sample, problems, scanned))
+    return pd.DataFrame(rows, columns=["fingerprint", "count", "sample", "problems", "tables"])
+
+
+def _index_name(table: str, columns: tuple[str, ...]) -> str:
+    return f"{INDEX_PREFIX}{table}_{'_'.join(columns)}"[:120]
+
+
+def _existing_indexes(conn: sqlite3.Connection, table: str) -> set[tuple[str, ...]]:
+    return {
+        tuple(row[2] for row in conn.execute(f'PRAGMA index_info("{index[1]}")'))
+        for index in conn.execute(f'PRAGMA index_list("{table}")')
+    }
+
+
+def advise(
+    conn: sqlite3.Connection,
+    recorder: WorkloadRecorder,
+    max_indexes: int = MAX_INDEXES,
+    min_speedup: float = MIN_SPEEDUP,
+) -> pd.DataFrame:
+    """Measure candidate indexes for the recorded workload (``conn`` must be writable).
+
+    Returns one row per candidate, recommended ones first: index_name,
+    table, columns, ddl, statements (reads it was timed on), plan_fixes
+    (plan problems it removed), benefit_ms (count-weighted saving per pass
+    over the workload), build_ms and recommended.
+    """
+    tables, views = _schema(conn)
+    plans = analyze(conn, recorder)
+    plans = plans[plans["tables"].map(len) > 0]
+    before = {row.fingerprint: time_statement(conn, row.sample) for row in plans.itertuples()}
+
+    # (table, columns) -> fingerprints of the statements it is meant for
+    targets: dict[tuple[str, tuple[str, ...]], list[str]] = {}
+    for row in plans.itertuples():
+        for table in row.tables:
+            existing = _existing_indexes(conn, table)
+            for columns in candidate_indexes(row.sample, table, tables[table], views):
+                if columns not in existing:
+                    targets.setdefault((table, columns), []).append(row.fingerprint)
+
+    results, timings = [], {}
+    for (table, columns), fingerprints in targets.items():
+        name = _index_name(table, columns)
+        ddl = f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({", ".join(columns)})'
+        conn.execute("SAVEPOINT index_advisor")
+        try:
+            start = time.perf_counter()
+            conn.execute(ddl)
+            build = time.perf_counter() - start
+            benefit, fixes = 0.0, 0
+            for row in plans[plans["fingerprint"].isin(fingerprints)].itertuples():
+                after = time_statement(conn, row.sample)
+                timings[row.fingerprint, name] = after
+                benefit += row.count * (before[row.fingerprint] - after)
+                fixes += len(row.problems) - len(plan_problems(explain(conn, row.sample)))
+        finally:
+            conn.execute("ROLLBACK TO index_advisor")
+            conn.execute("RELEASE index_advisor")
+        results.append(
+            (name, table, list(columns), ddl, len(fingerprints), fixes, benefit * 1e3, build * 1e3)
+        )
+    advice = pd.DataFrame(
+        results,
+        columns=[
+            "index_name", "table", "columns", "ddl", "statements", "plan_fixes",
+            "benefit_ms", "build_ms",
+        ],
+    )  # fmt: skip
+
+    # The fastest candidate per statement, if it saves enough of its time
+    best: dict[str, tuple[float, str]] = {}
+    for (fingerprint, name), after in timings.items():
+        if after < best.get(fingerprint, (float("inf"), ""))[0]:
+            best[fingerprint] = (after, name)
+    chosen = {
+        name for fingerprint, (after, name) in best.items()
+        if after <= (1 - min_speedup) * before[fingerprint]
+    }  # fmt: skip
+    advice["recommended"] = advice["index_name"].isin(chosen)
+    advice = advice.sort_values(["recommended", "benefit_ms"], ascending=False, ignore_index=True)
+    advice.loc[max_indexes:, "recommended"] = False
+    return advice
+
+
+def create_indexes(conn: sqlite3.Connection, advice: pd.DataFrame) -> list[str]:
+    """Create the recommended indexes and refresh planner statistics; returns their names."""
+    chosen = advice[advice["recommended"]]
+    for ddl in chosen["ddl"]:
+        conn.execute(ddl)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return chosen["index_name"].tolist()
+
+
+def replay(conn: sqlite3.Connection, recorder: WorkloadRecorder) -> pd.DataFrame:
+    """Time every recorded read: fingerprint, count, seconds."""
+    rows = []
+    for row in recorder.workload().itertuples(index=False):
+        try:
+            rows.append((row.fingerprint, row.count, time_statement(conn, row.sample)))
+        except sqlite3.Error:
+            continue
+    return pd.DataFrame(rows, columns=["fingerprint", "count", "seconds"])
+
+
+def main() -> None:
+    """Report slow recorded reads and the indexes that would help (``--apply`` creates them)."""
+    parser = argparse.ArgumentParser(description="Recommend DW indexes from recorded queries.")
+    parser.add_argument("--workload", type=pathlib.Path, default=WORKLOAD_PATH)
+    parser.add_argument("--apply", action="store_true", help="Create the recommended indexes.")
+    parser.add_argument("--max-indexes", type=int, default=MAX_INDEXES)
+    args = parser.parse_args()
+
+    if not args.workload.exists():
+        print(f"No workload recorded at {args.workload}; connect via WorkloadRecorder first.")
+        return
+    recorder = WorkloadRecorder.load(args.workload)
+    conn = sqlite3.connect(DB_PATH)
+    plans = analyze(conn, recorder)
+    flagged = plans["problems"].map(bool)
+    print(f"{len(plans)} recorded reads, {int(flagged.sum())} with scans/sorts.")
+    for row in plans[flagged].itertuples():
+        print(f"  x{row.count:<6} {row.fingerprint[:90]}")
+        for problem in row.problems:
+            print(f"           {problem}")
+
+    advice = advise(conn, recorder, max_indexes=args.max_indexes)
+    chosen = advice[advice["recommended"]]
+    if chosen.empty:
+        print("No index saves enough time on this workload.")
+    else:
+        print(chosen[["ddl", "statements", "plan_fixes", "benefit_ms"]].to_string(index=False))
+
+    if args.apply and not chosen.empty:
+        before = replay(conn, recorder)
+        create_indexes(conn, advice)
+        after = replay(conn, recorder)
+        both = before.merge(after, on=["fingerprint", "count"], suffixes=("_before", "_after"))
+        total_before = (both["count"] * both["seconds_before"]).sum()
+        total_after = (both["count"] * both["seconds_after"]).sum()
+        print(f"Created {len(chosen)} indexes.")
+        print(
+            f"Recorded workload: {total_before * 1000:.1f} ms -> {total_after * 1000:.1f} ms "
+            f"({total_before / max(total_after, 1e-9):.1f}x)."
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
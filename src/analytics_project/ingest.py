@@ -0,0 +1,164 @@
+"""Parallel ingestion of sharded raw sales files.
+
+Production delivers sales as many files (one per store per day) under
+``data/raw/sales/``, optionally gzip- or zstd-compressed. Each file is read
+and cleaned in its own worker process, then the results are concatenated
+and de-duplicated across files:
+
+- identical rows delivered in more than one file are dropped, and
+- if a TransactionID still appears more than once (a corrected
+  re-delivery), the row from the file that sorts last wins.
+
+Per-file stats (rows in/out, seconds) are returned and logged.
+
+Usage (from project root):
+    python -m src.analytics_project.ingest                 # data/raw/sales/*
+    python -m src.analytics_project.ingest "data/raw/sales/2025-05-*.csv.gz" --workers 4
+"""
+
+import argparse
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import pathlib
+import time
+
+import pandas as pd
+
+from src.analytics_project.columnar_io import write_table
+from src.analytics_project.quality_log import QUALITY_LOG, flush
+from src.analytics_project.sales_rules import clean_sales
+from src.utils.logger import init_logger, logger, project_root
+
+SALES_SHARD_DIR: pathlib.Path = project_root.joinpath("data", "raw", "sales")
+SHARD_PATTERNS: tuple[str, ...] = ("*.csv", "*.csv.gz", "*.csv.zst")
+
+
+def find_shards(pattern: str | None = None) -> list[pathlib.Path]:
+    """Return the raw sales files to ingest, sorted by name.
+
+    Args:
+        pattern: Glob relative to the project root (e.g.
+            "data/raw/sales/*.csv.gz"); defaults to every SHARD_PATTERNS
+            match in SALES_SHARD_DIR.
+    """
+    if pattern:
+        return sorted(project_root.glob(pattern))
+    return sorted({p for glob in SHARD_PATTERNS for p in SALES_SHARD_DIR.glob(glob)})
+
+
+def read_shard(path: pathlib.Path) -> pd.DataFrame:
+    """Read one raw CSV file; compression is inferred from the extension."""
+    try:
+        return pd.read_csv(path, compression="infer")
+    except ImportError as e:
+        # pandas needs the zstandard package for .zst files
+        raise ImportError(f"Reading {path.name} needs an extra package: {e}") from e
+
+
+def _clean_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return clean_sales(df)[0]
+
+
+def _ingest_one(
+    path: pathlib.Path, clean: Callable[[pd.DataFrame], pd.DataFrame]
+) -> tuple[pd.DataFrame, dict, dict]:
+    """Worker: read and clean one file.
+
+    Returns the frame, its stats and the data-quality events it recorded
+    (taken from this process's log so the parent can merge them).
+    """
+    start = time.perf_counter()
+    raw = read_shard(path)
+    df = clean(raw)
+    df["_shard"] = path.name
+    stats = {
+        "file": path.name,
+        "rows_in": len(raw),
+        "rows_out": len(df),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    return df, stats, QUALITY_LOG.take()
+
+
+def ingest_files(
+    paths: list[pathlib.Path],
+    clean: Callable[[pd.DataFrame], pd.DataFrame] = _clean_sales_frame,
+    workers: int | None = None,
+    key: str = "TransactionID",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Clean ``paths`` in a process pool and merge them with cross-file dedup.
+
+    Args:
+        paths: Raw files, in delivery order (later files win key conflicts).
+        clean: Top-level (picklable) function applied to each raw frame.
+        workers: Worker processes (default: one per core, at most one per file).
+        key: Column that identifies a row across files.
+
+    Returns:
+        tuple: (merged DataFrame, per-file stats DataFrame).
+    """
+    if not paths:
+        raise FileNotFoundError("No raw sales files to ingest.")
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers > 1:
+        # Spawned workers don't inherit the parent's threads or held locks
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(_ingest_one, paths, [clean] * len(paths)))
+    else:
+        results = [_ingest_one(path, clean) for path in paths]
+
+    for _, _, events in results:
+        QUALITY_LOG.merge(events)
+    merged = pd.concat([df for df, _, _ in results], ignore_index=True)
+    stats = pd.DataFrame([s for _, s, _ in results])
+
+    before = len(merged)
+    merged = merged.drop_duplicates(subset=[c for c in merged.columns if c != "_shard"])
+    exact_duplicates = before - len(merged)
+    before = len(merged)
+    if key in merged.columns:
+        merged = merged.drop_duplicates(subset=[key], keep="last")
+    replaced = before - len(merged)
+
+    # Rows each file contributed after cross-file dedup
+    kept = merged["_shard"].value_counts()
+    stats["rows_kept"] = stats["file"].map(kept).fillna(0).astype(int)
+    merged = merged.drop(columns="_shard").reset_index(drop=True)
+
+    logger.info(
+        f"Ingested {len(paths)} files with {workers} workers: {len(merged)} rows "
+        f"({exact_duplicates} cross-file duplicates, {replaced} re-delivered {key}s replaced)."
+    )
+    for row in stats.itertuples(index=False):
+        logger.info(
+            f"{row.file}: {row.rows_in} in, {row.rows_out} clean, {row.rows_kept} kept, {row.seconds}s"
+        )
+    return merged, stats
+
+
+def ingest_sales(
+    pattern: str | None = None, workers: int | None = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Ingest every matching raw sales file with the sales cleaning rules."""
+    return ingest_files(find_shards(pattern), _clean_sales_frame, workers)
+
+
+def main() -> None:
+    """Ingest the sharded sales files and save the merged table."""
+    parser = argparse.ArgumentParser(description="Clean sharded raw sales files in parallel.")
+    parser.add_argument("pattern", nargs="?", help="Glob relative to the project root.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: cores).")
+    args = parser.parse_args()
+
+    df, _ = ingest_sales(args.pattern, args.workers)
+    flush()
+    path = write_table(df, project_root.joinpath("data", "prepared", "sales_data_prepared"))
+    logger.info(f"Saved {len(df)} ingested sales rows to {path}")
+
+
+if __name__ == "__main__":
+    init_logger()
+    main()
@@ -0,0 +1,349 @@
+"""Lazy, DW-backed frames: build a query with pandas-like calls, run it once.
+
+``pd.read_sql("SELECT * FROM sales", conn)`` followed by pandas filtering
+pulls the whole fact table into memory. A LazyFrame only records
+``filter``, ``select``, ``groupby().agg``, ``merge``, ``sort_values`` and
+``head`` calls and compiles them into one SQL statement. Nothing is read
+until ``collect()``, so only the rows and columns that are needed leave
+SQLite.
+
+Steps that rename or reshape columns (groupby, merge) become subqueries;
+SQLite's query flattener pushes later filters back into them.
+
+Usage:
+    sales = scan(conn, "sales")
+    big = sales.filter((col("sale_amount") > 100) & col("store_id").isin([401, 402]))
+    by_store = big.groupby("store_id").agg(revenue=("net_revenue", "sum"))
+    df = by_store.sort_values("revenue", ascending=False).head(5).collect()
+"""
+
+import sqlite3
+
+import pandas as pd
+
+# pandas aggregation name -> SQL template
+AGG_FUNCTIONS = {
+    "sum": "SUM({})",
+    "mean": "AVG({})",
+    "count": "COUNT({})",
+    "size": "COUNT(*)",
+    "min": "MIN({})",
+    "max": "MAX({})",
+    "nunique": "COUNT(DISTINCT {})",
+}
+
+
+def _quote(name: str) -> str:
+    """Quote an identifier for SQLite."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class Expr:
+    """A SQL boolean or value expression with its bound parameters.
+
+    ``columns`` holds the names referenced through col(), so frames can
+    reject expressions over columns they no longer have.
+    """
+
+    def __init__(self, sql: str, params: tuple = (), columns: frozenset = frozenset()):
+        """Wrap SQL text, its parameters and the columns it references."""
+        self.sql = sql
+        self.params = tuple(params)
+        self.columns = frozenset(columns)
+
+    def _binary(self, op: str, other) -> "Expr":
+        if isinstance(other, Expr):
+            return Expr(
+                f"({self.sql} {op} {other.sql})",
+                self.params + other.params,
+                self.columns | other.columns,
+            )
+        return Expr(f"({self.sql} {op} ?)", self.params + (other,), self.columns)
+
+    def __eq__(self, other):  # type: ignore[override]
+        """Compare with ``=`` (``== None`` tests IS NULL)."""
+        if other is None:
+            return self.isnull()
+        return self._binary("=", other)
+
+    def __ne__(self, other):  # type: ignore[override]
+        """Compare with ``!=`` (``!= None`` tests IS NOT NULL)."""
+        if other is None:
+            return self.notnull()
+        return self._binary("!=", other)
+
+    def __lt__(self, other):
+        """Compare with ``<``."""
+        return self._binary("<", other)
+
+    def __le__(self, other):
+        """Compare with ``<=``."""
+        return self._binary("<=", other)
+
+    def __gt__(self, other):
+        """Compare with ``>``."""
+        return self._binary(">", other)
+
+    def __ge__(self, other):
+        """Compare with ``>=``."""
+        return self._binary(">=", other)
+
+    def __and__(self, other):
+        """Combine with AND."""
+        return self._binary("AND", other)
+
+    def __or__(self, other):
+        """Combine with OR."""
+        return self._binary("OR", other)
+
+    def __invert__(self):
+        """Negate with NOT."""
+        return Expr(f"(NOT {self.sql})", self.params, self.columns)
+
+    __hash__ = None  # comparisons build expressions, so Expr can't be a dict key
+
+    def isin(self, values) -> "Expr":
+        """Test membership in ``values`` (an empty list matches nothing)."""
+        values = list(values)
+        if not values:
+            return Expr("(0)", columns=self.columns)
+        return Expr(
+            f"({self.sql} IN ({', '.join('?' * len(values))}))",
+            self.params + tuple(values),
+            self.columns,
+        )
+
+    def between(self, low, high) -> "Expr":
+        """Test ``low <= value <= high``."""
+        return Expr(f"({self.sql} BETWEEN ? AND ?)", self.params + (low, high), self.columns)
+
+    def isnull(self) -> "Expr":
+        """Test IS NULL."""
+        return Expr(f"({self.sql} IS NULL)", self.params, self.columns)
+
+    def notnull(self) -> "Expr":
+        """Test IS NOT NULL."""
+        return Expr(f"({self.sql} IS NOT NULL)", self.params, self.columns)
+
+
+def col(name: str) -> Expr:
+    """Return an expression referencing a column of the frame being filtered."""
+    return Expr(_quote(name), columns={name})
+
+
+class LazyFrame:
+    """A query over DW tables that runs only on collect()."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        source: str,
+        params: tuple = (),
+        columns: list[str] | None = None,
+        where: tuple[Expr, ...] = (),
+        order: tuple[str, ...] = (),
+        limit: int | None = None,
+    ):
+        """Select from ``source``; use scan() rather than calling this directly."""
+        self.conn = conn
+        self._source = source  # FROM clause: quoted table or "(subquery) AS t"
+        self._params = tuple(params)
+        self._columns = columns
+        self._where = where
+        self._order = order
+        self._limit = limit
+
+    def _replace(self, **changes) -> "LazyFrame":
+        state = {
+            "source": self._source,
+            "params": self._params,
+            "columns": self._columns,
+            "where": self._where,
+            "order": self._order,
+            "limit": self._limit,
+        }
+        state.update(changes)
+        return LazyFrame(self.conn, **state)
+
+    def _check_columns(self, names) -> None:
+        """Raise KeyError, like pandas, for names that are not frame columns."""
+        missing = set(names) - set(self.columns)
+        if missing:
+            raise KeyError(f"Columns not in frame: {sorted(missing)}")
+
+    def _subquery(self) -> "LazyFrame":
+        """Wrap the current query so later steps see its output columns."""
+        sql, params = self.to_sql()
+        return LazyFrame(self.conn, f"({sql}) AS t", params)
+
+    # -- building --------------------------------------------------------
+    def filter(self, condition: Expr | str, *params) -> "LazyFrame":
+        """Keep rows matching an Expr (see col()) or a raw SQL predicate.
+
+        Raw SQL predicates are passed through unchecked.
+        """
+        if isinstance(condition, str):
+            condition = Expr(f"({condition})", params)
+        self._check_columns(condition.columns)
+        frame = self._subquery() if self._limit is not None else self
+        return frame._replace(where=frame._where + (condition,))
+
+    def select(self, *columns: str) -> "LazyFrame":
+        """Keep only the given columns."""
+        columns = (
+            list(columns[0])
+            if len(columns) == 1 and isinstance(columns[0], list)
+            else list(columns)
+        )
+        if self._columns is not None:
+            self._check_columns(columns)
+        return self._replace(columns=columns)
+
+    def __getitem__(self, columns) -> "LazyFrame":
+        """Select a column or a list of columns, like ``df[...]``."""
+        return self.select(columns if isinstance(columns, list) else [columns])
+
+    def groupby(self, by: str | list[str]) -> "LazyGroupBy":
+        """Group by one or more columns; call agg() on the result."""
+        return LazyGroupBy(self, [by] if isinstance(by, str) else list(by))
+
+    def merge(
+        self,
+        other: "LazyFrame",
+        on: str | list[str] | None = None,
+        how: str = "inner",
+        left_on: str | list[str] | None = None,
+        right_on: str | list[str] | None = None,
+        suffixes: tuple[str, str] = ("_x", "_y"),
+    ) -> "LazyFrame":
+        """Join with another LazyFrame on the same connection (inner or left)."""
+        if other.conn is not self.conn:
+            raise ValueError("Both frames must use the same connection.")
+        if how not in ("inner", "left"):
+            raise ValueError("Only 'inner' and 'left' merges are supported in SQLite.")
+        left_keys = [on] if isinstance(on, str) else list(on or [])
+        right_keys = left_keys
+        if not left_keys:
+            left_keys = [left_on] if isinstance(left_on, str) else list(left_on or [])
+            right_keys = [right_on] if isinstance(right_on, str) else list(right_on or [])
+        if not left_keys or len(left_keys) != len(right_keys):
+            raise ValueError("Give 'on', or 'left_on' and 'right_on' of equal length.")
+
+        left_cols, right_cols = self.columns, other.columns
+        shared_keys = set(left_keys) & set(right_keys) if on is not None else set()
+        right_out = [c for c in right_cols if c not in shared_keys]
+        overlap = (set(left_cols) & set(right_out)) - shared_keys
+        select = [
+            f"l.{_quote(c)} AS {_quote(c + suffixes[0] if c in overlap else c)}" for c in left_cols
+        ] + [
+            f"r.{_quote(c)} AS {_quote(c + suffixes[1] if c in overlap else c)}" for c in right_out
+        ]
+        condition = " AND ".join(
+            f"l.{_quote(a)} = r.{_quote(b)}" for a, b in zip(left_keys, right_keys, strict=True)
+        )
+        left_sql, left_params = self.to_sql()
+        right_sql, right_params = other.to_sql()
+        join = "LEFT JOIN" if how == "left" else "JOIN"
+        sql = (
+            f"SELECT {', '.join(select)} FROM ({left_sql}) AS l "  # noqa: S608
+            f"{join} ({right_sql}) AS r ON {condition}"
+        )
+        return LazyFrame(self.conn, f"({sql}) AS t", left_params + right_params)
+
+    def sort_values(self, by: str | list[str], ascending: bool | list[bool] = True) -> "LazyFrame":
+        """Order the rows by ``by`` (applied after any earlier head())."""
+        by = [by] if isinstance(by, str) else list(by)
+        ascending = [ascending] * len(by) if isinstance(ascending, bool) else list(ascending)
+        self._check_columns(by)
+        order = tuple(
+            f"{_quote(c)} {'ASC' if a else 'DESC'}" for c, a in zip(by, ascending, strict=True)
+        )
+        frame = self._subquery() if self._limit is not None else self
+        return frame._replace(order=order)
+
+    def head(self, n: int = 5) -> "LazyFrame":
+        """Keep the first ``n`` rows."""
+        limit = n if self._limit is None else min(n, self._limit)
+        return self._replace(limit=limit)
+
+    # -- compiling and running -------------------------------------------
+    def to_sql(self) -> tuple[str, tuple]:
+        """Return the compiled SQL statement and its parameters."""
+        select = ", ".join(_quote(c) for c in self._columns) if self._columns is not None else "*"
+        return self._compile(select)
+
+    def _compile(self, select: str, group_by: str | None = None) -> tuple[str, tuple]:
+        sql = f"SELECT {select} FROM {self._source}"  # noqa: S608
+        params = self._params
+        if self._where:
+            sql += " WHERE " + " AND ".join(e.sql for e in self._where)
+            params += tuple(p for e in self._where for p in e.params)
+        if group_by:
+            sql += f" GROUP BY {group_by}"
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+        return sql, params
+
+    @property
+    def columns(self) -> list[str]:
+        """Output column names (from the compiled query, without reading rows)."""
+        if self._columns is not None:
+            return list(self._columns)
+        sql, params = self.to_sql()
+        cursor = self.conn.execute(f"SELECT * FROM ({sql}) LIMIT 0", params)  # noqa: S608
+        return [d[0] for d in cursor.description]
+
+    def explain(self) -> str:
+        """Return SQLite's query plan for the compiled statement."""
+        sql, params = self.to_sql()
+        rows = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return "\n".join(row[-1] for row in rows)
+
+    def collect(self) -> pd.DataFrame:
+        """Run the query and return the result as a DataFrame."""
+        sql, params = self.to_sql()
+        return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def __repr__(self) -> str:
+        """Show the compiled SQL."""
+        return f"LazyFrame({self.to_sql()[0]!r})"
+
+
+class LazyGroupBy:
+    """Result of LazyFrame.groupby(); call agg() to get a LazyFrame back."""
+
+    def __init__(self, frame: LazyFrame, keys: list[str]):
+        """Group ``frame`` by the ``keys`` columns."""
+        self.frame = frame
+        self.keys = keys
+
+    def agg(self, **aggregations: tuple[str, str]) -> LazyFrame:
+        """Named aggregations, e.g. ``agg(revenue=("net_revenue", "sum"))``."""
+        if not aggregations:
+            raise ValueError("agg() needs at least one named aggregation.")
+        self.frame._check_columns(self.keys + [column for column, _ in aggregations.values()])
+        exprs = []
+        for name, (column, func) in aggregations.items():
+            if func not in AGG_FUNCTIONS:
+                raise ValueError(
+                    f"Unsupported aggregation '{func}'. Choose from {list(AGG_FUNCTIONS)}."
+                )
+            exprs.append(f"{AGG_FUNCTIONS[func].format(_quote(column))} AS {_quote(name)}")
+        keys = ", ".join(_quote(k) for k in self.keys)
+        inner = self.frame._replace(columns=None, order=())
+        if self.frame._limit is not None:
+            inner = self.frame._subquery()
+        sql, params = inner._compile(f"{keys}, {', '.join(exprs)}", group_by=keys)
+        return LazyFrame(self.frame.conn, f"({sql}) AS t", params)
+
+
+def scan(conn: sqlite3.Connection, table: str) -> LazyFrame:
+    """Start a lazy query over a DW table or view (e.g. "sales", "customer")."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?;", (table,)
+    ).fetchone()
+    if not exists:
+        raise KeyError(f"No table or view named '{table}' in the DW.")
+    return LazyFrame(conn, _quote(table))
@@ -0,0 +1,203 @@
+"""Memory-budget mode: compact dtypes, budget-sized chunks, peak RSS per stage.
+
+Pandas defaults (int64/float64 everywhere, Python-object text) make the
+tables several times larger than they need to be. With a memory budget set
+(``SMART_STORE_MEMORY_MB`` or the pipeline's ``--memory-mb``):
+
+- raw CSVs are read in chunks sized from a sampled bytes-per-row estimate,
+  so one chunk uses at most CHUNK_SHARE of the budget,
+- every chunk and every cleaned table is downcast: integers to the smallest
+  of int8/int16/int32, floats to float32 when no value changes, and
+  low-cardinality text to category,
+- each pipeline stage logs its peak resident set size (RSS).
+
+Usage:
+    df = read_csv_within_budget(path, budget_mb=512)
+    with track_stage("load"):
+        ...
+"""
+
+from contextlib import contextmanager
+import os
+import pathlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from src.utils.logger import logger
+
+# Budget in MB for the whole pipeline (unset = no budget, pandas defaults)
+MEMORY_BUDGET_MB: float | None = (
+    float(os.environ["SMART_STORE_MEMORY_MB"]) if os.environ.get("SMART_STORE_MEMORY_MB") else None
+)
+
+# Share of the budget one raw chunk may take (cleaning makes copies)
+CHUNK_SHARE = 0.25
+
+# Text columns with at most this share of distinct values become category
+CATEGORY_RATIO = 0.5
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_SECONDS = 0.01
+
+
+def _is_text(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def downcast(
+    df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO, parse_numeric_text: bool = False
+) -> pd.DataFrame:
+    """Return ``df`` with the smallest dtypes that keep every value.
+
+    Args:
+        df: Table to shrink (not modified).
+        category_ratio: Text columns with distinct/rows at or below this
+            become category.
+        parse_numeric_text: Also turn text columns whose values are all
+            integers (e.g. IDs saved with astype(str)) into integer columns.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if parse_numeric_text and _is_text(series) and series.notna().all():
+            parsed = pd.to_numeric(series, errors="coerce")
+            if parsed.notna().all() and (parsed == parsed.round()).all():
+                series = parsed.astype(np.int64)
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_integer_dtype(series):
+            series = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series) and series.dtype.itemsize > 4:
+            values = series.to_numpy(np.float64, na_value=np.nan)
+            as32 = values.astype(np.float32)
+            if np.array_equal(as32.astype(np.float64), values, equal_nan=True):
+                series = series.astype(
+                    np.float32 if isinstance(series.dtype, np.dtype) else "Float32"
+                )
+        elif (
+            _is_text(series)
+            and len(series)
+            and series.nunique(dropna=True) <= category_ratio * len(series)
+        ):
+            series = series.astype("category")
+        out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Deep memory usage of a DataFrame in MB."""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def estimate_row_bytes(path: pathlib.Path, sample_rows: int = 2000) -> float:
+    """Bytes per row of a CSV once read and downcast, from its first rows."""
+    sample = pd.read_csv(path, nrows=sample_rows)
+    if sample.empty:
+        return 1.0
+    return max(downcast(sample).memory_usage(deep=True).sum() / len(sample), 1.0)
+
+
+def chunk_rows(row_bytes: float, budget_mb: float, share: float = CHUNK_SHARE) -> int:
+    """Rows per chunk so one chunk stays under ``share`` of the budget."""
+    return max(int(budget_mb * 1e6 * share / row_bytes), 1000)
+
+
+def _concat(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate downcast chunks, keeping category columns categorical."""
+    if len(chunks) == 1:
+        return chunks[0]
+    first = chunks[0]
+    columns = {}
+    for col in first.columns:
+        parts = [c[col] for c in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = pd.Series(union_categoricals(parts, ignore_order=True))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_csv_within_budget(
+    path: pathlib.Path, budget_mb: float | None = None, category_ratio: float = CATEGORY_RATIO
+) -> pd.DataFrame:
+    """Read a CSV in budget-sized chunks, downcasting each one.
+
+    Without a budget (argument or MEMORY_BUDGET_MB) this is pd.read_csv().
+    Pass ``category_ratio=0`` to keep text as text (e.g. before string cleaning).
+    """
+    budget_mb = budget_mb or MEMORY_BUDGET_MB
+    if not budget_mb:
+        return pd.read_csv(path)
+    rows = chunk_rows(estimate_row_bytes(path), budget_mb)
+    chunks = [downcast(c, category_ratio) for c in pd.read_csv(path, chunksize=rows)]
+    df = _concat(chunks) if chunks else pd.read_csv(path, nrows=0)
+    logger.info(
+        f"{pathlib.Path(path).name}: read in {len(chunks)} chunk(s) of {rows} rows, {memory_mb(df):.1f} MB"
+    )
+    return df
+
+
+def current_rss_mb() -> float | None:
+    """Resident set size of this process in MB, or None if it can't be read."""
+    try:
+        with pathlib.Path("/proc/self/statm").open(encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        return None
+
+
+# Peak RSS per stage recorded by track_stage(), in run order
+STAGE_REPORT: list[dict] = []
+
+
+@contextmanager
+def track_stage(name: str, budget_mb: float | None = None):
+    """Sample RSS while the block runs and log the stage's peak.
+
+    A warning is logged if the peak exceeds the budget.
+    """
+    budget_mb = budget_mb or MEMORY_BUDGET_MB
+    start_rss = current_rss_mb()
+    peak = [start_rss or 0.0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            rss = current_rss_mb()
+            if rss is not None:
+                peak[0] = max(peak[0], rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        done.set()
+        sampler.join()
+        end_rss = current_rss_mb()
+        if end_rss is not None:
+            peak[0] = max(peak[0], end_rss)
+        entry = {
+            "stage": name,
+            "seconds": round(time.perf_counter() - start, 3),
+            "start_rss_mb": None if start_rss is None else round(start_rss, 1),
+            "peak_rss_mb": None if start_rss is None else round(peak[0], 1),
+        }
+        STAGE_REPORT.append(entry)
+        logger.info(
+            f"Stage {name}: {entry['seconds']}s, peak RSS {entry['peak_rss_mb']} MB "
+            f"(start {entry['start_rss_mb']} MB)"
+        )
+        if budget_mb and entry["peak_rss_mb"] and entry["peak_rss_mb"] > budget_mb:
+            logger.warning(f"Stage {name} peaked above the {budget_mb} MB budget.")
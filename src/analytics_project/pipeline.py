@@ -0,0 +1,168 @@
+"""Fused raw-to-DW pipeline: clean and load in one process.
+
+The two-step workflow (data_prep.main() writes data/clean/*.csv, then
+etl_to_dw.main() parses them again) formats and re-parses every row twice,
+and types are lost on the way (IDs become floats, dates become strings).
+This module passes the cleaned DataFrames from data_prep straight into
+etl_to_dw.load_dw(). Writing data/clean/ is an optional side output that runs
+on a background thread while the load proceeds.
+
+Usage (from project root):
+    python -m src.analytics_project.pipeline                     # clean + load + write data/clean
+    python -m src.analytics_project.pipeline --no-intermediate   # clean + load only
+    python -m src.analytics_project.pipeline --memory-mb 256     # memory-budget mode
+    python -m src.analytics_project.pipeline --profile           # per-stage profiles
+    python -m src.analytics_project.pipeline --arrow-strings     # Arrow string kernels
+"""
+
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+import pathlib
+
+import pandas as pd
+
+from src.analytics_project import data_prep, etl_to_dw
+from src.analytics_project.anomaly import STATE_PATH, StoreAnomalyDetector
+from src.analytics_project.dim_cache import DimensionCache, peek_shared_cache, set_shared_cache
+from src.analytics_project.memory import track_stage
+from src.analytics_project.profiling import enable_profiling
+from src.analytics_project.rolling import ROLLING_DIR, RollingMetrics
+from src.analytics_project.shadow_db import shadow_build
+from src.analytics_project.topn import TopNEngine
+from src.utils.logger import init_logger, logger
+
+
+def load_and_publish(
+    db_path: str | pathlib.Path,
+    customers_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+    sales_df: pd.DataFrame,
+) -> dict[str, int]:
+    """Load the DW in a shadow copy and publish it, updating the derived state.
+
+    Every sales batch load_dw() inserts also feeds the Top-N summaries, the
+    rolling-window cubes and the store anomaly detector; new alerts go into
+    the same shadow. For an on-disk DW the state files are saved next to it
+    (the detector's running statistics are loaded from there first, so they
+    carry over between loads). A copy of the DW's shared DimensionCache, if
+    loaded, is refreshed with only the dimension rows that changed and
+    becomes the shared cache once the shadow is published. Used by
+    run_fused() and etl_to_dw.main().
+
+    Returns:
+        dict[str, int]: Row counts per DW table after the load.
+    """
+    on_disk = str(db_path) != ":memory:"
+    anomaly_state = pathlib.Path(db_path).with_name(STATE_PATH.name)
+    live_cache = peek_shared_cache(db_path) if on_disk else None
+    dim_cache = DimensionCache() if live_cache is None else live_cache.copy()
+    topn = TopNEngine()
+    rolling = RollingMetrics()
+    if on_disk and anomaly_state.exists():
+        anomalies = StoreAnomalyDetector.load(anomaly_state)
+    else:
+        anomalies = StoreAnomalyDetector()
+    with shadow_build(db_path) as conn:
+        counts = etl_to_dw.load_dw(
+            conn,
+            customers_df,
+            products_df,
+            sales_df,
+            batch_consumers=[topn, rolling, anomalies],
+            dim_cache=dim_cache,
+        )
+        alerts = anomalies.write_alerts(conn)
+    logger.info(f"Store anomaly alerts: {alerts}")
+    if on_disk:
+        set_shared_cache(db_path, dim_cache)
+        topn.save(pathlib.Path(db_path).with_name(etl_to_dw.TOPN_PATH.name))
+        rolling.save(pathlib.Path(db_path).with_name(ROLLING_DIR.name))
+        anomalies.save(anomaly_state)
+    return counts
+
+
+def run_fused(
+    db_path=etl_to_dw.DB_PATH,
+    write_intermediate: bool = True,
+    memory_budget_mb: float | None = None,
+    arrow_strings: bool | None = None,
+) -> dict[str, int]:
+    """Clean the raw tables and load them into the DW without CSV round-trips.
+
+    Args:
+        db_path: SQLite database to load (":memory:" works too). The load
+            runs in a shadow copy that replaces it when complete (shadow_db.py).
+        write_intermediate: Also write the cleaned tables to data/clean/ in the
+            background. The files are finished before this function returns.
+        memory_budget_mb: Run in memory-budget mode (chunked reads, compact
+            dtypes); defaults to memory.MEMORY_BUDGET_MB. Peak RSS is logged
+            per stage either way.
+        arrow_strings: Clean text as Arrow-backed strings (defaults to
+            data_prep.ARROW_STRINGS).
+
+    Returns:
+        dict[str, int]: Row counts per DW table after the load.
+    """
+    logger.info("Starting fused raw-to-DW pipeline...")
+    with track_stage("clean", memory_budget_mb):
+        cleaned, ingest_stats = data_prep.clean_all(memory_budget_mb, arrow_strings)
+    data_prep.log_ingest_stats(ingest_stats)
+
+    with ThreadPoolExecutor(max_workers=len(cleaned)) as writer:
+        pending: list[Future] = []
+        if write_intermediate:
+            # Each writer gets its own copy so the load can't race with to_csv
+            pending = [
+                writer.submit(data_prep.write_clean, table, df.copy())
+                for table, df in cleaned.items()
+            ]
+
+        with track_stage("load", memory_budget_mb):
+            counts = load_and_publish(
+                db_path, cleaned["customers"], cleaned["products"], cleaned["sales"]
+            )
+
+        for future in pending:
+            future.result()  # surface any write error
+
+    logger.info(f"Fused pipeline complete: {counts}")
+    return counts
+
+
+def main() -> None:
+    """Run the fused pipeline with the command-line options."""
+    parser = argparse.ArgumentParser(description="Clean raw data and load the DW in one pass.")
+    parser.add_argument(
+        "--no-intermediate",
+        action="store_true",
+        help="Skip writing the cleaned tables to data/clean/.",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=float,
+        help="Memory budget in MB (chunked reads, compact dtypes).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each stage (CPU + allocations) into profiles/ next to the log.",
+    )
+    parser.add_argument(
+        "--arrow-strings",
+        action="store_true",
+        default=None,
+        help="Clean text columns as Arrow-backed strings (needs pyarrow).",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+    run_fused(
+        write_intermediate=not args.no_intermediate,
+        memory_budget_mb=args.memory_mb,
+        arrow_strings=args.arrow_strings,
+    )
+
+
+if __name__ == "__main__":
+    init_logger()
+    main()
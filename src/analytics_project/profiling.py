@@ -0,0 +1,160 @@
+"""Opt-in CPU and allocation profiling per pipeline stage.
+
+Off by default. Enable with ``SMART_STORE_PROFILE=1`` or the pipeline's
+``--profile`` flag. While enabled, every ``profile_stage(name)`` block is
+run under:
+
+- cProfile (deterministic), saved as ``<stage>.pstats`` for pstats/snakeviz,
+- a stack sampler on the same thread, saved as ``<stage>.collapsed``
+  (``frame;frame;frame count`` lines, the input of flamegraph.pl/speedscope),
+- tracemalloc, comparing snapshots taken before and after the stage.
+
+Files go to ``profiles/<run id>/`` next to the log file from utils.logger,
+and the hottest functions and top allocation sites are logged.
+
+Only one stage is profiled at a time (cProfile can't nest); an inner
+profile_stage() inside a profiled stage is a no-op.
+
+Usage:
+    with profile_stage("load_sales"):
+        insert_sales(...)
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+from datetime import datetime
+import io
+import os
+import pathlib
+import pstats
+import sys
+import threading
+import tracemalloc
+
+from src.utils.logger import get_log_file_path, logger
+
+PROFILE_ENABLED: bool = os.environ.get("SMART_STORE_PROFILE", "") not in ("", "0")
+
+# Seconds between stack samples for the collapsed-stack output
+SAMPLE_INTERVAL = 0.005
+
+# Functions / allocation sites logged per stage
+TOP_N = 10
+
+_active = threading.Lock()
+_run_dir: pathlib.Path | None = None
+
+
+def enable_profiling(enabled: bool = True) -> None:
+    """Turn profiling on or off for this process (e.g. from a --profile flag)."""
+    global PROFILE_ENABLED
+    PROFILE_ENABLED = enabled
+
+
+def profile_dir() -> pathlib.Path:
+    """Folder for this run's profile files (created on first use)."""
+    global _run_dir
+    if _run_dir is None:
+        run_id = f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+        _run_dir = get_log_file_path().parent / "profiles" / run_id
+        _run_dir.mkdir(parents=True, exist_ok=True)
+    return _run_dir
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack and counts identical stacks."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({pathlib.Path(code.co_filename).name}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _write_reports(
+    name: str,
+    profiler: cProfile.Profile,
+    sampler: _StackSampler,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+) -> None:
+    folder = profile_dir()
+    profiler.dump_stats(folder / f"{name}.pstats")
+    with (folder / f"{name}.collapsed").open("w", encoding="utf-8") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("tottime").print_stats(TOP_N)
+    allocations = after.compare_to(before, "lineno")[:TOP_N]
+    alloc_lines = [str(stat) for stat in allocations]
+    (folder / f"{name}.txt").write_text(
+        text.getvalue() + "\nTop allocation sites:\n" + "\n".join(alloc_lines) + "\n",
+        encoding="utf-8",
+    )
+
+    hottest = sorted(
+        pstats.Stats(profiler).stats.items(), key=lambda item: item[1][2], reverse=True
+    )[:5]
+    logger.info(f"Profile [{name}] written to {folder}")
+    for (file, line, func), (_, calls, tottime, cumtime, _) in hottest:
+        logger.info(
+            f"  hot: {func} ({pathlib.Path(file).name}:{line}) "
+            f"{tottime:.3f}s self, {cumtime:.3f}s total, {calls} calls"
+        )
+    for stat in allocations[:5]:
+        logger.info(f"  alloc: {stat}")
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    """Snapshot of traced allocations, without the profiler's own."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    )
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Profile the block if profiling is enabled and no other stage is being profiled."""
+    if not PROFILE_ENABLED or not _active.acquire(blocking=False):
+        yield
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start()
+        before = _snapshot()
+        sampler = _StackSampler(threading.get_ident())
+        profiler = cProfile.Profile()
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+            after = _snapshot()
+            _write_reports(name, profiler, sampler, before, after)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active.release()
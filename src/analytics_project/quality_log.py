@@ -0,0 +1,165 @@
+"""Aggregated data-quality events: counts in memory, one summary per stage.
+
+Logging every bad row through loguru costs a formatted line (and a file
+write) per row. Instead, checks call ``record()`` with a boolean mask of the
+offending rows. The log keeps, per (stage, rule, column):
+
+- the number of offending rows, and
+- a bounded uniform sample of them (bottom-k on random priorities, so
+  samples from several batches or worker processes merge correctly).
+
+``flush()`` writes one log line per stage and appends the full summary,
+samples included, as one JSON line to ``data_quality.jsonl`` next to the
+log file. Diagnostics therefore cost O(1) log lines however many rows fail.
+
+Usage:
+    record("prepare_sales", "SaleAmount_range", "SaleAmount", mask, df)
+    flush("prepare_sales")
+"""
+
+from datetime import datetime
+import json
+import pathlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import get_log_file_path, logger
+
+# Offending rows kept per (stage, rule, column)
+SAMPLE_SIZE = 5
+
+
+class QualityLog:
+    """Counts and row samples per (stage, rule, column)."""
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE, seed: int | None = None):
+        """Keep up to ``sample_size`` rows per event, sampled with ``seed``."""
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        # (stage, rule, column) -> [count, priorities, rows]
+        self.events: dict[tuple[str, str, str | None], list] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        stage: str,
+        rule: str,
+        column: str | None,
+        mask: np.ndarray | pd.Series | int,
+        df: pd.DataFrame | None = None,
+    ) -> None:
+        """Count the rows flagged by ``mask`` (or an int count) and sample some of them."""
+        if isinstance(mask, (int, np.integer)):
+            count, positions = int(mask), None
+        else:
+            positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+            count = len(positions)
+        if count == 0:
+            return
+
+        with self._lock:
+            event = self.events.setdefault((stage, rule, column), [0, np.empty(0), []])
+            event[0] += count
+            if df is None or positions is None or not self.sample_size:
+                return
+            priorities = self.rng.random(len(positions))
+            if len(event[1]) >= self.sample_size:
+                # Only rows that beat the current k-th priority can enter
+                keep = priorities < event[1].max()
+                positions, priorities = positions[keep], priorities[keep]
+            best = np.argsort(priorities)[: self.sample_size]
+            rows = df.iloc[positions[best]]
+            records = [
+                {"_row": str(label), **{k: _plain(v) for k, v in row.items()}}
+                for label, row in zip(rows.index, rows.to_dict("records"), strict=True)
+            ]
+            self._merge_sample(event, priorities[best], records)
+
+    def _merge_sample(self, event: list, priorities: np.ndarray, rows: list[dict]) -> None:
+        all_priorities = np.concatenate([event[1], priorities])
+        all_rows = event[2] + rows
+        order = np.argsort(all_priorities)[: self.sample_size]
+        event[1] = all_priorities[order]
+        event[2] = [all_rows[i] for i in order]
+
+    def take(self) -> dict:
+        """Remove and return every recorded event (e.g. to ship from a worker)."""
+        with self._lock:
+            events, self.events = self.events, {}
+        return events
+
+    def merge(self, events: dict) -> None:
+        """Add events taken from another log (counts add, samples merge)."""
+        with self._lock:
+            for key, (count, priorities, rows) in events.items():
+                event = self.events.setdefault(key, [0, np.empty(0), []])
+                event[0] += count
+                self._merge_sample(event, priorities, rows)
+
+    def summary(self, stage: str) -> dict:
+        """Return the structured summary of one stage."""
+        with self._lock:
+            items = [(k, v) for k, v in self.events.items() if k[0] == stage]
+        events = [
+            {"rule": rule, "column": column, "count": count, "sample": rows}
+            for (_, rule, column), (count, _, rows) in sorted(items, key=lambda kv: -kv[1][0])
+        ]
+        return {
+            "stage": stage,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "total": sum(e["count"] for e in events),
+            "events": events,
+        }
+
+    def flush(self, stage: str | None = None, path: pathlib.Path | None = None) -> list[dict]:
+        """Log and write the summary of ``stage`` (or of every stage), then clear it."""
+        with self._lock:
+            stages = sorted({k[0] for k in self.events}) if stage is None else [stage]
+        path = path or get_log_file_path().with_name("data_quality.jsonl")
+        summaries = []
+        for name in stages:
+            summary = self.summary(name)
+            with self._lock:
+                for key in [k for k in self.events if k[0] == name]:
+                    del self.events[key]
+            if not summary["events"]:
+                continue
+            counts = ", ".join(
+                f"{e['rule']}[{e['column']}]={e['count']}"
+                if e["column"]
+                else f"{e['rule']}={e['count']}"
+                for e in summary["events"]
+            )
+            logger.info(f"Data quality [{name}]: {summary['total']} findings ({counts})")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, default=str) + "\n")
+            summaries.append(summary)
+        return summaries
+
+
+def _plain(value):
+    """Make a cell JSON-friendly (NumPy scalars, timestamps, missing values)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+# Process-wide log used by the cleaning and validation steps
+QUALITY_LOG = QualityLog()
+
+
+def record(stage, rule, column, mask, df=None) -> None:
+    """Record on the process-wide QUALITY_LOG (see QualityLog.record)."""
+    QUALITY_LOG.record(stage, rule, column, mask, df)
+
+
+def flush(stage: str | None = None) -> list[dict]:
+    """Flush the process-wide QUALITY_LOG (see QualityLog.flush)."""
+    return QUALITY_LOG.flush(stage)
@@ -0,0 +1,231 @@
+"""RFM (recency, frequency, monetary) customer segmentation over the DW.
+
+Per-customer R/F/M is computed in one grouped SQL pass pushed down to
+SQLite (only one row per customer reaches pandas). Scores (1-5) are
+assigned with vectorized quintile breakpoints, and the result is written to
+the ``customer_segment`` table.
+
+Incremental refresh: the highest transaction_id seen is kept in
+``customer_segment_state``. A refresh re-aggregates only customers who have
+sales above it; recency moves for everyone as ``as_of`` advances, so every
+stored row's recency is recomputed from its ``last_sale_date`` and all rows
+are rescored with the stored breakpoints. A full refresh recomputes every
+customer and the breakpoints. Transaction ids are assumed to grow as new
+sales are loaded.
+
+Usage (from project root):
+    python -m src.analytics_project.rfm          # incremental (full on first run)
+    python -m src.analytics_project.rfm --full
+"""
+
+import argparse
+from datetime import datetime
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.etl_to_dw import DB_PATH
+
+METRICS = ["recency_days", "frequency", "monetary"]
+QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+
+def create_rfm_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the segment, breakpoint and state tables if needed."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customer_segment (
+        customer_id INTEGER PRIMARY KEY,
+        last_sale_date TEXT,
+        recency_days INTEGER,
+        frequency INTEGER,
+        monetary REAL,
+        r_score INTEGER,
+        f_score INTEGER,
+        m_score INTEGER,
+        rfm_score TEXT,
+        segment TEXT,
+        as_of_date TEXT
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customer_segment_breaks (
+        metric TEXT,
+        quantile REAL,
+        value REAL,
+        PRIMARY KEY (metric, quantile)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS customer_segment_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_transaction_id INTEGER,
+        as_of_date TEXT,
+        refreshed_at TEXT
+    );
+    """)
+
+
+def compute_rfm_metrics(
+    conn: sqlite3.Connection, as_of: str, since_transaction_id: int | None = None
+) -> pd.DataFrame:
+    """Return recency/frequency/monetary per customer with one grouped query.
+
+    Args:
+        conn: DW connection.
+        as_of: ISO date recency is measured from.
+        since_transaction_id: If given, only customers with a sale above this
+            transaction_id are recomputed (over all of their sales).
+    """
+    where, params = "", []
+    if since_transaction_id is not None:
+        where = (
+            "WHERE s.customer_id IN (SELECT customer_id FROM sales_base WHERE transaction_id > ?)"
+        )
+        params = [since_transaction_id]
+    df = pd.read_sql_query(
+        f"""
+        SELECT s.customer_id,
+               MAX(s.sale_date) AS last_sale_date,
+               COUNT(*) AS frequency,
+               SUM(s.net_revenue) AS monetary
+        FROM sales_base s
+        JOIN customer_base c ON c.customer_id = s.customer_id
+        {where}
+        GROUP BY s.customer_id
+        """,  # noqa: S608
+        conn,
+        params=params,
+    )
+    df["recency_days"] = recency_days(df["last_sale_date"], as_of)
+    return df
+
+
+def recency_days(last_sale_date: pd.Series, as_of: str) -> pd.Series:
+    """Days from each customer's last sale to ``as_of``."""
+    return (pd.Timestamp(as_of) - pd.to_datetime(last_sale_date, errors="coerce")).dt.days
+
+
+def quantile_breaks(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Return the quintile breakpoints of each metric."""
+    return {m: np.nanquantile(df[m].to_numpy(float), QUANTILES) for m in METRICS}
+
+
+def score_rfm(df: pd.DataFrame, breaks: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Assign 1-5 scores and a segment label to every row at once."""
+
+    def bucket(metric: str, side: str) -> np.ndarray:
+        return np.searchsorted(breaks[metric], df[metric].to_numpy(float), side=side)
+
+    # Fewer days since the last sale = higher score (ties go to the better score)
+    df["r_score"] = 5 - bucket("recency_days", "left")
+    df["f_score"] = bucket("frequency", "right") + 1
+    df["m_score"] = bucket("monetary", "right") + 1
+    df["rfm_score"] = (
+        df["r_score"].astype(str) + df["f_score"].astype(str) + df["m_score"].astype(str)
+    )
+
+    r, f, m = df["r_score"], df["f_score"], df["m_score"]
+    df["segment"] = np.select(
+        [
+            (r >= 4) & (f >= 4) & (m >= 4),
+            f >= 4,
+            (r >= 4) & (f <= 2),
+            (r <= 2) & (f >= 3),
+            r <= 2,
+        ],
+        ["champions", "loyal", "new", "at_risk", "hibernating"],
+        default="potential",
+    )
+    return df
+
+
+def _load_breaks(conn: sqlite3.Connection) -> dict[str, np.ndarray] | None:
+    rows = pd.read_sql_query(
+        "SELECT metric, value FROM customer_segment_breaks ORDER BY metric, quantile", conn
+    )
+    if rows.empty:
+        return None
+    return {m: g["value"].to_numpy(float) for m, g in rows.groupby("metric")}
+
+
+def refresh_rfm(conn: sqlite3.Connection, as_of: str | None = None, full: bool = False) -> int:
+    """Refresh ``customer_segment`` and return the number of customers written.
+
+    Args:
+        conn: DW connection.
+        as_of: ISO date for recency (defaults to the latest sale_date in the DW).
+        full: Recompute every customer and the score breakpoints.
+    """
+    cursor = conn.cursor()
+    create_rfm_tables(cursor)
+    as_of = as_of or cursor.execute("SELECT MAX(sale_date) FROM sales_base;").fetchone()[0]
+    if as_of is None:
+        return 0  # no sales loaded yet
+
+    state = cursor.execute(
+        "SELECT last_transaction_id FROM customer_segment_state WHERE id = 1;"
+    ).fetchone()
+    breaks = _load_breaks(conn)
+    incremental = not full and state is not None and breaks is not None
+
+    df = compute_rfm_metrics(conn, as_of, state[0] if incremental else None)
+    if incremental:
+        # Customers without new sales keep F/M but their recency moves with as_of
+        stored = pd.read_sql_query(
+            "SELECT customer_id, last_sale_date, frequency, monetary FROM customer_segment", conn
+        )
+        stored = stored[~stored["customer_id"].isin(df["customer_id"])]
+        stored["recency_days"] = recency_days(stored["last_sale_date"], as_of)
+        df = pd.concat([stored, df], ignore_index=True)
+    else:
+        breaks = quantile_breaks(df)
+        cursor.execute("DELETE FROM customer_segment;")
+        cursor.execute("DELETE FROM customer_segment_breaks;")
+        cursor.executemany(
+            "INSERT INTO customer_segment_breaks VALUES (?, ?, ?);",
+            [(m, q, float(v)) for m in METRICS for q, v in zip(QUANTILES, breaks[m], strict=True)],
+        )
+    df = score_rfm(df, breaks)
+    df["as_of_date"] = as_of
+
+    columns = [
+        "customer_id", "last_sale_date", "recency_days", "frequency", "monetary",
+        "r_score", "f_score", "m_score", "rfm_score", "segment", "as_of_date",
+    ]  # fmt: skip
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO customer_segment ({', '.join(columns)}) "  # noqa: S608
+        f"VALUES ({', '.join('?' * len(columns))});",
+        df[columns].astype(object).where(df[columns].notna(), None).itertuples(index=False),
+    )
+    last_id = cursor.execute("SELECT MAX(transaction_id) FROM sales_base;").fetchone()[0]
+    cursor.execute(
+        "INSERT OR REPLACE INTO customer_segment_state VALUES (1, ?, ?, ?);",
+        (last_id, as_of, datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.commit()
+    return len(df)
+
+
+def main() -> None:
+    """Refresh the RFM customer segments in the DW."""
+    parser = argparse.ArgumentParser(description="Refresh RFM customer segments in the DW.")
+    parser.add_argument("--full", action="store_true", help="Recompute every customer.")
+    parser.add_argument("--as-of", help="ISO date for recency (default: latest sale).")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    written = refresh_rfm(conn, as_of=args.as_of, full=args.full)
+    print(f"customer_segment rows written: {written}")
+    print(
+        pd.read_sql_query(
+            "SELECT segment, COUNT(*) AS customers, ROUND(SUM(monetary), 2) AS monetary "
+            "FROM customer_segment GROUP BY segment ORDER BY monetary DESC",
+            conn,
+        ).to_string(index=False)
+    )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
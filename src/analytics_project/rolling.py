@@ -0,0 +1,391 @@
+"""Rolling-window sales metrics per store and per product via prefix sums.
+
+Rolling 7/28/90-day sales, transaction counts and average discounts used to
+be computed per report with pandas ``rolling`` over the whole sales fact.
+Instead, each dimension here keeps a dense day x key array of *cumulative*
+daily totals (a prefix sum along the day axis, with a leading zero row):
+
+    prefix[m, d, k] = sum of measure m for key k over the first d days
+
+so the total over any date range, and therefore any rolling window, is one
+subtraction per cell: ``prefix[m, last + 1, k] - prefix[m, first, k]``.
+
+- RollingMetrics.update() folds a batch of DW-shaped sales rows in (it is a
+  load_dw batch consumer, like TopNEngine). New days and keys grow the
+  buffers geometrically; only the batch's keys, from its earliest day on,
+  are re-summed, in place.
+- save() writes one ``.npy`` per dimension (plus the key array and a small
+  ``rolling.json``) under data/dw/rolling/; load() memory-maps them, so
+  starting up costs no parsing and pages are read on demand.
+- refresh() brings a saved cube up to date with the sales whose
+  transaction_id is above the one recorded at the last save. Every load
+  (pipeline.load_and_publish, used by etl_to_dw.main() and the fused
+  pipeline) rebuilds the cube; run ``--full`` after other reloads, since
+  they can reuse transaction ids.
+
+Average discount is the mean discount_percent per transaction
+(discount sum / transaction count).
+
+Usage (from project root):
+    python -m src.analytics_project.rolling             # incremental refresh + report
+    python -m src.analytics_project.rolling --full
+"""
+
+import argparse
+import json
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.cohort import iter_sales_chunks
+from src.analytics_project.etl_to_dw import DB_PATH, DW_DIR
+
+ROLLING_DIR = DW_DIR / "rolling"
+
+# Report windows in days
+WINDOWS = (7, 28, 90)
+
+# Summed measure -> sales column (None counts rows)
+MEASURES: dict[str, str | None] = {
+    "sales": "sale_amount",
+    "transactions": None,
+    "discount": "discount_percent",
+}
+
+# Dimension key columns with one cube each
+DIMENSIONS = ("store_id", "product_id")
+
+_DAY = np.timedelta64(1, "D")
+
+# Minimum growth factor of the cube buffers when days or keys run out
+GROWTH = 1.5
+
+
+def sale_days(dates: pd.Series) -> np.ndarray:
+    """Parse sale dates (ISO or M/D/YYYY) to datetime64[D] (NaT if invalid)."""
+    parsed = pd.to_datetime(dates, errors="coerce", format="mixed")
+    return parsed.to_numpy("datetime64[ns]").astype("datetime64[D]")
+
+
+class RollingCube:
+    """Prefix sums of the daily MEASURES for one dimension key.
+
+    The prefix rows and key columns live in a larger buffer that grows
+    geometrically, so a batch that adds days or keys usually writes in place.
+    Keys are kept in arrival order (a new key appends a column); ``_order``
+    lists the columns in key order for lookups and reports.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        start: np.datetime64 | None = None,
+        keys: np.ndarray | None = None,
+        prefix: np.ndarray | None = None,
+    ):
+        """Wrap saved ``keys`` and ``prefix`` arrays, or start an empty cube."""
+        self.key = key
+        self.start = start
+        keys = np.empty(0, dtype=np.int64) if keys is None else np.asarray(keys, dtype=np.int64)
+        if prefix is None:
+            prefix = np.zeros((len(MEASURES), 1, len(keys)))
+        # Prefix row d is _buffer[:, _first_row + d]; rows before _first_row are zero.
+        # A loaded (read-only, memory-mapped) prefix is copied on the first update.
+        self._buffer = prefix
+        self._first_row = 0
+        self._days = prefix.shape[1] - 1
+        self._keys = keys
+        self._n_keys = len(keys)
+        self._index_keys()
+
+    @property
+    def keys(self) -> np.ndarray:
+        """Keys of the cube, in arrival order."""
+        return self._keys[: self._n_keys]
+
+    @property
+    def prefix(self) -> np.ndarray:
+        """Prefix sums, (measure, day + 1, key), without the spare capacity."""
+        rows = slice(self._first_row, self._first_row + self._days + 1)
+        return self._buffer[:, rows, : self._n_keys]
+
+    @property
+    def days(self) -> int:
+        """Days covered since ``start``."""
+        return self._days
+
+    @property
+    def end(self) -> np.datetime64 | None:
+        """Last day covered (inclusive)."""
+        return None if self.start is None else self.start + (self.days - 1) * _DAY
+
+    def _index_keys(self) -> None:
+        self._order = np.argsort(self.keys, kind="stable")
+        self._sorted_keys = self.keys[self._order]
+
+    def _reserve(self, before: int, after: int, new_keys: int) -> None:
+        """Make room for ``before``/``after`` more days and ``new_keys`` more columns.
+
+        Reallocates only when the buffer is too small (or read-only), growing
+        each axis that ran out to GROWTH x its new size.
+        """
+        _, rows, columns = self._buffer.shape
+        last_row = self._first_row + self._days
+        if (
+            self._buffer.flags.writeable
+            and before <= self._first_row
+            and last_row + after < rows
+            and self._n_keys + new_keys <= columns
+        ):
+            return
+        used = self._days + 1
+        spare = int((used + before + after) * (GROWTH - 1))
+        head = before + spare if before > self._first_row else before
+        tail = after + spare if last_row + after >= rows else after
+        if self._n_keys + new_keys > columns:
+            columns = max(self._n_keys + new_keys, int(self._n_keys * GROWTH))
+        buffer = np.zeros((len(MEASURES), head + used + tail, columns))
+        buffer[:, head : head + used, : self._n_keys] = self.prefix
+        keys = np.zeros(columns, dtype=np.int64)
+        keys[: self._n_keys] = self.keys
+        self._buffer, self._first_row, self._keys = buffer, head, keys
+
+    def update(self, sales: pd.DataFrame) -> None:
+        """Add a batch of sales (sale_date, the key and the measure columns)."""
+        days = sale_days(sales["sale_date"])
+        ids = pd.to_numeric(sales[self.key], errors="coerce").to_numpy(float, na_value=np.nan)
+        valid = ~np.isnat(days) & ~np.isnan(ids)
+        if not valid.any():
+            return
+        days, ids = days[valid], ids[valid].astype(np.int64)
+        values = [
+            np.ones(len(days))
+            if column is None
+            else np.nan_to_num(pd.to_numeric(sales[column], errors="coerce").to_numpy(float))[valid]
+            for column in MEASURES.values()
+        ]
+
+        # Extend to the union of days and keys. Days before the old start get
+        # zero rows, prefix rows past the old end repeat the old last row (no
+        # sales there yet) and new keys get zero columns.
+        if self.start is None:
+            self.start = days.min()
+        before = max(int((self.start - days.min()) / _DAY), 0)
+        after = max(int((days.max() - self.start) / _DAY) + 1 - self._days, 0)
+        new_keys = np.setdiff1d(ids, self._sorted_keys)
+        self._reserve(before, after, len(new_keys))
+        if before:
+            self.start -= before * _DAY
+            self._first_row -= before
+            self._days += before
+        if after:
+            last_row = self._first_row + self._days
+            self._buffer[:, last_row + 1 : last_row + 1 + after, : self._n_keys] = self._buffer[
+                :, last_row : last_row + 1, : self._n_keys
+            ]
+            self._days += after
+        if len(new_keys):
+            self._keys[self._n_keys : self._n_keys + len(new_keys)] = new_keys
+            self._n_keys += len(new_keys)
+            self._index_keys()
+
+        # Daily totals of the batch, summed in place into its own key columns
+        # for every prefix row from its first day on
+        day = ((days - self.start) / _DAY).astype(np.int64)
+        first = int(day.min())
+        columns, local = np.unique(
+            self._order[np.searchsorted(self._sorted_keys, ids)], return_inverse=True
+        )
+        cells = (day - first) * len(columns) + local
+        shape = (self._days - first, len(columns))
+        rows = slice(self._first_row + first + 1, self._first_row + self._days + 1)
+        for m, weights in enumerate(values):
+            daily = np.bincount(cells, weights=weights, minlength=shape[0] * shape[1])
+            self._buffer[m][rows, columns] += np.cumsum(daily.reshape(shape), axis=0)
+
+    def _day_index(self, date) -> int:
+        return int((np.datetime64(pd.Timestamp(date), "D") - self.start) / _DAY)
+
+    def _frame(self, sums: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        """Turn (measure, ..., key) window sums into sales / transactions / avg_discount."""
+        sales, transactions, discount = sums
+        return pd.DataFrame(
+            {
+                "sales": sales.ravel(),
+                "transactions": transactions.ravel().round().astype(np.int64),
+                "avg_discount": np.where(
+                    transactions > 0, discount / np.maximum(transactions, 1), np.nan
+                ).ravel(),
+            },
+            index=index,
+        )
+
+    def _columns(self, keys) -> np.ndarray:
+        """Key positions for ``keys`` (all keys if None); unknown keys are dropped."""
+        if keys is None:
+            return self._order
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.keys):
+            return np.empty(0, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self.keys) - 1)
+        return self._order[found[self._sorted_keys[found] == keys]]
+
+    def range_totals(self, first, last, keys=None) -> pd.DataFrame:
+        """Metrics per key over the dates ``first``..``last`` (inclusive)."""
+        columns = self._columns(keys)
+        index = pd.Index(self.keys[columns], name=self.key)
+        if self.start is None:
+            return self._frame(np.zeros((len(MEASURES), len(columns))), index)
+        lo = np.clip(self._day_index(first), 0, self.days)
+        hi = np.clip(self._day_index(last) + 1, 0, self.days)
+        sums = self.prefix[:, max(hi, lo), columns] - self.prefix[:, lo, columns]
+        return self._frame(sums, index)
+
+    def rolling(self, window: int, keys=None, first=None, last=None) -> pd.DataFrame:
+        """Trailing ``window``-day metrics per (date, key) for each day first..last.
+
+        Defaults to every day in the cube. Windows are cut at the cube's
+        first day (no sales before it).
+        """
+        columns = self._columns(keys)
+        if self.start is None:
+            return self._frame(
+                np.zeros((len(MEASURES), 0)),
+                pd.MultiIndex.from_tuples([], names=["date", self.key]),
+            )
+        lo = 0 if first is None else np.clip(self._day_index(first), 0, self.days)
+        hi = self.days - 1 if last is None else np.clip(self._day_index(last), -1, self.days - 1)
+        ends = np.arange(lo, hi + 1) + 1
+        starts = np.maximum(ends - window, 0)
+        prefix = self.prefix[:, :, columns]
+        sums = prefix[:, ends, :] - prefix[:, starts, :]
+        dates = self.start + (ends - 1) * _DAY
+        index = pd.MultiIndex.from_product(
+            [pd.DatetimeIndex(dates), self.keys[columns]], names=["date", self.key]
+        )
+        return self._frame(sums, index)
+
+    def save(self, folder: pathlib.Path) -> None:
+        """Write the key and prefix arrays (replaced atomically, so mapped readers are safe).
+
+        Only the used part of the buffers is written.
+        """
+        for name, array in ((f"{self.key}_keys", self.keys), (f"{self.key}_prefix", self.prefix)):
+            tmp = folder / f"{name}.tmp.npy"
+            np.save(tmp, np.asarray(array))
+            tmp.replace(folder / f"{name}.npy")
+
+    @classmethod
+    def load(cls, folder: pathlib.Path, key: str, start: str | None, mmap: bool = True):
+        """Restore a cube written by save(); the prefix array is memory-mapped."""
+        mode = "r" if mmap else None
+        return cls(
+            key,
+            None if start is None else np.datetime64(start, "D"),
+            np.load(folder / f"{key}_keys.npy"),
+            np.load(folder / f"{key}_prefix.npy", mmap_mode=mode),
+        )
+
+
+class RollingMetrics:
+    """Rolling store and product metrics, fed sales batches like a TopNEngine."""
+
+    def __init__(self):
+        """Start with an empty cube per dimension."""
+        self.cubes = {key: RollingCube(key) for key in DIMENSIONS}
+        self.last_transaction_id: int | None = None
+
+    def update(self, sales: pd.DataFrame) -> None:
+        """Fold one batch of DW-shaped sales rows into every cube."""
+        for cube in self.cubes.values():
+            cube.update(sales)
+        if "transaction_id" in sales and len(sales):
+            batch_max = int(pd.to_numeric(sales["transaction_id"]).max())
+            self.last_transaction_id = max(self.last_transaction_id or batch_max, batch_max)
+
+    def window_report(
+        self, key: str, as_of=None, windows: tuple[int, ...] = WINDOWS, keys=None
+    ) -> pd.DataFrame:
+        """Metrics for each trailing window ending ``as_of`` (default: last day), one row per key.
+
+        Columns are ``<metric>_<days>d``, e.g. sales_7d, avg_discount_90d.
+        """
+        cube = self.cubes[key]
+        as_of = cube.end if as_of is None else np.datetime64(pd.Timestamp(as_of), "D")
+        frames = []
+        for days in windows:
+            first = None if as_of is None else as_of - (days - 1) * _DAY
+            totals = cube.range_totals(first, as_of, keys)
+            frames.append(totals.add_suffix(f"_{days}d"))
+        return pd.concat(frames, axis=1)
+
+    def save(self, folder: pathlib.Path = ROLLING_DIR) -> None:
+        """Write every cube plus rolling.json (date origin and last transaction_id)."""
+        folder = pathlib.Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for cube in self.cubes.values():
+            cube.save(folder)
+        meta = {
+            "last_transaction_id": self.last_transaction_id,
+            "start": {
+                key: None if cube.start is None else str(cube.start)
+                for key, cube in self.cubes.items()
+            },
+        }
+        (folder / "rolling.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, folder: pathlib.Path = ROLLING_DIR, mmap: bool = True) -> "RollingMetrics":
+        """Restore metrics written by save(), memory-mapping the prefix arrays."""
+        folder = pathlib.Path(folder)
+        meta = json.loads((folder / "rolling.json").read_text(encoding="utf-8"))
+        metrics = cls()
+        metrics.last_transaction_id = meta["last_transaction_id"]
+        for key in DIMENSIONS:
+            metrics.cubes[key] = RollingCube.load(folder, key, meta["start"][key], mmap)
+        return metrics
+
+
+def refresh(
+    conn: sqlite3.Connection, folder: pathlib.Path = ROLLING_DIR, full: bool = False
+) -> tuple[RollingMetrics, dict]:
+    """Update the saved metrics with sales loaded since the last save.
+
+    Args:
+        conn: DW connection.
+        folder: Where the arrays are stored.
+        full: Rebuild from every sale (after a reload that rewrote old sales).
+
+    Returns:
+        tuple: the refreshed RollingMetrics and stats (incremental, sales_read).
+    """
+    folder = pathlib.Path(folder)
+    incremental = not full and (folder / "rolling.json").exists()
+    metrics = RollingMetrics.load(folder) if incremental else RollingMetrics()
+    columns = ("transaction_id", "sale_date", *DIMENSIONS, "sale_amount", "discount_percent")
+    rows = 0
+    for chunk in iter_sales_chunks(conn, metrics.last_transaction_id, columns=columns):
+        metrics.update(chunk)
+        rows += len(chunk)
+    if rows or not incremental:
+        metrics.save(folder)
+    return metrics, {"incremental": incremental, "sales_read": rows}
+
+
+def main() -> None:
+    """Refresh the rolling store and product metrics from the DW."""
+    parser = argparse.ArgumentParser(description="Refresh rolling store/product metrics.")
+    parser.add_argument("--full", action="store_true", help="Rebuild from every sale.")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    metrics, stats = refresh(conn, full=args.full)
+    conn.close()
+    print(f"Rolling metrics refresh: {stats}")
+    print(metrics.window_report("store_id").round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
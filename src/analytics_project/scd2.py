@@ -0,0 +1,147 @@
+"""Slowly changing dimension (type 2) history for customer and product.
+
+The ETL wipes and reloads ``customer_base`` and ``product_base`` on every
+run. This module keeps their history in ``customer_history`` and
+``product_history``: each source row gets a 64-bit hash of its attribute
+columns, which is compared with the hash stored on the current version of
+that key. Only new or changed rows are written as new versions; the
+previous version is closed with a ``valid_to`` date. Keys missing from the
+source are closed as well.
+
+The compare is one vectorized hash pass plus an array lookup per key, so a
+million-row dimension diffs in seconds instead of a column-by-column compare.
+
+Usage:
+    stats = apply_scd2(conn, "customer")
+"""
+
+from datetime import date
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.dim_cache import DimensionIndex
+
+# Dimension -> key column of its <name>_base table
+SCD2_DIMENSIONS: dict[str, str] = {"customer": "customer_id", "product": "product_id"}
+
+
+def row_hashes(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """Return a signed 64-bit hash per row over ``columns``.
+
+    Numeric columns are hashed as float64 and everything else as object so
+    the hash does not change when a column's dtype flips between runs
+    (e.g. int64 vs float64 once a NULL appears).
+    """
+    frame = pd.DataFrame(
+        {
+            col: df[col].astype("float64")
+            if pd.api.types.is_numeric_dtype(df[col])
+            else df[col].astype(object)
+            for col in columns
+        }
+    )
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    # SQLite integers are signed
+    return hashed.view(np.int64)
+
+
+def create_history_table(cursor: sqlite3.Cursor, name: str) -> list[str]:
+    """Create <name>_history from <name>_base's columns; return the attribute columns."""
+    key = SCD2_DIMENSIONS[name]
+    base_cols = cursor.execute(f"PRAGMA table_info({name}_base);").fetchall()
+    if not base_cols:
+        raise ValueError(f"Table '{name}_base' not found; run create_schema first.")
+    defs = [f"{col[1]} {col[2]}" for col in base_cols]
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {name}_history (
+        version_id INTEGER PRIMARY KEY,
+        {', '.join(defs)},
+        row_hash INTEGER NOT NULL,
+        valid_from TEXT NOT NULL,
+        valid_to TEXT,
+        is_current INTEGER NOT NULL DEFAULT 1
+    );
+    """)
+    cursor.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_{name}_history_current
+    ON {name}_history ({key}) WHERE is_current = 1;
+    """)
+    return [col[1] for col in base_cols if col[1] != key]
+
+
+def apply_scd2(
+    conn: sqlite3.Connection,
+    name: str,
+    as_of: str | None = None,
+    source: pd.DataFrame | None = None,
+    return_keys: bool = False,
+) -> dict[str, int] | tuple[dict[str, int], np.ndarray]:
+    """Record changes in <name>_base as new versions in <name>_history.
+
+    Args:
+        conn: Open DW connection (after the dimension has been loaded).
+        name: "customer" or "product".
+        as_of: Validity date for new versions (defaults to today, ISO format).
+        source: The rows just written to <name>_base, if the caller still has
+            them in memory (saves re-reading the table).
+        return_keys: Also return the inserted, changed and closed keys (the
+            rows a DimensionCache has to re-read).
+
+    Returns:
+        dict[str, int]: Counts of inserted (new keys), changed, unchanged and
+        closed (keys no longer in the source) rows; ``(counts, keys)`` with
+        ``return_keys``.
+    """
+    as_of = as_of or date.today().isoformat()
+    key = SCD2_DIMENSIONS[name]
+    cursor = conn.cursor()
+    columns = create_history_table(cursor, name)
+
+    if source is None:
+        source = pd.read_sql_query(f"SELECT * FROM {name}_base", conn)  # noqa: S608
+    source_hash = row_hashes(source, columns)
+    source_keys = source[key].to_numpy(dtype=np.int64)
+
+    current = pd.read_sql_query(
+        f"SELECT version_id, {key}, row_hash FROM {name}_history WHERE is_current = 1",  # noqa: S608
+        conn,
+    )
+    current_keys = current[key].to_numpy(dtype=np.int64)
+    current_hash = current["row_hash"].to_numpy(dtype=np.int64)
+    current_version = current["version_id"].to_numpy(dtype=np.int64)
+
+    # Source key -> position of its current version (-1 for new keys)
+    pos = DimensionIndex(current_keys).positions(source_keys)
+    is_new = pos < 0
+    is_changed = np.zeros(len(source_keys), dtype=bool)
+    is_changed[~is_new] = current_hash[pos[~is_new]] != source_hash[~is_new]
+    seen = np.zeros(len(current_keys), dtype=bool)
+    seen[pos[~is_new]] = True
+
+    # Close the replaced versions and the versions of deleted keys
+    to_close = np.concatenate([current_version[pos[is_changed]], current_version[~seen]])
+    cursor.executemany(
+        f"UPDATE {name}_history SET valid_to = ?, is_current = 0 WHERE version_id = ?;",  # noqa: S608
+        [(as_of, int(v)) for v in to_close],
+    )
+
+    write = is_new | is_changed
+    versions = source.loc[write, [key, *columns]].copy()
+    versions["row_hash"] = source_hash[write]
+    versions["valid_from"] = as_of
+    versions["valid_to"] = None
+    versions["is_current"] = 1
+    versions.to_sql(f"{name}_history", conn, if_exists="append", index=False)
+    conn.commit()
+
+    stats = {
+        "inserted": int(is_new.sum()),
+        "changed": int(is_changed.sum()),
+        "unchanged": int((~write).sum()),
+        "closed": int((~seen).sum()),
+    }
+    if return_keys:
+        return stats, np.concatenate([source_keys[write], current_keys[~seen]])
+    return stats
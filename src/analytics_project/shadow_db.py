@@ -0,0 +1,163 @@
+"""Build the DW in a shadow database and publish it in one step.
+
+Reloading ``smart_store_dw.db`` in place (DELETE, then INSERT) shows readers
+empty or half-loaded tables and holds write locks for the whole load.
+Instead, shadow_build() hands the ETL a separate, write-tuned database:
+
+- it lives in memory (or, for very large loads, in a sibling temp file),
+- it runs without a rollback journal or fsyncs and with a large page cache,
+- it starts as a copy of the live DW, so tables the ETL only appends to
+  (SCD2 ``*_history``, lookup tables, derived tables) carry over.
+
+When the block succeeds the shadow is published:
+
+- ``"rename"`` (default): the shadow is written to ``<db>.shadow`` and
+  moved over the live file with os.replace(). New connections see the new
+  DW at once; open connections keep reading the old version until they
+  reconnect. Windows cannot replace a file that any connection has open,
+  so there "rename" falls back to "backup".
+- ``"backup"``: the SQLite backup API copies the shadow into the live file
+  in a single transaction, so even open connections see the new version
+  after their next query.
+
+If the block raises, the live DW is left untouched.
+
+Usage:
+    with shadow_build(DB_PATH) as conn:
+        load_dw(conn, customers_df, products_df, sales_df)
+
+    conn = open_shadow()  # tuned in-memory DW, e.g. for tests
+"""
+
+from contextlib import contextmanager
+import os
+import pathlib
+import sqlite3
+
+from src.analytics_project.dim_cache import drop_shared_cache
+
+# Write-speed settings for the shadow (it is disposable until published)
+SHADOW_PRAGMAS: tuple[str, ...] = (
+    "journal_mode = OFF",
+    "synchronous = OFF",
+    "temp_store = MEMORY",
+    "cache_size = -262144",  # KiB, i.e. 256 MB
+)
+
+PUBLISH_METHODS = ("rename", "backup")
+
+# os.replace() over a file with open handles fails on Windows (WinError 32)
+CAN_REPLACE_OPEN_FILES = os.name != "nt"
+
+
+def shadow_path(db_path: str | os.PathLike) -> pathlib.Path:
+    """Temp file the shadow is written to before the rename."""
+    db_path = pathlib.Path(db_path)
+    return db_path.with_name(db_path.name + ".shadow")
+
+
+def open_shadow(
+    seed: str | os.PathLike | None = None, path: str | os.PathLike | None = None
+) -> sqlite3.Connection:
+    """Open a write-tuned shadow database.
+
+    Args:
+        seed: Existing database to copy into the shadow first (skipped if the
+            file does not exist yet).
+        path: File for the shadow; in memory if None.
+    """
+    if path is not None:
+        pathlib.Path(path).unlink(missing_ok=True)
+    conn = sqlite3.connect(":memory:" if path is None else path)
+    for pragma in SHADOW_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
+    if seed is not None and pathlib.Path(seed).exists():
+        source = sqlite3.connect(seed)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+    return conn
+
+
+def _fsync(path: pathlib.Path) -> None:
+    with path.open("rb+") as f:
+        os.fsync(f.fileno())
+
+
+def publish(shadow: sqlite3.Connection, db_path: str | os.PathLike, method: str = "rename") -> None:
+    """Replace the database at ``db_path`` with the shadow's contents and close the shadow."""
+    if method not in PUBLISH_METHODS:
+        raise ValueError(f"Unknown publish method '{method}'; use one of {PUBLISH_METHODS}.")
+    db_path = pathlib.Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    shadow.commit()
+    if method == "rename" and not CAN_REPLACE_OPEN_FILES:
+        method = "backup"
+
+    if method == "backup":
+        live = sqlite3.connect(db_path)
+        try:
+            shadow.backup(live)
+        finally:
+            live.close()
+            shadow.close()
+        shadow_path(db_path).unlink(missing_ok=True)
+        drop_shared_cache(db_path)
+        return
+
+    target = shadow_path(db_path)
+    shadow_file = pathlib.Path(shadow.execute("PRAGMA database_list").fetchone()[2] or "")
+    if shadow_file != target.resolve():
+        # In-memory shadow: write it out next to the live file first
+        out = sqlite3.connect(target)
+        try:
+            shadow.backup(out)
+        finally:
+            out.close()
+    shadow.close()
+    _fsync(target)
+
+    # Hold the live file's write lock across the rename so no writer is
+    # mid-transaction (with a journal that would apply to the new file).
+    live = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        live.execute("BEGIN IMMEDIATE;")
+        target.replace(db_path)
+        live.execute("ROLLBACK;")
+    finally:
+        live.close()
+    drop_shared_cache(db_path)
+
+
+@contextmanager
+def shadow_build(db_path: str | os.PathLike, method: str = "rename", in_memory: bool = True):
+    """Yield a shadow copy of ``db_path`` to load, then publish it on success.
+
+    Args:
+        db_path: Live DW file. ":memory:" yields a fresh tuned in-memory
+            database that is simply closed afterwards.
+        method: "rename" or "backup" (see module docstring).
+        in_memory: Build in memory (fastest); False builds in the
+            ``<db>.shadow`` file, for loads larger than RAM.
+    """
+    if str(db_path) == ":memory:":
+        conn = open_shadow()
+        try:
+            yield conn
+        finally:
+            drop_shared_cache(conn)
+            conn.close()
+        return
+
+    path = None if in_memory else shadow_path(db_path)
+    conn = open_shadow(seed=db_path, path=path)
+    try:
+        yield conn
+    except BaseException:
+        drop_shared_cache(conn)
+        conn.close()
+        shadow_path(db_path).unlink(missing_ok=True)
+        raise
+    drop_shared_cache(conn)
+    publish(conn, db_path, method)
@@ -0,0 +1,135 @@
+"""test_affinity.py.
+
+Unit tests for affinity.py: block-wise co-occurrence counts, support,
+confidence and lift match a brute-force pandas self-join of the baskets,
+whatever the customer block size (blocks of one customer, blocks that
+split the id range unevenly, one block for everyone).
+
+Usage:
+    python -m unittest src.analytics_project.test_affinity
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import affinity
+from src.analytics_project.etl_to_dw import create_schema
+
+
+def random_baskets(seed: int = 4) -> pd.DataFrame:
+    """Sales rows, including repeat purchases of the same product."""
+    rng = np.random.default_rng(seed)
+    n = 600
+    return pd.DataFrame(
+        {
+            "transaction_id": np.arange(1, n + 1),
+            "customer_id": rng.integers(1000, 1060, n),
+            "product_id": 2000 + rng.zipf(1.6, n) % 25,
+        }
+    )
+
+
+def brute_force_pairs(sales: pd.DataFrame) -> pd.DataFrame:
+    """co_count per product pair (product_id < other) via a self-join on customer."""
+    baskets = sales[["customer_id", "product_id"]].drop_duplicates()
+    joined = baskets.merge(baskets, on="customer_id", suffixes=("", "_other"))
+    joined = joined[joined["product_id"] < joined["product_id_other"]]
+    return (
+        joined.groupby(["product_id", "product_id_other"])
+        .size()
+        .rename("co_count")
+        .reset_index()
+        .sort_values(["product_id", "product_id_other"], ignore_index=True)
+    )
+
+
+class TestAffinity(unittest.TestCase):
+    """Affinity pairs and scores against a brute-force self-join."""
+
+    def setUp(self):
+        """Load random baskets into an in-memory DW."""
+        self.sales = random_baskets()
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        create_schema(self.conn.cursor())
+        self.sales.to_sql("sales_base", self.conn, if_exists="append", index=False)
+        self.expected = brute_force_pairs(self.sales)
+
+    def as_product_pairs(self, pairs: pd.DataFrame, product_ids: np.ndarray) -> pd.DataFrame:
+        """Map pair positions back to product ids, sorted."""
+        result = pd.DataFrame(
+            {
+                "product_id": product_ids[pairs["a"].to_numpy()],
+                "product_id_other": product_ids[pairs["b"].to_numpy()],
+                "co_count": pairs["co_count"].to_numpy(),
+            }
+        )
+        return result.sort_values(["product_id", "product_id_other"], ignore_index=True)
+
+    def test_block_pairs(self):
+        """Pairs are the unordered product pairs within each customer."""
+        customers = np.array([1, 1, 1, 2, 3, 3])
+        products = np.array([5, 2, 7, 1, 4, 0])
+        codes = affinity._block_pairs(customers, products)
+        pairs = sorted(zip((codes >> 32).tolist(), (codes & 0xFFFFFFFF).tolist(), strict=True))
+        self.assertEqual(pairs, [(0, 4), (2, 5), (2, 7), (5, 7)])
+        self.assertEqual(len(affinity._block_pairs(customers[:1], products[:1])), 0)
+
+    def test_co_occurrence_matches_self_join(self):
+        """Co-occurrence counts equal the SQL self-join counts."""
+        for block_size in (1, 7, 1_000):
+            pairs, product_ids, product_customers, n_customers = affinity.co_occurrence(
+                self.conn, block_size
+            )
+            result = self.as_product_pairs(pairs, product_ids)
+            pd.testing.assert_frame_equal(result, self.expected, check_dtype=False)
+            self.assertEqual(n_customers, self.sales["customer_id"].nunique())
+            per_product = self.sales.groupby("product_id")["customer_id"].nunique()
+            self.assertEqual(product_customers.tolist(), per_product.tolist())
+
+    def test_scores_and_table_match_brute_force(self):
+        """Scores and the written table equal the brute-force ones."""
+        n = self.sales["customer_id"].nunique()
+        buyers = self.sales.groupby("product_id")["customer_id"].nunique()
+        both = pd.concat(
+            [
+                self.expected,
+                self.expected.rename(
+                    columns={"product_id": "product_id_other", "product_id_other": "product_id"}
+                ),
+            ]
+        )
+        both = both[both["co_count"] >= 2]
+        count_x = buyers[both["product_id"]].to_numpy()
+        count_y = buyers[both["product_id_other"]].to_numpy()
+        both["confidence"] = both["co_count"] / count_x
+        both["lift"] = both["co_count"] * n / (count_x * count_y)
+        key = ["product_id", "product_id_other"]
+
+        scores = affinity.affinity_scores(*affinity.co_occurrence(self.conn, 7), top_k=1_000)
+        merged = scores.rename(columns={"other_product_id": "product_id_other"}).merge(
+            both, on=key, suffixes=("", "_expected")
+        )
+        self.assertEqual(len(merged), len(both))
+        self.assertEqual(len(scores), len(both))
+        for col in ["co_count", "confidence", "lift"]:
+            self.assertTrue(np.allclose(merged[col], merged[f"{col}_expected"]), col)
+        self.assertTrue(np.allclose(merged["support"], merged["co_count"] / n))
+
+        written = affinity.build_product_affinity(self.conn, top_k=3)
+        stored = pd.read_sql_query("SELECT * FROM product_affinity", self.conn)
+        self.assertEqual(written, len(stored))
+        # Per product: the 3 highest lifts of the brute-force pairs, in rank order
+        for product, rows in stored.groupby("product_id"):
+            expected = both.loc[both["product_id"] == product, "lift"].nlargest(3)
+            ranked = rows.sort_values("rank")
+            self.assertEqual(ranked["rank"].tolist(), list(range(1, len(rows) + 1)))
+            self.assertTrue(np.allclose(ranked["lift"], expected.to_numpy()))
+        self.assertEqual(stored["product_id"].nunique(), both["product_id"].nunique())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""test_anomaly.py.
+
+Unit tests for anomaly.py: injected spikes in a store's daily sales,
+discount rate and payment mix are flagged against that store's own history,
+replayed days are not counted twice, and state survives save/load.
+
+Usage:
+    python -m unittest src.analytics_project.test_anomaly
+"""
+
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.anomaly import StoreAnomalyDetector
+
+
+def store_sales(stores: int = 20, days: int = 40, per_day: int = 20) -> pd.DataFrame:
+    """Steady daily sales per store, with one anomaly each for stores 401-403 on day 35."""
+    rng = np.random.default_rng(11)
+    n = stores * days * per_day
+    store = np.repeat(np.arange(400, 400 + stores), days * per_day)
+    day = np.tile(np.repeat(np.arange(days), per_day), stores)
+    amount = rng.normal(100.0, 10.0, n)
+    discount = rng.uniform(5.0, 15.0, n)
+    payment = rng.choice(["cash", "creditcard"], n)
+    spike = day == 35
+    amount[spike & (store == 401)] *= 5
+    discount[spike & (store == 402)] = 60.0
+    payment[spike & (store == 403)] = "giftcard"
+    return pd.DataFrame(
+        {
+            "sale_date": (pd.Timestamp("2025-03-01") + pd.to_timedelta(day, unit="D")).strftime(
+                "%Y-%m-%d"
+            ),
+            "store_id": store,
+            "sale_amount": amount,
+            "discount_percent": discount,
+            "sale_payment_type": payment,
+        }
+    )
+
+
+class TestStoreAnomalyDetector(unittest.TestCase):
+    """Running store statistics and alerts."""
+
+    def setUp(self):
+        """Build daily store sales with injected anomalies."""
+        self.sales = store_sales()
+
+    def test_injected_anomalies_are_flagged(self):
+        """The injected sales spike and discount jump are flagged."""
+        detector = StoreAnomalyDetector()
+        detector.update(self.sales)
+        alerts = detector.pending_alerts()
+        found = set(zip(alerts["store_id"], alerts["metric"], alerts["sale_date"], strict=True))
+        self.assertIn((401, "sales", "2025-04-05"), found)
+        self.assertIn((402, "discount_rate", "2025-04-05"), found)
+        self.assertIn((403, "payment_mix_shift", "2025-04-05"), found)
+        # Steady stores stay (almost) quiet
+        self.assertLessEqual(len(alerts), 5)
+
+    def test_incremental_batches_and_replay(self):
+        """A reloaded detector fed the full history again matches one pass over it."""
+        whole = StoreAnomalyDetector()
+        whole.update(self.sales)
+
+        detector = StoreAnomalyDetector()
+        early = self.sales["sale_date"] < "2025-03-30"
+        detector.update(self.sales[early])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "state.npz"
+            detector.save(path)
+            detector = StoreAnomalyDetector.load(path)
+        # The full history again: only the days after the saved state count
+        detector.update(self.sales)
+        self.assertTrue(np.allclose(detector.mean, whole.mean))
+        self.assertTrue(np.array_equal(detector.count, whole.count))
+        late = whole.pending_alerts().query("sale_date >= '2025-03-30'")
+        self.assertEqual(len(detector.pending_alerts()), len(late))
+
+    def test_write_alerts(self):
+        """Pending alerts are written to the DW alert table once."""
+        detector = StoreAnomalyDetector()
+        detector.update(self.sales)
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        written = detector.write_alerts(conn)
+        stored = pd.read_sql_query("SELECT * FROM store_anomaly_alert", conn)
+        self.assertEqual(len(stored), written)
+        self.assertTrue(stored["detected_at"].notna().all())
+        self.assertEqual(detector.write_alerts(conn), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
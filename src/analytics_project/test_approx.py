@@ -0,0 +1,86 @@
+"""test_approx.py.
+
+Unit tests for the approximate query mode in approx.py: estimates from the
+stratified sample bracket the exact answer, and an error bound the sample
+can't meet falls back to an exact scan.
+
+Usage:
+    python -m unittest src.analytics_project.test_approx
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import etl_to_dw
+from src.analytics_project.approx import approximate, exact
+
+
+class TestApprox(unittest.TestCase):
+    """Approximate aggregates over the stratified sample."""
+
+    def setUp(self):
+        """Load random sales and draw a 10% stratified sample."""
+        self.conn = sqlite3.connect(":memory:")
+        cursor = self.conn.cursor()
+        etl_to_dw.create_schema(cursor)
+        rng = np.random.default_rng(0)
+        n = 20_000
+        pd.DataFrame(
+            {
+                "transaction_id": np.arange(n),
+                "sale_date": rng.choice(["2025-04-15", "2025-05-04", "2025-06-20"], n),
+                "store_id": rng.integers(401, 406, n),
+                "sale_amount": rng.gamma(2.0, 50.0, n),
+            }
+        ).to_sql("sales_base", self.conn, if_exists="append", index=False)
+        etl_to_dw.refresh_sales_sample(cursor, fraction=0.1)
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def test_unfiltered_count_is_exact(self):
+        """COUNT(*) without a filter is exact from the stratum sizes."""
+        result = approximate(self.conn, "count")
+        self.assertEqual(result["estimate"][0], 20_000)
+        self.assertFalse(result["exact"][0])
+
+    def test_interval_contains_exact_sum(self):
+        """The interval of a filtered SUM contains the exact answer."""
+        where, params = "sale_date >= ?", ["2025-05-01"]
+        result = approximate(self.conn, "sum", "sale_amount", where=where, params=params)
+        truth = exact(self.conn, "sum", "sale_amount", where=where, params=params)["estimate"][0]
+        self.assertLessEqual(result["ci_low"][0], truth)
+        self.assertGreaterEqual(result["ci_high"][0], truth)
+
+    def test_grouped_average_has_one_row_per_store(self):
+        """A grouped AVG returns one row per store."""
+        result = approximate(self.conn, "avg", "sale_amount", group_by="store_id")
+        self.assertEqual(list(result["store_id"]), [401, 402, 403, 404, 405])
+
+    def test_unreachable_bound_falls_back_to_exact(self):
+        """A bound the sample cannot meet returns the exact answer."""
+        result = approximate(self.conn, "sum", "sale_amount", max_rel_error=1e-6)
+        truth = exact(self.conn, "sum", "sale_amount")["estimate"][0]
+        self.assertTrue(result["exact"][0])
+        self.assertAlmostEqual(result["estimate"][0], truth)
+
+    def test_zero_estimate_falls_back_to_exact(self):
+        """A zero estimate never passes the error bound."""
+        # The sampled rows of one store carry no amount, the population does
+        self.conn.execute("UPDATE sales_sample SET sale_amount = 0 WHERE store_id = 401")
+        where, params = "store_id = ?", [401]
+        result = approximate(
+            self.conn, "sum", "sale_amount", where=where, params=params, max_rel_error=0.05
+        )
+        truth = exact(self.conn, "sum", "sale_amount", where=where, params=params)["estimate"][0]
+        self.assertTrue(result["exact"][0])
+        self.assertAlmostEqual(result["estimate"][0], truth)
+        self.assertGreater(truth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""test_cohort.py.
+
+Unit tests for cohort.py: sales map to (cohort month, months since join)
+cells, customers count once per month, and an incremental refresh over a
+newly loaded month gives the same tables as a full rebuild.
+
+Usage:
+    python -m unittest src.analytics_project.test_cohort
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import etl_to_dw
+from src.analytics_project.cohort import month_index, refresh_cohorts, retention_matrix
+from src.analytics_project.dim_cache import DimensionCache
+
+CUSTOMERS = pd.DataFrame(
+    {
+        "CustomerID": [1000, 1001, 1002],
+        "Name": ["a", "b", "c"],
+        "Region": ["east", "west", "east"],
+        "JoinDate": ["2025-01-15", "1/20/2025", "2025-02-01"],
+        "CustomerRewardPoints": [0, 0, 0],
+        "CustomerStatus": ["new", "new", "new"],
+    }
+)
+
+PRODUCTS = pd.DataFrame(
+    {
+        "ProductID": [2000],
+        "ProductName": ["p0"],
+        "Category": ["electronics"],
+        "UnitPrice": [10.0],
+        "ProductDiscountPercent": [0.0],
+        "ProductSupplierRegion": ["west"],
+    }
+)
+
+
+def sales(ids, customers, dates, amounts) -> pd.DataFrame:
+    """Build cleaned sales rows from parallel lists."""
+    n = len(ids)
+    return pd.DataFrame(
+        {
+            "TransactionID": ids,
+            "SaleDate": dates,
+            "CustomerID": customers,
+            "ProductID": [2000] * n,
+            "StoreID": [401] * n,
+            "CampaignID": [0] * n,
+            "SaleAmount": amounts,
+            "DiscountPercent": [0] * n,
+            "SalePaymentType": ["cash"] * n,
+        }
+    )
+
+
+# January: both January joiners buy (1000 twice); February: 1000 and 1002 buy
+JANUARY = sales(
+    [1, 2, 3], [1000, 1000, 1001], ["2025-01-20", "2025-01-25", "2025-01-31"], [10.0, 5.0, 7.0]
+)
+FEBRUARY = sales(
+    [4, 5, 6], [1000, 1002, 1000], ["2/3/2025", "2025-02-10", "2025-02-28"], [1.0, 2.0, 3.0]
+)
+
+
+class TestCohorts(unittest.TestCase):
+    """Cohort retention tables, full and incremental."""
+
+    def setUp(self):
+        """Create a DW with the sample customers and products."""
+        self.conn = sqlite3.connect(":memory:")
+        cursor = self.conn.cursor()
+        etl_to_dw.create_schema(cursor)
+        etl_to_dw.insert_customers(CUSTOMERS, cursor)
+        etl_to_dw.insert_products(PRODUCTS, cursor)
+        self.cache = DimensionCache.from_connection(self.conn)
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def load(self, df: pd.DataFrame) -> None:
+        """Load sales into the DW."""
+        etl_to_dw.insert_sales(df, self.conn.cursor(), dim_cache=self.cache)
+        self.conn.commit()
+
+    def table(self) -> pd.DataFrame:
+        """Return the retention table."""
+        return pd.read_sql_query("SELECT * FROM cohort_retention ORDER BY 1, 2", self.conn)
+
+    def test_month_index_handles_mixed_formats(self):
+        """Month indexes parse ISO and US dates; bad dates get -1."""
+        index = month_index(pd.Series(["2025-01-15", "1/20/2025", "bad"]))
+        self.assertEqual(index.tolist(), [2025 * 12, 2025 * 12, -1])
+
+    def test_full_refresh_counts_customers_once_per_month(self):
+        """A customer with several sales in a month counts once."""
+        self.load(pd.concat([JANUARY, FEBRUARY]))
+        refresh_cohorts(self.conn, full=True)
+        active = retention_matrix(self.conn, "active_customers")
+        self.assertEqual(active.loc["2025-01", 0], 2)
+        self.assertEqual(active.loc["2025-01", 1], 1)
+        self.assertEqual(active.loc["2025-02", 0], 1)
+        table = self.table().set_index(["cohort_month", "months_since_join"])
+        self.assertAlmostEqual(table.loc[("2025-01", 1), "retention_rate"], 0.5)
+        self.assertEqual(table.loc[("2025-01", 0), "cohort_size"], 2)
+
+    def test_incremental_matches_full(self):
+        """Incremental refreshes give the same table as a full rebuild."""
+        self.load(JANUARY)
+        refresh_cohorts(self.conn, chunk_rows=2)
+        self.load(FEBRUARY)
+        stats = refresh_cohorts(self.conn, chunk_rows=2)
+        self.assertTrue(stats["incremental"])
+        self.assertEqual(stats["sales_read"], 3)
+        incremental = self.table()
+        refresh_cohorts(self.conn, full=True)
+        full = self.table()
+        pd.testing.assert_frame_equal(
+            incremental.drop(columns="revenue"), full.drop(columns="revenue")
+        )
+        self.assertTrue(np.allclose(incremental["revenue"], full["revenue"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
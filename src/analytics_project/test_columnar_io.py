@@ -0,0 +1,101 @@
+"""test_columnar_io.py.
+
+Unit tests for columnar_io.py: tables written in the npy layout come back
+with the same values and dtypes (nullable ints, categories, datetimes, text),
+and read_table() finds a table by its extension-less path.
+
+Usage:
+    python -m unittest src.analytics_project.test_columnar_io
+"""
+
+import datetime
+import os
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.columnar_io import find_table, read_table, write_table
+
+
+class TestColumnarIO(unittest.TestCase):
+    """Columnar round trips of cleaned tables."""
+
+    def setUp(self):
+        """Create a typed sample table in a temporary folder."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stem = pathlib.Path(self.tmp.name) / "sales_cleaned"
+        self.df = pd.DataFrame(
+            {
+                "TransactionID": pd.array([1, 2, None], dtype="Int64"),
+                "SaleDate": pd.to_datetime(["2025-05-04", "2025-05-05", None]),
+                "SaleAmount": [10.5, 20.0, np.nan],
+                "SalePaymentType": pd.Categorical(["cash", "debitcard", None]),
+                "Note": ["a", None, "c"],
+            }
+        )
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        self.tmp.cleanup()
+
+    def test_npy_round_trip_keeps_dtypes(self):
+        """The .npcols format keeps every column dtype."""
+        path = write_table(self.df, self.stem, fmt="npy")
+        self.assertEqual(path.suffix, ".npcols")
+        result = read_table(self.stem)
+        pd.testing.assert_frame_equal(result, self.df, check_dtype=False)
+        self.assertEqual(str(result["TransactionID"].dtype), "Int64")
+        self.assertIsInstance(result["SalePaymentType"].dtype, pd.CategoricalDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(result["SaleDate"]))
+
+    def test_npy_round_trip_keeps_value_types(self):
+        """The .npcols format keeps Python value types."""
+        when = datetime.datetime(2025, 5, 4, 12, 30)
+        df = pd.DataFrame(
+            {
+                "IntCategory": pd.Categorical([1, 2, 1]),
+                "DateCategory": pd.Categorical(pd.to_datetime(["2025-05-04", None, "2025-05-04"])),
+                "Mixed": pd.Series([1, 1.5, "x"], dtype=object),
+                "ObjectDates": pd.Series([when, None, datetime.date(2025, 5, 5)], dtype=object),
+                "Text": pd.Series(["a", None, "a"], dtype="str"),
+            }
+        )
+        write_table(df, self.stem, fmt="npy")
+        result = read_table(self.stem)
+        self.assertEqual(result["IntCategory"].tolist(), [1, 2, 1])
+        self.assertEqual(result["IntCategory"].cat.categories.dtype, np.int64)
+        self.assertTrue(pd.api.types.is_datetime64_dtype(result["DateCategory"].cat.categories))
+        self.assertEqual(result["Mixed"].tolist(), [1, 1.5, "x"])
+        self.assertEqual(result["ObjectDates"][0], when)
+        self.assertEqual(result["ObjectDates"][2], datetime.date(2025, 5, 5))
+        pd.testing.assert_series_equal(result["Text"], df["Text"])
+
+    def test_read_subset_of_columns(self):
+        """Reading a subset of columns returns only those."""
+        write_table(self.df, self.stem, fmt="npy")
+        result = read_table(self.stem, columns=["SaleAmount"])
+        self.assertEqual(list(result.columns), ["SaleAmount"])
+
+    def test_csv_export_is_found(self):
+        """A CSV export is found when no columnar file exists."""
+        write_table(self.df, self.stem, fmt="csv")
+        self.assertEqual(len(read_table(self.stem)), 3)
+
+    def test_newest_format_wins(self):
+        """The most recently written format is read."""
+        npy = write_table(self.df, self.stem, fmt="npy")
+        csv = write_table(self.df.head(1), self.stem, fmt="csv")
+        os.utime(npy / "schema.json", (1_000_000, 1_000_000))
+        self.assertEqual(find_table(self.stem), (csv, "csv"))
+        self.assertEqual(len(read_table(self.stem)), 1)
+        # Rewriting the npy table makes it the current one again
+        write_table(self.df, self.stem, fmt="npy")
+        os.utime(csv, (1_000_000, 1_000_000))
+        self.assertEqual(find_table(self.stem)[1], "npy")
+
+
+if __name__ == "__main__":
+    unittest.main()
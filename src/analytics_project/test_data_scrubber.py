@@ -18,7 +18,19 @@ Usage:
 
 import unittest
 import pandas as pd
-from src.analytics_project.data_scrubber import DataScrubber
+from src.analytics_project.data_scrubber import (
+    DataScrubber,
+    is_arrow_string,
+    transform_text_column,
+    unique_value_transform,
+)
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
 
 
 class TestDataScrubber(unittest.TestCase):
@@ -26,9 +38,9 @@ class TestDataScrubber(unittest.TestCase):
         # small sample DataFrame for testing
         self.df = pd.DataFrame(
             {
-                'cust_id': [1, 2, 2, None],
-                'customer_name': ['Alice', 'Bob', 'Bob', None],
-                'sale_date': ['2025-01-01', '2025-01-02', '2025-01-02', '2025-01-03'],
+                "cust_id": [1, 2, 2, None],
+                "customer_name": ["Alice", "Bob", "Bob", None],
+                "sale_date": ["2025-01-01", "2025-01-02", "2025-01-02", "2025-01-03"],
             }
         )
         self.scrubber = DataScrubber(self.df)
@@ -38,17 +50,83 @@ class TestDataScrubber(unittest.TestCase):
         self.assertEqual(len(self.scrubber.get_df()), 3)
 
     def test_handle_missing_data(self):
-        self.scrubber.handle_missing_data(fill_value='Unknown')
+        self.scrubber.handle_missing_data(fill_value="Unknown")
         self.assertFalse(self.scrubber.get_df().isnull().any().any())
 
     def test_rename_columns(self):
-        self.scrubber.rename_columns({'cust_id': 'CustomerID'})
-        self.assertIn('CustomerID', self.scrubber.get_df().columns)
+        self.scrubber.rename_columns({"cust_id": "CustomerID"})
+        self.assertIn("CustomerID", self.scrubber.get_df().columns)
 
     def test_parse_dates(self):
-        self.scrubber.parse_dates_to_add_standard_datetime('sale_date')
-        self.assertIn('StandardDateTime', self.scrubber.get_df().columns)
+        self.scrubber.parse_dates_to_add_standard_datetime("sale_date")
+        self.assertIn("StandardDateTime", self.scrubber.get_df().columns)
+
+    @unittest.skipUnless(HAVE_PYARROW, "pyarrow not installed")
+    def test_arrow_strings_match_object_path(self):
+        """Arrow-backed cleaning gives the same values as the object path."""
+        names = pd.Series(["  Alice ", "BOB", None], dtype=object)
+        expected = DataScrubber(pd.DataFrame({"name": names}))
+        expected.format_column_strings_to_lower_and_trim("name")
+        scrubber = DataScrubber(pd.DataFrame({"name": names}), arrow_strings=True)
+        scrubber.format_column_strings_to_lower_and_trim("name")
+        result = scrubber.get_df()["name"]
+        self.assertTrue(is_arrow_string(result))
+        self.assertEqual(result.tolist()[:2], expected.get_df()["name"].tolist()[:2])
+        self.assertTrue(pd.isna(result.iloc[2]))
+
+    @unittest.skipIf(HAVE_PYARROW, "pyarrow installed")
+    def test_arrow_strings_without_pyarrow_fail_clearly(self):
+        """arrow_strings mode without pyarrow raises a clear ImportError."""
+        with self.assertRaisesRegex(ImportError, "arrow_strings mode needs pyarrow"):
+            DataScrubber(self.df, arrow_strings=True)
+
+    def test_unique_value_transform(self):
+        """Distinct values are transformed once; category only when asked for."""
+        values = pd.Series(["Cash", " cash ", None, "CASH", "Card"] * 10, dtype=object)
+
+        def lower(s):
+            return s.str.lower().str.strip()
+
+        result = unique_value_transform(values, lower, categorical=None)
+        self.assertEqual(result.dtype, "category")
+        self.assertEqual(sorted(result.cat.categories), ["card", "cash"])
+        self.assertEqual(result.isna().sum(), 10)
+        kept = unique_value_transform(values, lower)
+        self.assertEqual(kept.dtype, object)
+        self.assertEqual(kept.fillna("?").tolist(), result.astype(object).fillna("?").tolist())
+
+    def test_formatted_low_cardinality_column_accepts_new_values(self):
+        """A formatted column stays object, so fills and new values work."""
+        regions = pd.Series([" East", "WEST ", None] * 40, dtype=object)
+        scrubber = DataScrubber(pd.DataFrame({"Region": regions}))
+        scrubber.format_column_strings_to_lower_and_trim("Region")
+        self.assertEqual(scrubber.get_df()["Region"].dtype, object)
+        scrubber.handle_missing_data(fill_value="Unknown")
+        df = scrubber.get_df()
+        df.loc[df["Region"] == "west", "Region"] = "north"
+        self.assertEqual(df["Region"].tolist()[:3], ["east", "north", "Unknown"])
+
+    def test_near_unique_column_is_transformed_per_row(self):
+        """A near-unique column skips the factorize and keeps missing values."""
+        ids = pd.Series([f" ID{i} " for i in range(1_000)] + [None], dtype=object)
+        result = transform_text_column(ids, lambda s: s.str.strip())
+        self.assertEqual(result.dtype, object)
+        self.assertEqual(result.iloc[0], "ID0")
+        self.assertTrue(pd.isna(result.iloc[-1]))
+
+    def test_map_column_values_to_canonical(self):
+        """Values map to their canonical spelling through the key; others are kept."""
+        df = pd.DataFrame({"pay": ["credit card", "CREDITCARD", "Cash", "Bitcoin", None]})
+        scrubber = DataScrubber(df)
+        scrubber.map_column_values_to_canonical(
+            "pay",
+            {"creditcard": "CreditCard", "cash": "Cash"},
+            key=lambda s: s.str.lower().str.replace(" ", ""),
+        )
+        result = scrubber.get_df()["pay"].astype(object).tolist()
+        self.assertEqual(result[:4], ["CreditCard", "CreditCard", "Cash", "Bitcoin"])
+        self.assertTrue(pd.isna(result[4]))
 
 
-if __name__ == '__main__':
+if __name__ == "__main__":
     unittest.main()
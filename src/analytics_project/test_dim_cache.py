@@ -0,0 +1,110 @@
+"""test_dim_cache.py.
+
+Unit tests for the DimensionCache defined in dim_cache.py. They check that
+the array-backed gather returns the same attributes as a pandas merge, for
+both dense and sparse id ranges, and that incremental refreshes pick up
+changed, new and deleted dimension rows. In-memory databases never share a
+cache.
+
+Usage:
+    python -m unittest src.analytics_project.test_dim_cache
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.dim_cache import DimensionCache, DimensionIndex, shared_cache
+
+
+class TestDimensionCache(unittest.TestCase):
+    """Array-backed dimension lookups."""
+
+    def setUp(self):
+        """Create customer and product tables in memory."""
+        self.conn = sqlite3.connect(":memory:")
+        pd.DataFrame(
+            {
+                "customer_id": [1000, 1001, 1002],
+                "name": ["a", "b", "c"],
+                "region": ["east", "west", "east"],
+                "join_date": ["2024-01-01", "2024-02-01", "2024-03-01"],
+                "reward_points": [10, 20, 30],
+                "status": ["new", "active", "active"],
+            }
+        ).to_sql("customer", self.conn, index=False)
+        pd.DataFrame(
+            {
+                "product_id": [2000, 2001],
+                "product_name": ["p0", "p1"],
+                "category": ["electronics", "clothing"],
+                "unit_price": [10.0, 20.0],
+                "product_discount_percent": [0.0, 5.0],
+                "supplier_region": ["west", "east"],
+            }
+        ).to_sql("product", self.conn, index=False)
+        self.cache = DimensionCache.from_connection(self.conn)
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def test_enrich_matches_merge(self):
+        """Enriching with the cache equals a pandas merge."""
+        sales = pd.DataFrame({"product_id": [2001, 2000, 2001, 2999]})
+        enriched = self.cache.enrich(sales, "product", ["unit_price", "category"])
+        expected = sales.merge(
+            pd.read_sql("SELECT product_id, unit_price, category FROM product", self.conn),
+            on="product_id",
+            how="left",
+        )
+        np.testing.assert_array_equal(enriched["unit_price"], expected["unit_price"])
+        self.assertEqual(
+            list(enriched["category"].astype(object)[:3]), list(expected["category"][:3])
+        )
+        self.assertTrue(pd.isna(enriched["category"].iloc[3]))
+
+    def test_sparse_ids_use_hash_index(self):
+        """Sparse ids use the hash index and still resolve."""
+        index = DimensionIndex(np.array([5, 1_000_000, 7]))
+        self.assertFalse(index.dense)
+        np.testing.assert_array_equal(index.positions(np.array([7, 5, 8])), [2, 0, -1])
+
+    def test_incremental_refresh(self):
+        """Refreshing ids picks up updated, deleted and new rows."""
+        self.conn.execute("UPDATE customer SET status = 'churned' WHERE customer_id = 1001")
+        self.conn.execute("DELETE FROM customer WHERE customer_id = 1002")
+        self.conn.execute(
+            "INSERT INTO customer VALUES (1003, 'd', 'north', '2024-04-01', 40, 'new')"
+        )
+        self.cache.refresh(self.conn, "customer", ids=[1001, 1002, 1003])
+        got = self.cache.enrich(
+            pd.DataFrame({"customer_id": [1001, 1002, 1003]}), "customer", ["status", "region"]
+        )
+        self.assertEqual(got["status"].iloc[0], "churned")
+        self.assertTrue(pd.isna(got["status"].iloc[1]))
+        self.assertEqual(got["region"].iloc[2], "north")
+
+    def test_in_memory_databases_do_not_share_caches(self):
+        """In-memory databases never share a cache."""
+        self.assertIsNot(shared_cache(self.conn), shared_cache(self.conn))
+        # A new connection must not get the cache of a closed one
+        for region in ("east", "south"):
+            conn = sqlite3.connect(":memory:")
+            for table in ("customer", "product"):
+                df = pd.read_sql_query(f"SELECT * FROM {table}", self.conn)  # noqa: S608
+                if table == "customer":
+                    df["region"] = region
+                df.to_sql(table, conn, index=False)
+            got = shared_cache(conn).enrich(
+                pd.DataFrame({"customer_id": [1000]}), "customer", ["region"]
+            )
+            self.assertEqual(got["region"].iloc[0], region)
+            conn.close()
+            del conn
+
+
+if __name__ == "__main__":
+    unittest.main()
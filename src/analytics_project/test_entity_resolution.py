@@ -0,0 +1,125 @@
+"""test_entity_resolution.py.
+
+Unit tests for entity_resolution.py: Soundex codes, blocking-based clustering
+of near-duplicate customer names (within a region and join-date window) and
+the merge map that the sales load applies.
+
+Usage:
+    python -m unittest src.analytics_project.test_entity_resolution
+"""
+
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from src.analytics_project import etl_to_dw
+from src.analytics_project.dim_cache import DimensionCache
+from src.analytics_project.entity_resolution import (
+    build_customer_merge_map,
+    normalize_names,
+    resolve_customers,
+    soundex,
+)
+
+CUSTOMERS = pd.DataFrame(
+    {
+        "CustomerID": [1, 2, 3, 4, 5, 6, 7],
+        "Name": [
+            "John Smith",
+            "Jon Smith",
+            "Mr. John Smyth",
+            "Jane Doe",
+            "John Smith",
+            "Jon Smith",
+            "Katherine West",
+        ],
+        "Region": ["east", "east", "east", "east", "west", "east", "east"],
+        "JoinDate": [
+            "2024-01-15",
+            "2024-01-01",
+            "2024-02-01",
+            "2024-01-01",
+            "2024-01-01",
+            "2022-01-01",
+            "2024-01-01",
+        ],
+        "CustomerRewardPoints": [0] * 7,
+        "CustomerStatus": ["new"] * 7,
+    }
+)
+
+
+def customers() -> pd.DataFrame:
+    """Return the sample customers with DW column names."""
+    return CUSTOMERS.rename(
+        columns={
+            "CustomerID": "customer_id",
+            "Name": "name",
+            "Region": "region",
+            "JoinDate": "join_date",
+        }
+    )
+
+
+class TestEntityResolution(unittest.TestCase):
+    """Customer clustering and its use in the sales load."""
+
+    def test_soundex(self):
+        """Soundex codes match the classic examples."""
+        words = pd.Series(["robert", "rupert", "rubin", "ashcraft", "tymczak", "pfister", ""])
+        self.assertEqual(
+            soundex(words).tolist(), ["r163", "r163", "r150", "a261", "t522", "p236", ""]
+        )
+
+    def test_normalize_names_drops_honorifics(self):
+        """Honorifics and punctuation are removed from names."""
+        names = normalize_names(pd.Series(["Mr. John  Smyth-Jr", None]))
+        self.assertEqual(names.tolist(), ["john smyth", ""])
+
+    def test_clusters_within_region_and_join_window(self):
+        """Only similar names in one region and join window cluster."""
+        result = resolve_customers(customers()).set_index("customer_id")
+        # 1-3 are one person; the earliest joiner (2) is canonical
+        self.assertEqual(result.loc[[1, 2, 3], "canonical_customer_id"].tolist(), [2, 2, 2])
+        self.assertEqual(result.loc[1, "cluster_size"], 3)
+        # Other region, joined years apart, or a different person: left alone
+        for customer_id in (4, 5, 6, 7):
+            self.assertEqual(result.loc[customer_id, "canonical_customer_id"], customer_id)
+
+    def test_sales_load_uses_canonical_customer(self):
+        """Sales of a duplicate customer load under the canonical id."""
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        cursor = conn.cursor()
+        etl_to_dw.create_schema(cursor)
+        etl_to_dw.insert_customers(CUSTOMERS, cursor)
+        mapping = build_customer_merge_map(conn)
+        self.assertEqual(mapping.to_dict(), {1: 2, 3: 2})
+        stored = pd.read_sql_query("SELECT customer_id FROM customer_merge_map", conn)
+        self.assertEqual(sorted(stored["customer_id"]), [1, 3])
+
+        etl_to_dw.insert_sales(
+            pd.DataFrame(
+                {
+                    "TransactionID": [1, 2, 3],
+                    "SaleDate": ["2025-05-04"] * 3,
+                    "CustomerID": [1, 3, 4],
+                    "ProductID": [2000] * 3,
+                    "StoreID": [401] * 3,
+                    "CampaignID": [0] * 3,
+                    "SaleAmount": [10.0] * 3,
+                    "DiscountPercent": [0] * 3,
+                    "SalePaymentType": ["cash"] * 3,
+                }
+            ),
+            cursor,
+            dim_cache=DimensionCache.from_connection(conn),
+            customer_map=mapping,
+        )
+        sales = pd.read_sql_query("SELECT customer_id FROM sales ORDER BY transaction_id", conn)
+        self.assertEqual(sales["customer_id"].tolist(), [2, 2, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""test_etl_to_dw.py.
+
+Unit tests for the ETL load functions in etl_to_dw.py: stored derived
+measures, schema migration, and the dictionary-encoded text columns (the
+compatibility views decode them back to the loaded text and reloads reuse
+the lookup keys). Data is loaded into an in-memory SQLite database so the
+tests never touch data/dw/.
+
+Usage:
+    python -m unittest src.analytics_project.test_etl_to_dw
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import etl_to_dw
+from src.analytics_project.dim_cache import DimensionCache
+
+
+def sample_frames() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Return a few cleaned customers, products and sales (the load_dw inputs)."""
+    customers = pd.DataFrame(
+        {
+            "CustomerID": [1000, 1001],
+            "Name": ["a", "b"],
+            "Region": ["east", "west"],
+            "JoinDate": ["2024-01-01", "2024-02-01"],
+            "CustomerRewardPoints": [10, 20],
+            "CustomerStatus": ["new", "active"],
+        }
+    )
+    products = pd.DataFrame(
+        {
+            "ProductID": [2000, 2001],
+            "ProductName": ["p0", "p1"],
+            "Category": ["electronics", "clothing"],
+            "UnitPrice": [100.0, 20.0],
+            "ProductDiscountPercent": [0.0, 5.0],
+            "ProductSupplierRegion": ["west", "east"],
+        }
+    )
+    sales = pd.DataFrame(
+        {
+            "TransactionID": [1, 2, 3, 4],
+            "SaleDate": ["2025-05-04", "2025-05-05", "2025-05-05", "2025-06-01"],
+            "CustomerID": [1000, 1001, 1000, 1001],
+            "ProductID": [2000, 2001, 2001, 2999],
+            "StoreID": [401, 402, 401, 403],
+            "CampaignID": [0, 1, 0, 2],
+            "SaleAmount": [150.0, 30.5, 18.0, 42.0],
+            "DiscountPercent": ["10%", 0, 12.5, 5],
+            "SalePaymentType": ["cash", "creditcard", "cash", "giftcard"],
+        }
+    )
+    return customers, products, sales
+
+
+def load_sample_dw(conn: sqlite3.Connection) -> None:
+    """Create the schema and load a few customers, products and sales."""
+    customers, products, sales = sample_frames()
+    cursor = conn.cursor()
+    etl_to_dw.create_schema(cursor)
+    etl_to_dw.insert_customers(customers, cursor)
+    etl_to_dw.insert_products(products, cursor)
+    etl_to_dw.insert_sales(sales, cursor, dim_cache=DimensionCache.from_connection(conn))
+    conn.commit()
+
+
+class TestDerivedMeasures(unittest.TestCase):
+    """Revenue measures stored on the sales fact."""
+
+    def setUp(self):
+        """Load the sample DW in memory."""
+        self.conn = sqlite3.connect(":memory:")
+        load_sample_dw(self.conn)
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def test_stored_measures_match_on_the_fly_formulas(self):
+        """Stored measures equal the formulas evaluated on the fly."""
+        measures = etl_to_dw.DERIVED_SALES_MEASURES
+        stored = pd.read_sql(
+            f"SELECT transaction_id, {', '.join(measures)} FROM sales ORDER BY transaction_id",  # noqa: S608
+            self.conn,
+        )
+        on_the_fly = pd.read_sql(
+            "SELECT s.transaction_id, "  # noqa: S608
+            + ", ".join(f"{expr} AS {name}" for name, expr in measures.items())
+            + " FROM sales s LEFT JOIN product p ON s.product_id = p.product_id"
+            + " ORDER BY s.transaction_id",
+            self.conn,
+        )
+        for name in measures:
+            np.testing.assert_allclose(
+                stored[name].to_numpy(float), on_the_fly[name].to_numpy(float), equal_nan=True
+            )
+
+    def test_unknown_product_has_null_unit_price_and_margin(self):
+        """A sale of an unknown product has no unit price or margin."""
+        row = self.conn.execute(
+            "SELECT net_revenue, unit_price, margin_proxy FROM sales WHERE transaction_id = 4"
+        ).fetchone()
+        self.assertAlmostEqual(row[0], 39.9)
+        self.assertIsNone(row[1])
+        self.assertIsNone(row[2])
+
+    def test_schema_drops_list_price_revenue_from_older_databases(self):
+        """create_schema() drops list_price_revenue from an older DW."""
+        cursor = self.conn.cursor()
+        cursor.execute("DROP VIEW sales;")
+        cursor.execute("ALTER TABLE sales_base ADD COLUMN list_price_revenue REAL;")
+        etl_to_dw._create_compat_view(cursor, "sales")
+        etl_to_dw.create_schema(cursor)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(sales);")]
+        self.assertNotIn("list_price_revenue", columns)
+        self.assertIn("margin_proxy", columns)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM sales;").fetchone()[0], 4)
+
+
+def lookup_tables(conn: sqlite3.Connection) -> dict[str, dict[str, int]]:
+    """Lookup table -> {value: key}."""
+    names = {t for cols in etl_to_dw.DICTIONARY_COLUMNS.values() for t in cols.values()}
+    return {
+        name: dict(conn.execute(f"SELECT value, {name}_id FROM {name};").fetchall())  # noqa: S608
+        for name in sorted(names)
+    }
+
+
+class TestDictionaryEncoding(unittest.TestCase):
+    """Dictionary-encoded text columns and their views."""
+
+    def setUp(self):
+        """Load the sample frames in memory."""
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        self.customers, self.products, self.sales = sample_frames()
+        etl_to_dw.load_dw(self.conn, self.customers, self.products, self.sales)
+
+    def read(self, sql: str) -> pd.DataFrame:
+        """Run a query on the DW."""
+        return pd.read_sql_query(sql, self.conn)
+
+    def test_views_decode_to_the_loaded_text(self):
+        """The views decode keys to the loaded text."""
+        customer = self.read("SELECT region, status FROM customer ORDER BY customer_id")
+        self.assertEqual(customer["region"].tolist(), self.customers["Region"].tolist())
+        self.assertEqual(customer["status"].tolist(), self.customers["CustomerStatus"].tolist())
+        product = self.read("SELECT category, supplier_region FROM product ORDER BY product_id")
+        self.assertEqual(product["category"].tolist(), self.products["Category"].tolist())
+        self.assertEqual(
+            product["supplier_region"].tolist(), self.products["ProductSupplierRegion"].tolist()
+        )
+        sales = self.read("SELECT sale_payment_type FROM sales ORDER BY transaction_id")
+        self.assertEqual(
+            sales["sale_payment_type"].tolist(), self.sales["SalePaymentType"].tolist()
+        )
+        # The base tables hold only the integer keys
+        base = self.read("SELECT * FROM customer_base")
+        self.assertNotIn("region", base.columns)
+        self.assertTrue(pd.api.types.is_integer_dtype(base["region_key"]))
+
+    def test_second_load_reuses_lookup_keys(self):
+        """A second load keeps the existing lookup keys."""
+        first = lookup_tables(self.conn)
+        # Customer and product regions share one dictionary
+        self.assertEqual(sorted(first["lookup_region"]), ["east", "west"])
+
+        customers = pd.concat(
+            [self.customers, self.customers.tail(1).assign(CustomerID=1002, Region="south")],
+            ignore_index=True,
+        )
+        etl_to_dw.load_dw(self.conn, customers, self.products, self.sales)
+        second = lookup_tables(self.conn)
+        for name, keys in first.items():
+            # Same key for every known value; only new values get new keys
+            self.assertEqual({v: second[name][v] for v in keys}, keys, name)
+        self.assertEqual(set(second["lookup_region"]) - set(first["lookup_region"]), {"south"})
+        self.assertEqual(second["lookup_status"], first["lookup_status"])
+
+        region = self.read("SELECT region FROM customer ORDER BY customer_id")["region"]
+        self.assertEqual(region.tolist(), ["east", "west", "south"])
+
+
+if __name__ == "__main__":
+    unittest.main()
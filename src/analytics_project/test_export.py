@@ -0,0 +1,132 @@
+"""test_export.py.
+
+Unit tests for export.py: query results stream into CSV (plain and gzip),
+JSON Lines and Parquet in small batches, and partitioned exports write one
+file per partition value.
+
+Usage:
+    python -m unittest src.analytics_project.test_export
+"""
+
+import gzip
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.analytics_project import export
+from src.analytics_project.shadow_db import shadow_build
+from src.analytics_project.test_etl_to_dw import load_sample_dw
+
+SQL = "SELECT transaction_id, sale_date, sale_amount FROM sales ORDER BY transaction_id"
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+
+class TestExport(unittest.TestCase):
+    """Streaming and partitioned exports."""
+
+    def setUp(self):
+        """Build the sample DW in a temporary folder."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = pathlib.Path(self.tmp.name)
+        self.db = self.dir / "dw.db"
+        with shadow_build(self.db) as conn:
+            load_sample_dw(conn)
+
+    def test_csv_and_jsonl_in_batches(self):
+        """CSV (gzip) and JSON Lines exports in small batches."""
+        stats = export.export_query(
+            SQL, self.dir / "sales.csv.gz", db_path=self.db, batch_rows=3, compress=True
+        )
+        self.assertEqual(stats["rows"], 4)
+        self.assertEqual(pd.read_csv(stats["path"])["transaction_id"].tolist(), [1, 2, 3, 4])
+
+        stats = export.export_query(SQL, self.dir / "sales", "jsonl", db_path=self.db, batch_rows=1)
+        self.assertTrue(stats["path"].endswith("sales.jsonl"))
+        self.assertEqual(len(pd.read_json(stats["path"], lines=True)), 4)
+
+    def test_gz_name_implies_compression(self):
+        """A .gz file name turns on compression."""
+        stats = export.export_query(SQL, self.dir / "sales.csv.gz", db_path=self.db)
+        self.assertEqual(pathlib.Path(stats["path"]).name, "sales.csv.gz")
+        with gzip.open(stats["path"], "rt") as f:
+            self.assertTrue(f.readline().startswith("transaction_id"))
+        self.assertEqual(export.output_path("sales.csv", "csv", True).name, "sales.csv.gz")
+        self.assertEqual(export.output_path("sales.jsonl", "jsonl", False).name, "sales.jsonl")
+        self.assertEqual(export.output_path("sales", "parquet", True).name, "sales.parquet")
+
+    def test_empty_result_keeps_header(self):
+        """An empty result still writes the CSV header."""
+        empty = SQL.replace("ORDER", "WHERE 0 ORDER")
+        stats = export.export_query(empty, self.dir / "none.csv", db_path=self.db)
+        self.assertEqual(stats["rows"], 0)
+        self.assertEqual(
+            list(pd.read_csv(stats["path"]).columns), ["transaction_id", "sale_date", "sale_amount"]
+        )
+
+    @unittest.skipUnless(HAVE_PYARROW, "pyarrow not installed")
+    def test_parquet_row_groups(self):
+        """Parquet written in small batches reads back whole."""
+        stats = export.export_query(SQL, self.dir / "sales.parquet", db_path=self.db, batch_rows=2)
+        self.assertEqual(pd.read_parquet(stats["path"])["sale_amount"].sum(), 240.5)
+
+    @unittest.skipUnless(HAVE_PYARROW, "pyarrow not installed")
+    def test_parquet_widens_column_types(self):
+        """Parquet widens column types seen in later batches."""
+        conn = sqlite3.connect(self.db)
+        conn.execute("CREATE TABLE loose (id INTEGER, late, amount, mixed)")
+        conn.executemany(
+            "INSERT INTO loose VALUES (?, ?, ?, ?)",
+            [(1, None, 1, 1), (2, None, 2, "two"), (3, 7, 2.5, 3)],
+        )
+        conn.commit()
+        conn.close()
+        sql = "SELECT late, amount, mixed FROM loose ORDER BY id"
+        stats = export.export_query(sql, self.dir / "loose.parquet", db_path=self.db, batch_rows=1)
+        df = pd.read_parquet(stats["path"])
+        # NULL in the first batch, an int later
+        self.assertEqual(df["late"].tolist()[2], 7)
+        self.assertTrue(df["late"].isna()[:2].all())
+        # int first, REAL later: not truncated
+        self.assertEqual(df["amount"].tolist(), [1.0, 2.0, 2.5])
+        self.assertEqual(df["mixed"].tolist(), ["1", "two", "3"])
+
+    def test_partitions(self):
+        """One file per partition value."""
+        results = export.export_partitions(
+            SQL, "substr(sale_date, 1, 7)", self.dir / "by_month", db_path=self.db, workers=1
+        )
+        files = sorted(pathlib.Path(r["path"]).name for r in results)
+        self.assertEqual(files, ["2025-05.csv", "2025-06.csv"])
+        self.assertEqual(sum(r["rows"] for r in results), 4)
+
+    def test_partition_names_do_not_collide(self):
+        """Values that sanitize to the same name get distinct files."""
+        names = export._partition_names(["a/b", "a_b", 1, "1", None, "null", "2025-05"])
+        self.assertEqual(len(set(names)), 7)
+        self.assertEqual(names[1], "a_b")
+        self.assertEqual(names[-1], "2025-05")
+        self.assertTrue(names[0].startswith("a_b-"))
+
+        results = export.export_partitions(
+            SQL,
+            "CASE WHEN transaction_id <= 2 THEN 'a/b' ELSE 'a_b' END",
+            self.dir / "by_code",
+            db_path=self.db,
+            workers=1,
+        )
+        self.assertEqual(len({r["path"] for r in results}), len(results))
+        self.assertEqual(sum(r["rows"] for r in results), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""test_index_advisor.py.
+
+Unit tests for index_advisor.py: recorded statements are normalized and
+counted (pandas queries included), counts merge across saves, plans show
+full scans through the compatibility views, and the advisor recommends a
+covering index that removes the scan of a selective query.
+
+Usage:
+    python -m unittest src.analytics_project.test_index_advisor
+"""
+
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import index_advisor
+from src.analytics_project.etl_to_dw import create_schema
+from src.analytics_project.index_advisor import WorkloadRecorder, normalize_sql
+
+STORE_SQL = (
+    "SELECT sale_date, SUM(sale_amount) FROM sales_base WHERE store_id = {} GROUP BY sale_date"
+)
+
+
+def build_dw(path: pathlib.Path, n: int = 100_000) -> None:
+    """Write a DW with ``n`` random sales to ``path``."""
+    rng = np.random.default_rng(5)
+    conn = sqlite3.connect(path)
+    create_schema(conn.cursor())
+    days = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    pd.DataFrame(
+        {
+            "transaction_id": np.arange(n),
+            "sale_date": days.strftime("%Y-%m-%d"),
+            "customer_id": rng.integers(1000, 9000, n),
+            "store_id": rng.integers(400, 440, n),
+            "sale_amount": rng.random(n) * 100,
+        }
+    ).to_sql("sales_base", conn, if_exists="append", index=False)
+    conn.commit()
+    conn.close()
+
+
+class TestIndexAdvisor(unittest.TestCase):
+    """Workload recording and index advice."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build one DW for all tests."""
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dir = pathlib.Path(cls.tmp.name)
+        cls.db = cls.dir / "dw.db"
+        build_dw(cls.db)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the DW."""
+        cls.tmp.cleanup()
+
+    def test_normalize_sql(self):
+        """Literals and whitespace are normalized away."""
+        self.assertEqual(
+            normalize_sql("SELECT *\n FROM t WHERE a = 'x''y' AND b IN (1, 2,3) AND c > -2.5;"),
+            "SELECT * FROM t WHERE a = ? AND b IN (?) AND c > ?",
+        )
+        self.assertEqual(normalize_sql("SELECT col1 FROM t2"), "SELECT col1 FROM t2")
+
+    def test_record_and_save(self):
+        """Recorded statements are counted and saved."""
+        recorder = WorkloadRecorder()
+        conn = recorder.connect(self.db)
+        for store in (401, 402):
+            pd.read_sql_query(
+                "SELECT COUNT(*) FROM sales_base WHERE store_id = ?", conn, params=[store]
+            )
+        conn.execute("SELECT COUNT(*) FROM sales_base").fetchall()
+        conn.close()
+        workload = recorder.workload()
+        self.assertEqual(workload["count"].tolist(), [2, 1])
+        self.assertIn("store_id = 401", workload.loc[0, "sample"])
+
+        path = self.dir / "workload.jsonl"
+        path.unlink(missing_ok=True)
+        other = WorkloadRecorder()
+        other.merge(recorder)
+        recorder.save(path)
+        other.save(path)
+        self.assertEqual(recorder.statements, {})
+        self.assertEqual(WorkloadRecorder.load(path).workload()["count"].tolist(), [4, 2])
+
+    def test_analyze_resolves_view_aliases(self):
+        """Reads over views are planned against their base tables; writes are skipped."""
+        recorder = WorkloadRecorder()
+        recorder.record("SELECT * FROM sales WHERE customer_id = 1001 ORDER BY sale_date")
+        recorder.record("INSERT INTO store_anomaly_alert VALUES (1)")
+        conn = sqlite3.connect(self.db)
+        self.addCleanup(conn.close)
+        plans = index_advisor.analyze(conn, recorder)
+        self.assertEqual(len(plans), 1)  # writes are not analyzed
+        self.assertIn("USE TEMP B-TREE FOR ORDER BY", plans.loc[0, "problems"])
+        self.assertEqual(plans.loc[0, "tables"], ["sales_base"])
+
+    def test_advise_and_create(self):
+        """The advised index removes the scan and is created."""
+        recorder = WorkloadRecorder()
+        for store in (401, 402, 403):
+            recorder.record(STORE_SQL.format(store))
+        conn = sqlite3.connect(self.dir / "advise.db")
+        self.addCleanup(conn.close)
+        source = sqlite3.connect(self.db)
+        source.backup(conn)
+        source.close()
+
+        advice = index_advisor.advise(conn, recorder)
+        best = advice.iloc[0]
+        self.assertTrue(best["recommended"])
+        self.assertEqual(best["columns"], ["store_id", "sale_date", "sale_amount"])
+        self.assertEqual(best["plan_fixes"], 2)
+        self.assertGreater(best["benefit_ms"], 0)
+        # What-if indexes are rolled back
+        names = "SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'idx_advisor_%'"
+        self.assertEqual(conn.execute(names).fetchone()[0], 0)
+
+        index_advisor.create_indexes(conn, advice)
+        plan = index_advisor.explain(conn, STORE_SQL.format(401))
+        self.assertEqual(index_advisor.plan_problems(plan), [])
+        self.assertIn("COVERING INDEX", " ".join(plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
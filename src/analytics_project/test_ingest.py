@@ -0,0 +1,87 @@
+"""test_ingest.py.
+
+Unit tests for ingest.py: sharded (plain and gzip) raw sales files are
+cleaned with the sales rules in worker processes and merged, dropping
+duplicates across files and keeping the latest re-delivered row. The
+per-file stats reach data_prep.clean_all()'s caller.
+
+Usage:
+    python -m unittest src.analytics_project.test_ingest
+"""
+
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src.analytics_project import data_prep, quality_log
+from src.analytics_project.ingest import ingest_files
+
+
+def raw_sales(ids: list[int], amount: float = 10.0) -> pd.DataFrame:
+    """Build raw sales rows with the given ids."""
+    return pd.DataFrame(
+        {
+            "TransactionID": ids,
+            "SaleDate": ["5/4/2025"] * len(ids),
+            "CustomerID": [1000] * len(ids),
+            "ProductID": [2000] * len(ids),
+            "StoreID": [401] * len(ids),
+            "CampaignID": [0] * len(ids),
+            "SaleAmount": [amount] * len(ids),
+            "DiscountPercent": [5.0] * len(ids),
+            "SalePaymentType": ["Cash"] * len(ids),
+        }
+    )
+
+
+class TestIngest(unittest.TestCase):
+    """Parallel ingestion of sharded sales files."""
+
+    def setUp(self):
+        """Write two overlapping shard files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        folder = pathlib.Path(self.tmp.name)
+        self.paths = [folder / "store401_0504.csv", folder / "store401_0505.csv.gz"]
+        first = raw_sales([1, 2, 3])
+        first.loc[2, "SaleAmount"] = -5.0  # dropped by the sales rules
+        first.to_csv(self.paths[0], index=False)
+        # Row 2 is delivered again unchanged, row 1 again with a corrected amount
+        pd.concat([raw_sales([2, 4]), raw_sales([1], amount=12.0)]).to_csv(
+            self.paths[1], index=False
+        )
+
+    def tearDown(self):
+        """Remove the shard files."""
+        self.tmp.cleanup()
+
+    def test_merge_dedupes_across_files(self):
+        """Duplicates across files are dropped; the last re-delivery wins."""
+        merged, stats = ingest_files(self.paths, workers=2)
+        self.assertEqual(sorted(merged["TransactionID"]), ["1", "2", "4"])
+        self.assertEqual(merged.loc[merged["TransactionID"] == "1", "SaleAmount"].item(), 12.0)
+        self.assertEqual(list(stats["rows_in"]), [3, 3])
+        self.assertEqual(list(stats["rows_out"]), [2, 3])
+        self.assertEqual(stats["rows_kept"].sum(), len(merged))
+
+    def test_clean_all_returns_the_per_file_stats(self):
+        """clean_all() returns the per-file ingest stats."""
+        folder = pathlib.Path(self.tmp.name)
+        with (
+            mock.patch.object(data_prep, "find_shards", lambda: self.paths),
+            mock.patch.object(quality_log, "get_log_file_path", lambda: folder / "project.log"),
+        ):
+            cleaned, stats = data_prep.clean_all()
+        self.assertEqual(list(stats["file"]), [p.name for p in self.paths])
+        self.assertEqual(stats["rows_kept"].sum(), len(cleaned["sales"]))
+
+    def test_no_files_is_an_error(self):
+        """An empty file list is an error."""
+        with self.assertRaises(FileNotFoundError):
+            ingest_files([])
+
+
+if __name__ == "__main__":
+    unittest.main()
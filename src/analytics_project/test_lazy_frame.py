@@ -0,0 +1,91 @@
+"""test_lazy_frame.py.
+
+Unit tests for lazy_frame.py: chained filter/select/groupby/merge calls
+compile to one SQL statement and collect() returns the same rows pandas
+would compute after reading the full tables.
+
+Usage:
+    python -m unittest src.analytics_project.test_lazy_frame
+"""
+
+import sqlite3
+import unittest
+
+import pandas as pd
+
+from src.analytics_project.lazy_frame import col, scan
+from src.analytics_project.test_etl_to_dw import load_sample_dw
+
+
+class TestLazyFrame(unittest.TestCase):
+    """Lazy queries compiled to SQL."""
+
+    def setUp(self):
+        """Load the sample DW and read its sales into pandas."""
+        self.conn = sqlite3.connect(":memory:")
+        load_sample_dw(self.conn)
+        self.sales = pd.read_sql_query("SELECT * FROM sales", self.conn)
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def test_filter_and_select_only_return_requested_data(self):
+        """Filter and select return only the requested rows and columns."""
+        frame = scan(self.conn, "sales").filter(col("store_id").isin([401, 402]))
+        result = frame.select("transaction_id", "sale_amount").collect()
+        expected = self.sales.loc[
+            self.sales["store_id"].isin([401, 402]), ["transaction_id", "sale_amount"]
+        ]
+        pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+    def test_groupby_agg_matches_pandas(self):
+        """groupby().agg() matches pandas."""
+        result = (
+            scan(self.conn, "sales")
+            .groupby("customer_id")
+            .agg(revenue=("sale_amount", "sum"), sales=("transaction_id", "count"))
+            .sort_values("customer_id")
+            .collect()
+        )
+        expected = (
+            self.sales.groupby("customer_id")
+            .agg(revenue=("sale_amount", "sum"), sales=("transaction_id", "count"))
+            .reset_index()
+        )
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_merge_then_filter_is_one_statement(self):
+        """A merge followed by a filter compiles to one statement."""
+        frame = (
+            scan(self.conn, "sales")
+            .select("transaction_id", "customer_id")
+            .merge(scan(self.conn, "customer").select("customer_id", "region"), on="customer_id")
+            .filter(col("region") == "east")
+        )
+        sql, _ = frame.to_sql()
+        self.assertEqual(sql.count(";"), 0)
+        self.assertEqual(sorted(frame.collect()["transaction_id"]), [1, 3])
+
+    def test_filter_after_head_applies_to_limited_rows(self):
+        """A filter after head() applies to the limited rows."""
+        frame = scan(self.conn, "sales").sort_values("transaction_id").head(2)
+        self.assertEqual(
+            list(frame.filter("sale_amount > ?", 20).collect()["transaction_id"]), [1, 2]
+        )
+
+    def test_dropped_columns_raise_key_error(self):
+        """Columns dropped by select() raise KeyError."""
+        frame = scan(self.conn, "sales").select("transaction_id", "sale_amount")
+        with self.assertRaises(KeyError):
+            frame.filter(col("store_id") == 401)
+        with self.assertRaises(KeyError):
+            frame.sort_values("store_id")
+        with self.assertRaises(KeyError):
+            frame.groupby("store_id").agg(revenue=("sale_amount", "sum"))
+        kept = frame.filter((col("sale_amount") > 20) & col("transaction_id").notnull())
+        self.assertEqual(list(kept.collect().columns), ["transaction_id", "sale_amount"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""test_memory.py.
+
+Unit tests for memory.py: downcasting never changes a value, and chunked
+reads under a budget return the same table as a plain read.
+
+Usage:
+    python -m unittest src.analytics_project.test_memory
+"""
+
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.memory import downcast, read_csv_within_budget
+
+
+class TestMemory(unittest.TestCase):
+    """Memory-budget mode helpers."""
+
+    def test_downcast_is_lossless(self):
+        """Downcasting keeps every value."""
+        df = pd.DataFrame(
+            {
+                "StoreID": ["401", "402", "403", "401"],
+                "Small": [1, 2, 3, 4],
+                "Big": [1, 2, 3, 70_000],
+                "Half": [0.5, 1.25, 2.0, np.nan],
+                "Precise": [0.1, 0.2, 0.3, 0.4],
+                "Region": ["east", "west", "east", "east"],
+            }
+        )
+        result = downcast(df, parse_numeric_text=True)
+        self.assertEqual(str(result["StoreID"].dtype), "int16")
+        self.assertEqual(str(result["Small"].dtype), "int8")
+        self.assertEqual(str(result["Big"].dtype), "int32")
+        self.assertEqual(str(result["Half"].dtype), "float32")
+        self.assertEqual(str(result["Precise"].dtype), "float64")  # 0.1 is not exact in float32
+        self.assertIsInstance(result["Region"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(
+            result.drop(columns="StoreID").astype(object),
+            df.drop(columns="StoreID").astype(object),
+        )
+
+    def test_chunked_read_matches_plain_read(self):
+        """A chunked read equals a plain read."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "sales.csv"
+            n = 5000
+            pd.DataFrame(
+                {"id": np.arange(n), "kind": np.where(np.arange(n) % 3, "cash", "card")}
+            ).to_csv(path, index=False)
+            result = read_csv_within_budget(path, budget_mb=0.01)  # forces several chunks
+            expected = pd.read_csv(path)
+        self.assertIsInstance(result["kind"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(result.astype(object), expected.astype(object))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""test_pipeline.py.
+
+Unit tests for pipeline.py: on the sample data in data/raw/, the fused
+pipeline builds the same DW as the two-step workflow (data_prep.main() then
+etl_to_dw.main()), and writes the Top-N, rolling-window and anomaly state
+next to the DW so it can be loaded back. A reload refreshes a copy of the
+DW's dimension cache with only the changed rows. Everything is written to a
+temporary folder, never to data/.
+
+Usage:
+    python -m unittest src.analytics_project.test_pipeline
+"""
+
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import data_prep, etl_to_dw, pipeline, quality_log
+from src.analytics_project.anomaly import StoreAnomalyDetector
+from src.analytics_project.dim_cache import DimensionCache, drop_shared_cache, peek_shared_cache
+from src.analytics_project.rolling import RollingMetrics
+from src.analytics_project.test_etl_to_dw import sample_frames
+from src.analytics_project.topn import TopNEngine
+
+# Alert rows are stamped with the time they were written
+VOLATILE_COLUMNS = {"store_anomaly_alert": ["detected_at"]}
+
+
+def read_tables(path: pathlib.Path) -> dict[str, pd.DataFrame]:
+    """Every table of a DW, rows sorted so load order does not matter."""
+    conn = sqlite3.connect(path)
+    names = pd.read_sql_query(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name", conn
+    )["name"]
+    tables = {}
+    for name in names:
+        df = pd.read_sql_query(f'SELECT * FROM "{name}"', conn)  # noqa: S608
+        df = df.drop(columns=VOLATILE_COLUMNS.get(name, []))
+        tables[name] = df.sort_values(list(df.columns), ignore_index=True)
+    conn.close()
+    return tables
+
+
+class TestFusedPipeline(unittest.TestCase):
+    """Fused pipeline against the two-step workflow."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Run both workflows on the sample data into temporary DWs."""
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmp.name)
+        clean = root / "clean"
+        cls.two_step_db = root / "two_step" / "dw.db"
+        cls.fused_db = root / "fused" / "dw.db"
+        cls.two_step_db.parent.mkdir()
+        cls.fused_db.parent.mkdir()
+        patches = [
+            mock.patch.object(quality_log, "get_log_file_path", lambda: root / "project.log"),
+            mock.patch.object(data_prep, "CLEAN_DATA_DIR", clean),
+            mock.patch.object(etl_to_dw, "CUSTOMERS_CLEAN", clean / "customers_cleaned"),
+            mock.patch.object(etl_to_dw, "PRODUCTS_CLEAN", clean / "products_cleaned"),
+            mock.patch.object(etl_to_dw, "SALES_CLEAN", clean / "sales_cleaned"),
+            mock.patch.object(etl_to_dw, "DB_PATH", cls.two_step_db),
+        ]
+        for patch in patches:
+            patch.start()
+        try:
+            data_prep.main()
+            etl_to_dw.main()
+            cls.counts = pipeline.run_fused(cls.fused_db, write_intermediate=False)
+        finally:
+            for patch in patches:
+                patch.stop()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary DWs."""
+        cls.tmp.cleanup()
+
+    def test_fused_dw_matches_two_step_dw(self):
+        """Both workflows build the same tables."""
+        fused = read_tables(self.fused_db)
+        two_step = read_tables(self.two_step_db)
+        self.assertEqual(sorted(fused), sorted(two_step))
+        for name, df in fused.items():
+            with self.subTest(table=name):
+                pd.testing.assert_frame_equal(df, two_step[name])
+        self.assertGreater(len(fused["sales_base"]), 0)
+        self.assertEqual(self.counts["sales"], len(fused["sales_base"]))
+
+    def test_state_is_saved_and_reloads(self):
+        """Top-N, rolling and anomaly state is saved and reloads."""
+        states = {}
+        for db in (self.fused_db, self.two_step_db):
+            folder = db.parent
+            self.assertTrue((folder / "topn_summaries.npz").exists())
+            self.assertTrue((folder / "rolling" / "rolling.json").exists())
+            self.assertTrue((folder / "anomaly_state.npz").exists())
+            states[db] = (
+                TopNEngine.load(folder / "topn_summaries.npz"),
+                RollingMetrics.load(folder / "rolling", mmap=False),
+                StoreAnomalyDetector.load(folder / "anomaly_state.npz"),
+            )
+        (topn, rolling, anomalies), (topn_2, rolling_2, anomalies_2) = states.values()
+
+        conn = sqlite3.connect(self.fused_db)
+        self.addCleanup(conn.close)
+        sales = pd.read_sql_query("SELECT * FROM sales_base", conn)
+        # Reloaded state matches the DW (sales without a date are not in the
+        # rolling cubes) and is the same on both paths
+        dated = sales.dropna(subset=["sale_date"])
+        report, report_2 = (
+            cube.window_report("store_id", windows=(100_000,)) for cube in (rolling, rolling_2)
+        )
+        self.assertAlmostEqual(report["sales_100000d"].sum(), dated["sale_amount"].sum())
+        self.assertEqual(report["transactions_100000d"].sum(), len(dated))
+        self.assertEqual(rolling.last_transaction_id, sales["transaction_id"].max())
+        pd.testing.assert_frame_equal(report, report_2)
+        for name in topn.summaries:
+            pd.testing.assert_frame_equal(topn.top(name), topn_2.top(name))
+        self.assertEqual(anomalies.stores.tolist(), sorted(sales["store_id"].unique()))
+        self.assertTrue(np.array_equal(anomalies.count, anomalies_2.count))
+        self.assertTrue(np.allclose(anomalies.mean, anomalies_2.mean))
+
+
+class TestLoadAndPublish(unittest.TestCase):
+    """Dimension cache reuse across loads."""
+
+    def setUp(self):
+        """Use a DW in a temporary folder."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db = pathlib.Path(self.tmp.name) / "dw.db"
+        self.addCleanup(drop_shared_cache, self.db)
+
+    def test_reload_rereads_only_changed_dimension_rows(self):
+        """A reload refreshes only the changed dimension rows."""
+        customers, products, sales = sample_frames()
+        pipeline.load_and_publish(self.db, customers, products, sales)
+        live = peek_shared_cache(self.db)
+        self.assertIsNotNone(live)
+
+        customers.loc[1, "Region"] = "north"
+        read_dimension = DimensionCache._read
+        with mock.patch.object(
+            DimensionCache, "_read", autospec=True, side_effect=read_dimension
+        ) as read:
+            pipeline.load_and_publish(self.db, customers, products, sales)
+        reads = [(call.args[2], list(call.args[3])) for call in read.call_args_list]
+        self.assertEqual(reads, [("customer", [1001]), ("product", [])])
+
+        ids = pd.DataFrame({"customer_id": [1000, 1001]})
+        columns = ["name", "region", "status"]
+        published = peek_shared_cache(self.db)
+        self.assertIsNot(published, live)  # the live cache was copied, not changed
+        regions = live.enrich(ids, "customer", ["region"])["region"]
+        self.assertEqual(regions.tolist(), ["east", "west"])
+        conn = sqlite3.connect(self.db)
+        self.addCleanup(conn.close)
+        pd.testing.assert_frame_equal(
+            published.enrich(ids, "customer", columns).astype(str),
+            DimensionCache.from_connection(conn).enrich(ids, "customer", columns).astype(str),
+        )
+        self.assertEqual(published.enrich(ids, "customer", ["region"])["region"][1], "north")
+
+
+if __name__ == "__main__":
+    unittest.main()
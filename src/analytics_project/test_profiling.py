@@ -0,0 +1,55 @@
+"""test_profiling.py.
+
+Unit tests for profiling.py: stages are free when profiling is off, and
+write pstats / collapsed-stack / text reports when it is on.
+
+Usage:
+    python -m unittest src.analytics_project.test_profiling
+"""
+
+import pathlib
+import pstats
+import tempfile
+import unittest
+
+from src.analytics_project import profiling
+
+
+def _busy() -> int:
+    return sum(i * i for i in range(200_000))
+
+
+class TestProfiling(unittest.TestCase):
+    """Per-stage profiling."""
+
+    def setUp(self):
+        """Write profiles to a temporary folder."""
+        self.tmp = tempfile.TemporaryDirectory()
+        profiling._run_dir = pathlib.Path(self.tmp.name)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(setattr, profiling, "_run_dir", None)
+        self.addCleanup(profiling.enable_profiling, profiling.PROFILE_ENABLED)
+
+    def test_disabled_writes_nothing(self):
+        """Nothing is written while profiling is off."""
+        profiling.enable_profiling(False)
+        with profiling.profile_stage("off"):
+            _busy()
+        self.assertEqual(list(pathlib.Path(self.tmp.name).iterdir()), [])
+
+    def test_enabled_writes_reports_and_skips_nested_stage(self):
+        """Each stage writes its reports; nested stages are skipped."""
+        profiling.enable_profiling(True)
+        with profiling.profile_stage("outer"), profiling.profile_stage("inner"):
+            _busy()
+        folder = pathlib.Path(self.tmp.name)
+        self.assertEqual(
+            sorted(p.name for p in folder.iterdir()),
+            ["outer.collapsed", "outer.pstats", "outer.txt"],
+        )
+        functions = {func for _, _, func in pstats.Stats(str(folder / "outer.pstats")).stats}
+        self.assertIn("_busy", functions)
+
+
+if __name__ == "__main__":
+    unittest.main()
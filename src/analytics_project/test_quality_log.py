@@ -0,0 +1,63 @@
+"""test_quality_log.py.
+
+Unit tests for quality_log.py: counts aggregate per (stage, rule, column),
+samples stay bounded, logs from workers merge, and flush() writes one JSON
+summary per stage.
+
+Usage:
+    python -m unittest src.analytics_project.test_quality_log
+"""
+
+import json
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.quality_log import QualityLog
+
+
+class TestQualityLog(unittest.TestCase):
+    """Aggregated data-quality events."""
+
+    def setUp(self):
+        """Build a frame whose negative amounts are flagged."""
+        self.df = pd.DataFrame({"SaleAmount": np.arange(-500, 500)})
+        self.mask = (self.df["SaleAmount"] < 0).to_numpy()
+
+    def test_counts_aggregate_and_sample_is_bounded(self):
+        """Counts add up and samples stay within the size."""
+        log = QualityLog(sample_size=3, seed=0)
+        log.record("sales", "SaleAmount_range", "SaleAmount", self.mask, self.df)
+        log.record("sales", "SaleAmount_range", "SaleAmount", self.mask, self.df)
+        event = log.summary("sales")["events"][0]
+        self.assertEqual(event["count"], 1000)
+        self.assertEqual(len(event["sample"]), 3)
+        self.assertTrue(all(row["SaleAmount"] < 0 for row in event["sample"]))
+
+    def test_merge_worker_events(self):
+        """Events taken in a worker merge into the parent log."""
+        parent, worker = QualityLog(seed=0), QualityLog(seed=1)
+        parent.record("sales", "duplicate_rows", None, 4)
+        worker.record("sales", "duplicate_rows", None, 6)
+        parent.merge(worker.take())
+        self.assertEqual(parent.summary("sales")["total"], 10)
+        self.assertEqual(worker.events, {})
+
+    def test_flush_writes_one_line_per_stage(self):
+        """flush() writes one JSON line per stage."""
+        log = QualityLog(seed=0)
+        log.record("sales", "SaleAmount_range", "SaleAmount", self.mask, self.df)
+        log.record("products", "UnitPrice_range", "UnitPrice", 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "data_quality.jsonl"
+            log.flush(path=path)
+            lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual([json.loads(line)["stage"] for line in lines], ["products", "sales"])
+        self.assertEqual(log.events, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""test_rfm.py.
+
+Unit tests for rfm.py: an incremental refresh gives the same R/F/M values as
+a full refresh, recency and R scores move for every customer when the
+as-of date advances, and scores use the stored breakpoints.
+
+Usage:
+    python -m unittest src.analytics_project.test_rfm
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project import rfm
+from src.analytics_project.etl_to_dw import create_schema
+
+COLUMNS = ["customer_id", "last_sale_date", "recency_days", "frequency", "monetary"]
+
+
+def random_sales(first_id: int, n: int, start: str, days: int, seed: int) -> pd.DataFrame:
+    """Return ``n`` random sales from ``start`` over ``days`` days."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+    return pd.DataFrame(
+        {
+            "transaction_id": np.arange(first_id, first_id + n),
+            "sale_date": dates.strftime("%Y-%m-%d"),
+            "customer_id": rng.integers(1000, 1200, n),
+            "net_revenue": rng.gamma(2.0, 50.0, n).round(2),
+        }
+    )
+
+
+def segments(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Return the customer segments, by customer."""
+    return pd.read_sql_query("SELECT * FROM customer_segment ORDER BY customer_id", conn)
+
+
+class TestRefreshRfm(unittest.TestCase):
+    """Incremental RFM refreshes."""
+
+    def setUp(self):
+        """Create a DW with customers and a first batch of sales."""
+        self.conn = sqlite3.connect(":memory:")
+        self.addCleanup(self.conn.close)
+        create_schema(self.conn.cursor())
+        pd.DataFrame({"customer_id": np.arange(1000, 1200)}).to_sql(
+            "customer_base", self.conn, if_exists="append", index=False
+        )
+        random_sales(1, 2_000, "2025-01-01", 120, seed=1).to_sql(
+            "sales_base", self.conn, if_exists="append", index=False
+        )
+        rfm.refresh_rfm(self.conn, as_of="2025-04-30")
+
+    def full_refresh_copy(self, as_of: str) -> pd.DataFrame:
+        """Return the segments a full refresh of a copy gives."""
+        copy = sqlite3.connect(":memory:")
+        self.conn.backup(copy)
+        rfm.refresh_rfm(copy, as_of=as_of, full=True)
+        result = segments(copy)
+        copy.close()
+        return result
+
+    def test_incremental_matches_full(self):
+        """Incremental refreshes give the same segments as full ones."""
+        # New sales for some customers only
+        new = random_sales(2_001, 300, "2025-05-01", 30, seed=2)
+        new = new[new["customer_id"] < 1100]
+        new.to_sql("sales_base", self.conn, if_exists="append", index=False)
+        rfm.refresh_rfm(self.conn, as_of="2025-05-31")
+
+        result = segments(self.conn)
+        full = self.full_refresh_copy("2025-05-31")
+        pd.testing.assert_frame_equal(result[COLUMNS], full[COLUMNS])
+        self.assertTrue((result["as_of_date"] == "2025-05-31").all())
+
+        # Scores come from the stored breakpoints, for every row
+        breaks = rfm._load_breaks(self.conn)
+        expected = rfm.score_rfm(rfm.compute_rfm_metrics(self.conn, "2025-05-31"), breaks)
+        expected = expected.sort_values("customer_id", ignore_index=True)
+        for col in ["r_score", "f_score", "m_score", "segment"]:
+            self.assertEqual(result[col].tolist(), expected[col].tolist(), col)
+
+    def test_recency_advances_without_new_sales(self):
+        """Recency grows with the as-of date even without new sales."""
+        before = segments(self.conn)
+        rfm.refresh_rfm(self.conn, as_of="2025-07-29")
+        after = segments(self.conn)
+        self.assertEqual((after["recency_days"] - before["recency_days"]).unique().tolist(), [90])
+        # Everyone is now at least 90 days out: no recent customers remain
+        self.assertTrue((after["r_score"] <= before["r_score"]).all())
+        self.assertLess(after["r_score"].mean(), before["r_score"].mean())
+        pd.testing.assert_frame_equal(
+            after[COLUMNS].drop(columns="recency_days"),
+            self.full_refresh_copy("2025-07-29")[COLUMNS].drop(columns="recency_days"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
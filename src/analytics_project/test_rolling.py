@@ -0,0 +1,148 @@
+"""test_rolling.py.
+
+Unit tests for rolling.py: prefix-sum windows match pandas ``rolling`` over
+daily totals, batches in any order (including late, older days) build the
+same cube, batches that fit the buffers update them in place, and saved
+cubes are memory-mapped and refreshed incrementally from the DW.
+
+Usage:
+    python -m unittest src.analytics_project.test_rolling
+"""
+
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.rolling import RollingMetrics, refresh
+from src.analytics_project.test_etl_to_dw import load_sample_dw
+
+
+def random_sales(n: int = 5_000, seed: int = 3) -> pd.DataFrame:
+    """Return ``n`` random store/product sales."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120, n), unit="D")
+    return pd.DataFrame(
+        {
+            "transaction_id": np.arange(1, n + 1),
+            "sale_date": days.strftime("%Y-%m-%d"),
+            "store_id": rng.integers(401, 406, n),
+            "product_id": rng.integers(2000, 2050, n),
+            "sale_amount": rng.gamma(2.0, 50.0, n).round(2),
+            "discount_percent": rng.integers(0, 20, n).astype(float),
+        }
+    )
+
+
+class TestRollingMetrics(unittest.TestCase):
+    """Rolling store and product metrics."""
+
+    def setUp(self):
+        """Create random sales and a temporary folder."""
+        self.sales = random_sales()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = pathlib.Path(self.tmp.name)
+
+    def test_rolling_matches_pandas(self):
+        """Window sums match pandas rolling sums."""
+        metrics = RollingMetrics()
+        metrics.update(self.sales)
+        result = metrics.cubes["store_id"].rolling(28).xs(403, level="store_id")
+
+        store = self.sales[self.sales["store_id"] == 403].copy()
+        store["date"] = pd.to_datetime(store["sale_date"])
+        daily = store.groupby("date").agg(
+            sales=("sale_amount", "sum"),
+            transactions=("sale_amount", "size"),
+            discount=("discount_percent", "sum"),
+        )
+        days = pd.date_range(self.sales["sale_date"].min(), self.sales["sale_date"].max())
+        expected = daily.reindex(days, fill_value=0).rolling(28, min_periods=1).sum()
+        self.assertTrue(np.allclose(result["sales"], expected["sales"]))
+        self.assertEqual(result["transactions"].tolist(), expected["transactions"].tolist())
+        self.assertTrue(
+            np.allclose(result["avg_discount"], expected["discount"] / expected["transactions"])
+        )
+
+    def test_window_report(self):
+        """The window report sums the last 28 and 90 days of the requested keys."""
+        metrics = RollingMetrics()
+        metrics.update(self.sales)
+        report = metrics.window_report("product_id", as_of="2025-03-31", keys=[2007, 9999])
+        self.assertEqual(report.index.tolist(), [2007])
+        product = self.sales[self.sales["product_id"] == 2007]
+        in_window = product["sale_date"].between("2025-03-04", "2025-03-31")
+        self.assertAlmostEqual(
+            report.loc[2007, "sales_28d"], product.loc[in_window, "sale_amount"].sum()
+        )
+        # Jan 1 - Mar 31 is exactly 90 days
+        self.assertEqual(
+            report.loc[2007, "transactions_90d"], (product["sale_date"] <= "2025-03-31").sum()
+        )
+
+    def test_batch_order_does_not_matter(self):
+        """Batches in any order give the same cubes."""
+        whole = RollingMetrics()
+        whole.update(self.sales)
+        # Later batches add older days and new keys
+        batches = RollingMetrics()
+        newest_first = self.sales.sort_values("sale_date", ascending=False)
+        for part in np.array_split(np.arange(len(newest_first)), 4):
+            batches.update(newest_first.iloc[part])
+        for key in ("store_id", "product_id"):
+            # Keys are stored in arrival order: compare in key order
+            cubes = [whole.cubes[key], batches.cubes[key]]
+            self.assertEqual(cubes[0].start, cubes[1].start)
+            sorted_prefix = [cube.prefix[:, :, np.argsort(cube.keys)] for cube in cubes]
+            self.assertTrue(np.allclose(*sorted_prefix))
+        self.assertEqual(batches.last_transaction_id, len(self.sales))
+
+    def test_batches_within_capacity_update_in_place(self):
+        """Batches that fit the spare capacity update the buffer in place."""
+        half = self.sales[self.sales["sale_date"] < "2025-02-15"]
+        next_day = half.tail(1).assign(sale_date="2025-02-15")
+        metrics = RollingMetrics()
+        metrics.update(half)
+        cube = metrics.cubes["store_id"]
+        buffer = cube._buffer
+        # Same days and keys again, then one day past the end: no reallocation
+        metrics.update(half)
+        metrics.update(next_day)
+        self.assertIs(cube._buffer, buffer)
+        self.assertEqual(str(cube.end), "2025-02-15")
+
+        whole = RollingMetrics()
+        whole.update(pd.concat([half, half, next_day]))
+        self.assertTrue(np.allclose(cube.prefix, whole.cubes["store_id"].prefix))
+
+    def test_save_load_and_incremental_refresh(self):
+        """Saved cubes reload and keep updating incrementally."""
+        conn = sqlite3.connect(":memory:")
+        self.addCleanup(conn.close)
+        load_sample_dw(conn)
+        metrics, stats = refresh(conn, self.dir)
+        self.assertEqual(stats, {"incremental": False, "sales_read": 4})
+
+        loaded = RollingMetrics.load(self.dir)
+        self.assertIsInstance(loaded.cubes["store_id"].prefix, np.memmap)
+        pd.testing.assert_frame_equal(
+            loaded.window_report("store_id"), metrics.window_report("store_id")
+        )
+
+        conn.execute(
+            "INSERT INTO sales_base (transaction_id, sale_date, store_id, product_id, "
+            "sale_amount, discount_percent) VALUES (5, '2025-06-03', 401, 2000, 60.0, 0)"
+        )
+        metrics, stats = refresh(conn, self.dir)
+        self.assertEqual(stats, {"incremental": True, "sales_read": 1})
+        report = metrics.window_report("store_id", windows=(7,))
+        self.assertEqual(report.loc[401, "sales_7d"], 60.0)
+        self.assertEqual(report.loc[403, "transactions_7d"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""test_scd2.py.
+
+Unit tests for the SCD type 2 history in scd2.py: unchanged rows are not
+rewritten, changed rows get a new current version and removed keys are
+closed.
+
+Usage:
+    python -m unittest src.analytics_project.test_scd2
+"""
+
+import sqlite3
+import unittest
+
+from src.analytics_project.scd2 import apply_scd2
+from src.analytics_project.test_etl_to_dw import load_sample_dw
+
+
+class TestSCD2(unittest.TestCase):
+    """Slowly changing dimension history."""
+
+    def setUp(self):
+        """Load the sample DW and record its first history."""
+        self.conn = sqlite3.connect(":memory:")
+        load_sample_dw(self.conn)
+        self.first = apply_scd2(self.conn, "customer", as_of="2025-01-01")
+
+    def tearDown(self):
+        """Close the DW."""
+        self.conn.close()
+
+    def test_first_run_inserts_every_row(self):
+        """The first run inserts a version per row."""
+        self.assertEqual(self.first, {"inserted": 2, "changed": 0, "unchanged": 0, "closed": 0})
+
+    def test_rerun_without_changes_writes_nothing(self):
+        """A rerun without changes writes nothing."""
+        stats = apply_scd2(self.conn, "customer", as_of="2025-01-02")
+        self.assertEqual(stats["unchanged"], 2)
+        count = self.conn.execute("SELECT COUNT(*) FROM customer_history").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_changed_and_deleted_rows(self):
+        """Changed rows get a new version; deleted rows are closed."""
+        self.conn.execute("UPDATE customer_base SET reward_points = 99 WHERE customer_id = 1000")
+        self.conn.execute("DELETE FROM customer_base WHERE customer_id = 1001")
+        stats = apply_scd2(self.conn, "customer", as_of="2025-02-01")
+        self.assertEqual(stats, {"inserted": 0, "changed": 1, "unchanged": 0, "closed": 1})
+
+        rows = self.conn.execute(
+            "SELECT reward_points, valid_from, valid_to, is_current FROM customer_history "
+            "WHERE customer_id = 1000 ORDER BY version_id"
+        ).fetchall()
+        self.assertEqual(rows, [(10, "2025-01-01", "2025-02-01", 0), (99, "2025-02-01", None, 1)])
+        closed = self.conn.execute(
+            "SELECT is_current FROM customer_history WHERE customer_id = 1001"
+        ).fetchone()
+        self.assertEqual(closed[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""test_shadow_db.py.
+
+Unit tests for shadow_db.py: the DW is loaded into a shadow copy, published
+by rename or backup, keeps tables from the live file (SCD2 history), and a
+failed load leaves the live file untouched.
+
+Usage:
+    python -m unittest src.analytics_project.test_shadow_db
+"""
+
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from src.analytics_project import etl_to_dw, shadow_db
+from src.analytics_project.scd2 import apply_scd2
+from src.analytics_project.shadow_db import open_shadow, shadow_build, shadow_path
+from src.analytics_project.test_etl_to_dw import load_sample_dw
+
+
+def count(path: pathlib.Path, table: str) -> int:
+    """Return the row count of ``table``."""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]  # noqa: S608
+    finally:
+        conn.close()
+
+
+class TestShadowBuild(unittest.TestCase):
+    """Shadow builds and atomic publishing."""
+
+    def setUp(self):
+        """Build the sample DW in a temporary folder."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db = pathlib.Path(self.tmp.name) / "dw.db"
+        with shadow_build(self.db) as conn:
+            load_sample_dw(conn)
+            apply_scd2(conn, "customer")
+
+    def test_in_memory_shadow_is_write_tuned(self):
+        """The in-memory shadow uses write-tuned pragmas."""
+        conn = open_shadow()
+        self.assertEqual(conn.execute("PRAGMA journal_mode;").fetchone()[0], "off")
+        self.assertEqual(conn.execute("PRAGMA synchronous;").fetchone()[0], 0)
+        conn.close()
+
+    def test_rename_publishes_and_keeps_history(self):
+        """A rename publishes the new DW while open readers keep the old one."""
+        reader = sqlite3.connect(self.db)
+        with shadow_build(self.db) as conn:
+            conn.execute("DELETE FROM sales_base WHERE transaction_id > 2;")
+            self.assertEqual(count(self.db, "sales"), 4)
+        self.assertEqual(count(self.db, "sales"), 2)
+        self.assertEqual(count(self.db, "customer_history"), 2)
+        self.assertFalse(shadow_path(self.db).exists())
+        # An open connection keeps reading the version it opened
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM sales;").fetchone()[0], 4)
+        reader.close()
+
+    def test_backup_is_visible_to_open_connections(self):
+        """The backup method is visible to open connections."""
+        reader = sqlite3.connect(self.db)
+        with shadow_build(self.db, method="backup", in_memory=False) as conn:
+            conn.execute("DELETE FROM sales_base WHERE transaction_id > 1;")
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM sales;").fetchone()[0], 1)
+        reader.close()
+
+    def test_rename_falls_back_to_backup_on_windows(self):
+        """Without safe renames, publishing falls back to a backup."""
+        reader = sqlite3.connect(self.db)
+        reader.execute("SELECT COUNT(*) FROM sales;").fetchone()
+        with (
+            mock.patch.object(shadow_db, "CAN_REPLACE_OPEN_FILES", False),
+            mock.patch.object(shadow_db.os, "replace", side_effect=PermissionError),
+            shadow_build(self.db, in_memory=False) as conn,
+        ):
+            conn.execute("DELETE FROM sales_base WHERE transaction_id > 3;")
+        self.assertEqual(reader.execute("SELECT COUNT(*) FROM sales;").fetchone()[0], 3)
+        self.assertFalse(shadow_path(self.db).exists())
+        reader.close()
+
+    def test_failed_load_leaves_live_db(self):
+        """A failed load leaves the live DW untouched."""
+        with self.assertRaises(RuntimeError), shadow_build(self.db, in_memory=False) as conn:
+            conn.execute("DELETE FROM sales_base;")
+            raise RuntimeError("load failed")
+        self.assertEqual(count(self.db, "sales"), 4)
+        self.assertFalse(shadow_path(self.db).exists())
+
+    def test_memory_target_loads_dw(self):
+        """A shadow build can target an in-memory DW."""
+        with shadow_build(":memory:") as conn:
+            etl_to_dw.create_schema(conn.cursor())
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM sales;").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
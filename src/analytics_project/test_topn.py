@@ -0,0 +1,80 @@
+"""test_topn.py.
+
+Unit tests for the heavy-hitter summaries in topn.py: on skewed sales the
+approximate top-N matches the exact SQL recompute, and merging summaries
+built on separate partitions gives the same answer as one summary.
+
+Usage:
+    python -m unittest src.analytics_project.test_topn
+"""
+
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.topn import TopNEngine, exact_top, validate
+
+
+class TestTopN(unittest.TestCase):
+    """Heavy-hitter summaries against exact SQL."""
+
+    def setUp(self):
+        """Build skewed random sales and an exact copy in SQLite."""
+        rng = np.random.default_rng(7)
+        n = 50_000
+        self.sales = pd.DataFrame(
+            {
+                "customer_id": 1000 + rng.zipf(1.5, n) % 5000,
+                "product_id": 2000 + rng.zipf(1.5, n) % 2000,
+                "store_id": rng.integers(400, 410, n),
+                "sale_amount": rng.gamma(2.0, 50.0, n),
+            }
+        )
+        self.conn = sqlite3.connect(":memory:")
+        self.sales.to_sql("sales", self.conn, index=False)
+
+    def tearDown(self):
+        """Close the exact copy."""
+        self.conn.close()
+
+    def test_top_customers_match_exact(self):
+        """The top customers and revenues match the exact query."""
+        engine = TopNEngine()
+        engine.update(self.sales)
+        result = validate(engine, self.conn, "customers_by_revenue", 20)
+        self.assertEqual(result["recall"], 1.0)
+        self.assertLess(result["max_relative_error"], 0.01)
+
+    def test_products_per_store_match_exact(self):
+        """The top products of a store match the exact query."""
+        engine = TopNEngine()
+        engine.update(self.sales)
+        approx = engine.top("products_by_store", 3, group=405)
+        exact = exact_top(self.conn, "products_by_store", 3, group=405)
+        self.assertEqual(list(approx["product_id"]), list(exact["product_id"]))
+
+    def test_negative_keys_are_rejected(self):
+        """Negative ids are rejected."""
+        engine = TopNEngine()
+        bad = self.sales.head(3).assign(customer_id=[-1, 1000, 1001])
+        with self.assertRaises(ValueError):
+            engine.update(bad)
+
+    def test_merge_equals_single_pass(self):
+        """Merged partial summaries equal one summary."""
+        whole = TopNEngine()
+        whole.update(self.sales)
+        merged = TopNEngine()
+        for part in np.array_split(np.arange(len(self.sales)), 4):
+            partial = TopNEngine()
+            partial.update(self.sales.iloc[part])
+            merged.merge(partial)
+        pd.testing.assert_frame_equal(
+            merged.top("products_by_revenue", 10), whole.top("products_by_revenue", 10)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""test_validation.py.
+
+Unit tests for the rule engine in validation.py: violation counts per rule,
+one combined reject mask, and the fill/clip fix-ups.
+
+Usage:
+    python -m unittest src.analytics_project.test_validation
+"""
+
+import unittest
+
+import pandas as pd
+
+from src.analytics_project.validation import (
+    RULES,
+    RuleSet,
+    check,
+    in_range,
+    in_set,
+    matches,
+    not_null,
+)
+
+
+class TestValidation(unittest.TestCase):
+    """The rule engine and the sales rules."""
+
+    def setUp(self):
+        """Build a frame with one problem per column."""
+        self.df = pd.DataFrame(
+            {
+                "Code": ["A1", "B2", "bad", None],
+                "Amount": ["10", "-5", "250", "x"],
+                "Discount": [5.0, 150.0, 10.0, 0.0],
+                "Type": ["Cash", "Bitcoin", None, "Cash"],
+            }
+        )
+
+    def test_counts_and_combined_reject_mask(self):
+        """Counts per rule and one combined reject mask."""
+        rules = RuleSet(
+            "demo",
+            [
+                not_null("Amount"),
+                in_range("Amount", low=0),
+                matches("Code", r"[A-Z]\d"),
+                in_set("Type", ["Cash"], fill="Other"),
+                in_range("Discount", 0, 100, action="clip"),
+            ],
+            numeric=["Amount"],
+        )
+        result = rules.apply(self.df)
+        self.assertEqual(result.violations("Amount_not_null"), 1)  # 'x' does not parse
+        self.assertEqual(result.violations("Amount_range"), 1)
+        self.assertEqual(result.violations("Code_regex"), 1)  # missing Code is not a regex failure
+        self.assertEqual(list(result.keep), [True, False, False, False])
+        self.assertEqual(len(result.df), 1)
+
+    def test_fixups_fill_and_clip(self):
+        """Fill and clip fix up the kept rows."""
+        rules = RuleSet(
+            "demo",
+            [
+                not_null("Type", fill="Other"),
+                in_set("Type", ["Cash"], fill="Other"),
+                in_range("Discount", 0, 100, action="clip"),
+            ],
+        )
+        result = rules.apply(self.df)
+        self.assertEqual(list(result.df["Type"]), ["Cash", "Other", "Other", "Cash"])
+        self.assertEqual(result.df["Discount"].max(), 100.0)
+
+    def test_cross_column_rule(self):
+        """A cross-column rule rejects rows, missing values included."""
+        rules = RuleSet(
+            "demo", [check("discount_below_amount", "Discount < Amount")], numeric=["Amount"]
+        )
+        result = rules.apply(self.df)
+        self.assertEqual(list(result.keep), [True, False, True, False])  # missing Amount fails
+
+    def test_sales_rules(self):
+        """The sales rules fill, reject and count as expected."""
+        sales = pd.DataFrame(
+            {
+                "CustomerID": [1000, None],
+                "ProductID": [2000, 2001],
+                "StoreID": [401, 402],
+                "SaleDate": ["5/4/2025", "not a date"],
+                "SaleAmount": [10.0, 20.0],
+                "DiscountPercent": [5, 101],
+                "SalePaymentType": ["Cash", "Check"],
+            }
+        )
+        result = RULES["sales"].apply(sales)
+        self.assertEqual(result.violations("CustomerID_not_null"), 1)
+        self.assertEqual(result.violations("SalePaymentType_in_set"), 1)
+        self.assertEqual(list(result.keep), [True, False])
+        # the rejected row's bad payment type is not counted among the kept rows
+        self.assertEqual(result.violations("SalePaymentType_in_set", kept=True), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
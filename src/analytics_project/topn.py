@@ -0,0 +1,254 @@
+"""Top-N and heavy-hitter summaries for customers, products and stores.
+
+"Top 20 customers by revenue" and "best-selling products per store" need a
+full GROUP BY over sales plus a sort. Instead, each summary here keeps a
+count-min sketch of the measure per key plus a bounded list of candidate
+keys (the current heavy hitters). Summaries are:
+
+- updated incrementally from each sales batch the ETL loads,
+- mergeable across partitions (sketches add, candidate lists union),
+- answered in milliseconds from memory, and
+- checkable against an exact SQL recompute (``exact_top``).
+
+Count-min estimates never undercount; with the default width the
+overcount is a small fraction of the total measure.
+
+Usage:
+    engine = TopNEngine()
+    engine.update(sales_batch)          # columns as in the DW sales table
+    engine.top("customers_by_revenue", 20)
+    engine.top("products_by_store", 5, group=402)
+"""
+
+import pathlib
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Summary name -> (key column, group column or None, weight column or None
+# for counts, sketch width). The expected overcount of any estimate is about
+# total / width, so the grouped summary (one counter per store x product
+# pair) gets a wider sketch.
+SUMMARIES: dict[str, tuple[str, str | None, str | None, int]] = {
+    "customers_by_revenue": ("customer_id", None, "sale_amount", 1 << 14),
+    "products_by_revenue": ("product_id", None, "sale_amount", 1 << 14),
+    "stores_by_revenue": ("store_id", None, "sale_amount", 1 << 12),
+    "products_by_store": ("product_id", "store_id", None, 1 << 17),
+}
+
+
+class CountMinSketch:
+    """Count-min sketch over int64 keys with float weights."""
+
+    def __init__(self, width: int = 4096, depth: int = 4, seed: int = 0):
+        """Create an empty ``depth`` x ``width`` sketch with hash seed ``seed``."""
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.float64)
+
+    def _buckets(self, keys: np.ndarray) -> np.ndarray:
+        """Return a (depth, n) array of bucket indexes, one hash function per row.
+
+        Each row uses the splitmix64 finalizer on the key offset by a
+        row-specific constant (uint64 arithmetic wraps around on purpose).
+        """
+        x = np.asarray(keys, dtype=np.int64).view(np.uint64)
+        offsets = (np.arange(self.depth, dtype=np.uint64) + np.uint64(self.seed + 1)) * np.uint64(
+            0x9E3779B97F4A7C15
+        )
+        h = x[None, :] + offsets[:, None]
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+        return (h % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, keys: np.ndarray, weights: np.ndarray) -> None:
+        """Add ``weights`` to the counters of ``keys`` (keys may repeat)."""
+        for row, buckets in enumerate(self._buckets(keys)):
+            self.table[row] += np.bincount(buckets, weights=weights, minlength=self.width)
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        """Return the (over-)estimate of each key's total."""
+        buckets = self._buckets(keys)
+        return self.table[np.arange(self.depth)[:, None], buckets].min(axis=0)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Add another sketch built with the same width, depth and seed."""
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Can only merge sketches with the same width, depth and seed.")
+        self.table += other.table
+
+
+def _pack(groups: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Combine a group id and a key into one int64 (both fit in 32 bits)."""
+    if (keys < 0).any() or (keys > 0xFFFFFFFF).any():
+        raise ValueError("Top-N keys must be ids in [0, 2**32).")
+    if (groups < 0).any() or (groups > 0x7FFFFFFF).any():
+        raise ValueError("Top-N groups must be ids in [0, 2**31).")
+    return (groups.astype(np.int64) << 32) | (keys.astype(np.int64) & 0xFFFFFFFF)
+
+
+class HeavyHitters:
+    """Bounded heavy-hitter list per group, backed by a count-min sketch."""
+
+    def __init__(
+        self,
+        key: str,
+        group: str | None = None,
+        weight: str | None = None,
+        capacity: int = 200,
+        width: int = 4096,
+        depth: int = 4,
+    ):
+        """Track the top ``key`` values by ``weight`` (or row count) per ``group``."""
+        self.key = key
+        self.group = group
+        self.weight = weight
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        # Candidate (group, key) pairs, at most ``capacity`` per group
+        self.groups = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold a batch of sales rows into the summary."""
+        cols = [self.key] + ([self.group] if self.group else [])
+        batch = df.dropna(subset=cols)
+        if batch.empty:
+            return
+        keys = batch[self.key].to_numpy(dtype=np.int64)
+        groups = (
+            batch[self.group].to_numpy(dtype=np.int64)
+            if self.group
+            else np.zeros(len(keys), dtype=np.int64)
+        )
+        weights = (
+            pd.to_numeric(batch[self.weight], errors="coerce").fillna(0).to_numpy(np.float64)
+            if self.weight
+            else np.ones(len(keys))
+        )
+        # Pre-aggregate the batch so the sketch sees each pair once
+        packed, inverse = np.unique(_pack(groups, keys), return_inverse=True)
+        self.sketch.add(packed, np.bincount(inverse, weights=weights))
+        self._prune(
+            np.concatenate([self.groups, packed >> 32]),
+            np.concatenate([self.keys, packed & 0xFFFFFFFF]),
+        )
+
+    def _prune(self, groups: np.ndarray, keys: np.ndarray) -> None:
+        """Keep the ``capacity`` best distinct candidates per group."""
+        packed = np.unique(_pack(groups, keys))
+        ranked = pd.DataFrame(
+            {"group": packed >> 32, "key": packed & 0xFFFFFFFF, "est": self.sketch.estimate(packed)}
+        )
+        ranked = ranked.sort_values(["group", "est"], ascending=[True, False])
+        ranked = ranked[ranked.groupby("group").cumcount() < self.capacity]
+        self.groups = ranked["group"].to_numpy(np.int64)
+        self.keys = ranked["key"].to_numpy(np.int64)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        """Combine a summary built on another partition into this one."""
+        self.sketch.merge(other.sketch)
+        self._prune(
+            np.concatenate([self.groups, other.groups]), np.concatenate([self.keys, other.keys])
+        )
+
+    def top(self, n: int = 10, group: int | None = None) -> pd.DataFrame:
+        """Return the ``n`` largest keys (within ``group`` if the summary is grouped)."""
+        mask = self.groups == (group if group is not None else 0)
+        keys = self.keys[mask]
+        est = self.sketch.estimate(_pack(self.groups[mask], keys))
+        order = np.argsort(-est, kind="stable")[:n]
+        return pd.DataFrame({self.key: keys[order], "estimate": est[order]})
+
+
+class TopNEngine:
+    """All SUMMARIES together, updated from the sales batches the ETL loads."""
+
+    def __init__(self, capacity: int = 200, depth: int = 4):
+        """Create an empty summary for each of SUMMARIES."""
+        self.summaries = {
+            name: HeavyHitters(key, group, weight, capacity, width, depth)
+            for name, (key, group, weight, width) in SUMMARIES.items()
+        }
+
+    def update(self, sales: pd.DataFrame) -> None:
+        """Fold one batch of DW-shaped sales rows into every summary."""
+        for summary in self.summaries.values():
+            summary.update(sales)
+
+    def merge(self, other: "TopNEngine") -> None:
+        """Merge an engine built on another partition of the sales data."""
+        for name, summary in self.summaries.items():
+            summary.merge(other.summaries[name])
+
+    def top(self, name: str, n: int = 10, group: int | None = None) -> pd.DataFrame:
+        """Return the approximate top ``n`` for one summary."""
+        return self.summaries[name].top(n, group)
+
+    def save(self, path: pathlib.Path) -> None:
+        """Store sketches and candidate lists in one .npz file."""
+        arrays = {}
+        for name, s in self.summaries.items():
+            arrays[f"{name}__table"] = s.sketch.table
+            arrays[f"{name}__groups"] = s.groups
+            arrays[f"{name}__keys"] = s.keys
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, capacity: int = 200) -> "TopNEngine":
+        """Restore an engine written by save()."""
+        with np.load(path) as data:
+            engine = cls(capacity)
+            for name, s in engine.summaries.items():
+                s.sketch.table = data[f"{name}__table"]
+                s.sketch.depth, s.sketch.width = s.sketch.table.shape
+                s.groups = data[f"{name}__groups"]
+                s.keys = data[f"{name}__keys"]
+        return engine
+
+
+def exact_top(
+    conn: sqlite3.Connection, name: str, n: int = 10, group: int | None = None
+) -> pd.DataFrame:
+    """Recompute a summary's top ``n`` exactly with SQL (to validate the sketch)."""
+    key, group_col, weight, _ = SUMMARIES[name]
+    measure = f"SUM({weight})" if weight else "COUNT(*)"
+    where, params = "", []
+    if group_col:
+        where, params = f"WHERE {group_col} = ?", [group]
+    sql = (
+        f"SELECT {key}, {measure} AS exact FROM sales {where} "  # noqa: S608
+        f"GROUP BY {key} ORDER BY exact DESC, {key} LIMIT ?"
+    )
+    return pd.read_sql_query(sql, conn, params=[*params, n])
+
+
+def validate(
+    engine: TopNEngine,
+    conn: sqlite3.Connection,
+    name: str,
+    n: int = 10,
+    group: int | None = None,
+) -> dict[str, float]:
+    """Compare the engine's top ``n`` with an exact recompute.
+
+    Returns:
+        dict[str, float]: recall (share of the exact top-n found) and the
+        largest relative overcount among the exact top-n keys.
+    """
+    key = SUMMARIES[name][0]
+    approx = engine.top(name, n, group)
+    exact = exact_top(conn, name, n, group)
+    if exact.empty:
+        return {"recall": 1.0, "max_relative_error": 0.0}
+    recall = len(set(approx[key]) & set(exact[key])) / len(exact)
+    estimates = engine.summaries[name].sketch.estimate(
+        (np.int64(group or 0) << 32) | exact[key].to_numpy(np.int64)
+    )
+    error = np.abs(estimates - exact["exact"].to_numpy(float)) / exact["exact"].to_numpy(float)
+    return {"recall": recall, "max_relative_error": float(error.max())}
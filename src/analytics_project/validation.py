@@ -0,0 +1,233 @@
+"""Declarative validation rules, evaluated as vectorized masks.
+
+Each table's rules are declared once in RULES. A RuleSet first parses its
+typed columns (numbers, dates; unparseable values become missing), then
+computes every rule's violation mask on that frame in one pass, and only
+then applies the fix-ups:
+
+- ``reject``: drop the row (all reject masks are OR-ed into one),
+- ``fill``: replace the offending values with a constant,
+- ``clip``: clip to the rule's range.
+
+Range, set and regex rules ignore missing values; missing values are the
+job of ``not_null`` rules, so a column can be filled first and
+range-checked without double counting.
+
+Usage:
+    result = RULES["sales"].apply(df)
+    result.df        # fixed and filtered rows
+    result.counts    # violations per rule
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics_project.quality_log import record
+
+ACTIONS = ("reject", "fill", "clip", "flag")
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One declarative check. Build rules with the helpers below."""
+
+    name: str
+    kind: str  # not_null, range, in_set, regex, expr
+    column: str | None = None
+    action: str = "reject"
+    fill: Any = None  # value, or a callable returning one (e.g. pd.Timestamp.today)
+    low: float | None = None
+    high: float | None = None
+    values: tuple = ()
+    pattern: str | None = None
+    expr: str | None = None
+
+    def violations(self, df: pd.DataFrame) -> np.ndarray:
+        """Return the boolean mask of rows that break this rule."""
+        if self.kind == "expr":
+            return ~df.eval(self.expr).fillna(False).to_numpy(bool)
+        if self.column not in df.columns:
+            # A missing column breaks not_null everywhere; other checks skip it
+            return np.full(len(df), self.kind == "not_null")
+        values = df[self.column]
+        present = values.notna().to_numpy()
+        if self.kind == "not_null":
+            return ~present
+        if self.kind == "range":
+            bad = np.zeros(len(df), dtype=bool)
+            if self.low is not None:
+                bad |= (values < self.low).to_numpy(bool, na_value=False)
+            if self.high is not None:
+                bad |= (values > self.high).to_numpy(bool, na_value=False)
+            return bad & present
+        if self.kind == "in_set":
+            return ~values.isin(self.values).to_numpy() & present
+        if self.kind == "regex":
+            matched = values.astype(str).str.fullmatch(self.pattern)
+            return ~matched.fillna(False).to_numpy(bool) & present
+        raise ValueError(f"Unknown rule kind '{self.kind}'.")
+
+
+def not_null(column: str, fill: Any = None) -> Rule:
+    """Missing values are filled with ``fill`` or, if None, rejected."""
+    action = "reject" if fill is None else "fill"
+    return Rule(f"{column}_not_null", "not_null", column, action, fill=fill)
+
+
+def in_range(
+    column: str, low: float | None = None, high: float | None = None, action: str = "reject"
+) -> Rule:
+    """Values must lie in [low, high]; ``action`` is "reject" or "clip"."""
+    return Rule(f"{column}_range", "range", column, action, low=low, high=high)
+
+
+def in_set(column: str, values: list, fill: Any = None) -> Rule:
+    """Values must be one of ``values``; others are mapped to ``fill`` or rejected."""
+    action = "reject" if fill is None else "fill"
+    return Rule(f"{column}_in_set", "in_set", column, action, fill=fill, values=tuple(values))
+
+
+def matches(column: str, pattern: str, fill: Any = None) -> Rule:
+    """Values (as text) must fully match ``pattern``."""
+    action = "reject" if fill is None else "fill"
+    return Rule(f"{column}_regex", "regex", column, action, fill=fill, pattern=pattern)
+
+
+def check(name: str, expr: str, action: str = "reject") -> Rule:
+    """Cross-column rule: ``expr`` (DataFrame.eval syntax) must be true."""
+    return Rule(name, "expr", action=action, expr=expr)
+
+
+@dataclass
+class ValidationResult:
+    """Output of RuleSet.apply()."""
+
+    df: pd.DataFrame
+    keep: np.ndarray  # per input row: True if the row survived
+    counts: pd.DataFrame  # rule, column, action, violations, kept (violations among kept rows)
+
+    def violations(self, rule: str, kept: bool = False) -> int:
+        """Rows that broke ``rule``; with ``kept``, only those that were not rejected."""
+        column = "kept" if kept else "violations"
+        return int(self.counts.loc[self.counts["rule"] == rule, column].sum())
+
+
+@dataclass
+class RuleSet:
+    """The rules for one table plus the column types they need."""
+
+    table: str
+    rules: list[Rule]
+    numeric: list[str] = field(default_factory=list)
+    dates: list[str] = field(default_factory=list)
+
+    def parse(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert the typed columns; unparseable values become missing."""
+        df = df.copy()
+        for col in self.numeric:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        for col in self.dates:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+        return df
+
+    def apply(self, df: pd.DataFrame, stage: str | None = None) -> ValidationResult:
+        """Evaluate every rule, apply the fix-ups and drop rejected rows.
+
+        Violations are also recorded in the data-quality log under ``stage``
+        (default: the table name), with a sample of the offending rows.
+        """
+        df = self.parse(df)
+        masks = [rule.violations(df) for rule in self.rules]
+        for rule, mask in zip(self.rules, masks, strict=True):
+            record(stage or self.table, rule.name, rule.column, mask, df)
+
+        reject = np.zeros(len(df), dtype=bool)
+        for rule, mask in zip(self.rules, masks, strict=True):
+            if rule.action == "reject":
+                reject |= mask
+            elif rule.action == "fill" and mask.any():
+                value = rule.fill() if callable(rule.fill) else rule.fill
+                if rule.column not in df.columns:
+                    df[rule.column] = value
+                else:
+                    df.loc[mask, rule.column] = value
+            elif rule.action == "clip" and mask.any():
+                df[rule.column] = df[rule.column].clip(rule.low, rule.high)
+            elif rule.action not in ACTIONS:
+                raise ValueError(f"Unknown action '{rule.action}' in rule {rule.name}.")
+
+        counts = pd.DataFrame(
+            {
+                "rule": [r.name for r in self.rules],
+                "column": [r.column for r in self.rules],
+                "action": [r.action for r in self.rules],
+                "violations": [int(m.sum()) for m in masks],
+                "kept": [int((m & ~reject).sum()) for m in masks],
+            }
+        )
+        return ValidationResult(df[~reject], ~reject, counts)
+
+
+# -----------------------------
+# Rules per table
+# -----------------------------
+VALID_PAYMENT_TYPES = ["DebitCard", "CreditCard", "Cash", "GiftCard"]
+
+RULES: dict[str, RuleSet] = {
+    "sales": RuleSet(
+        "sales",
+        [
+            not_null("CustomerID", fill=0),
+            not_null("ProductID", fill=0),
+            not_null("StoreID", fill=0),
+            not_null("SaleDate", fill=pd.Timestamp.today),
+            not_null("SaleAmount"),
+            not_null("DiscountPercent"),
+            in_range("SaleAmount", low=0),
+            in_range("DiscountPercent", 0, 100),
+            not_null("SalePaymentType", fill="Other"),
+            in_set("SalePaymentType", VALID_PAYMENT_TYPES, fill="Other"),
+        ],
+        numeric=["SaleAmount", "DiscountPercent"],
+        dates=["SaleDate"],
+    ),
+    "products": RuleSet(
+        "products",
+        [
+            not_null("ProductName", fill="Unknown"),
+            not_null("Category", fill="Unknown"),
+            not_null("ProductSupplierRegion", fill="Unknown"),
+            not_null("UnitPrice", fill=0.0),
+            not_null("ProductDiscountPercent", fill=0.0),
+            in_range("UnitPrice", low=0),
+            in_range("ProductDiscountPercent", low=0),
+        ],
+        numeric=["UnitPrice", "ProductDiscountPercent"],
+    ),
+    "customers": RuleSet(
+        "customers",
+        [
+            not_null("Name", fill="Unknown Customer"),
+            not_null("Region", fill="Unknown"),
+            not_null("JoinDate", fill=pd.Timestamp.today),
+            not_null("CustomerRewardPoints", fill=0),
+            not_null("CustomerStatus", fill="New"),
+            in_range("CustomerRewardPoints", low=0),
+        ],
+        numeric=["CustomerRewardPoints"],
+        dates=["JoinDate"],
+    ),
+}
+
+
+def report(result: ValidationResult, printer: Callable[[str], None] = print) -> None:
+    """Print one line per rule that found violations."""
+    for row in result.counts[result.counts["violations"] > 0].itertuples(index=False):
+        printer(f"{row.rule}: {row.violations} rows ({row.action})")
+    printer(f"Kept {int(result.keep.sum())} of {len(result.keep)} rows.")